@@ -9,12 +9,15 @@ import pandas as pd
 import matplotlib
 
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import RendererAgg
-from matplotlib.figure import Figure
-import seaborn as sns
-import statsmodels
-from statsmodels.nonparametric.smoothers_lowess import lowess
+import matplotlib.style
+
+from ufc_data import stats
+from ufc_data.charts import render_async
+from ufc_data.fightlog import FIGHT_LOG_PAGE_SIZE
+from ufc_data.derived import load_data_version
+from ufc_data.profiling import profiled, start_profiler
+from ufc_data.search import load_fighter_search
+from ufc_data.sqlstore import load_lookups
 
 
 # ==========================================================================
@@ -22,344 +25,205 @@ from statsmodels.nonparametric.smoothers_lowess import lowess
 # ==========================================================================
 
 
-def fight_logs(ufcstats_id):
+# fight log column -> the header the dashboard shows
+FIGHT_LOG_LABELS = {
+    "event_name": "Event",
+    "event_date": "Date",
+    "weight_class": "Weight",
+    "opp_name": "Opponent",
+    "fighter_odds": "Odds",
+    "fighter_winner": "Winner?",
+    "round": "Round",
+    "time": "Time",
+    "fight_time_seconds": "Secs.",
+    "method": "Method",
+    "fighter_new_dk_score": "DK Pts (New)",
+    "fighter_old_dk_score": "DK Pts (Old)",
+    "fighter_total_knockdowns": "KO",
+    "fighter_total_sig_strikes_landed": "Sig. Strikes",
+    "fighter_total_strikes_landed": "Strikes",
+    "fighter_total_takedowns": "TD",
+    "fighter_total_submission_attempts": "Sub Att.",
+    "fighter_total_reversals": "Rev",
+    "fighter_total_control": "Ctrl",
+}
+
+
+@profiled
+def fight_logs(ufcstats_id, page, **filters):
     """
-    This function returns a fight log for a particular fighter
+    This function returns one page of a particular fighter's fight log and
+    how many fights pass the filters, see ufc_data.fightlog
     """
 
-    fight_log = all_fight_data_df.loc[all_fight_data_df["ufcstats_id"] == ufcstats_id]
-    fight_log = fight_log[
-        [
-            "event_name",
-            "event_date",
-            "weight_class",
-            "opp_name",
-            "fighter_odds",
-            "fighter_winner",
-            "round",
-            "time",
-            "fight_time_seconds",
-            "method",
-            "fighter_new_dk_score",
-            "fighter_old_dk_score",
-            "fighter_total_knockdowns",
-            "fighter_total_sig_strikes_landed",
-            "fighter_total_strikes_landed",
-            "fighter_total_takedowns",
-            "fighter_total_submission_attempts",
-            "fighter_total_reversals",
-            "fighter_total_control",
-        ]
-    ]
-
-    fight_log = fight_log.rename(
-        columns={
-            "event_name": "Event",
-            "event_date": "Date",
-            "weight_class": "Weight",
-            "opp_name": "Opponent",
-            "fighter_odds": "Odds",
-            "fighter_winner": "Winner?",
-            "round": "Round",
-            "time": "Time",
-            "fight_time_seconds": "Secs.",
-            "method": "Method",
-            "fighter_new_dk_score": "DK Pts (New)",
-            "fighter_old_dk_score": "DK Pts (Old)",
-            "fighter_total_knockdowns": "KO",
-            "fighter_total_sig_strikes_landed": "Sig. Strikes",
-            "fighter_total_strikes_landed": "Strikes",
-            "fighter_total_takedowns": "TD",
-            "fighter_total_submission_attempts": "Sub Att.",
-            "fighter_total_reversals": "Rev",
-            "fighter_total_control": "Ctrl",
-        }
-    )
+    fight_log, total = stats.fight_log_page(ufcstats_id, page=page, **filters)
 
-    return fight_log
+    # only the page's rows are renamed, never the whole log
+    return fight_log.rename(columns=FIGHT_LOG_LABELS), total
 
 
-def sig_strikes_chart(ufcstats_id, weight_class):
+@profiled
+def round_breakdown(ufcstats_id):
     """
-    This function returns sig strikes chart
+    This function returns a fighter's stats by round, see ufc_data.rounds
     """
 
-    all_fighter_career_stats = all_career_stats_df.loc[
-        (all_career_stats_df["weight_class"].str.contains(weight_class))
-    ]
-
-    sig_strikes = all_fighter_career_stats[
-        [
-            "ufcstats_id",
-            "sig_strikes_landed_per_minute",
-            "sig_strikes_absorbed_per_minute",
-            "fight_time_seconds_for",
-        ]
-    ]
-
-    # removing where fighters have 0 and 0
-    sig_strikes = sig_strikes.loc[
-        (sig_strikes["sig_strikes_landed_per_minute"] > 0)
-        & (sig_strikes["sig_strikes_absorbed_per_minute"] > 0)
-    ].reset_index()
-
-    sig_strikes["color"] = "#BFBFBF"
-    sig_strikes.loc[(sig_strikes.ufcstats_id == ufcstats_id), "color"] = "#990000"
-    sig_strikes = sig_strikes.sort_values(by="color", ascending=False)
-
-    ss_fig = Figure()
-    ax = ss_fig.subplots()
-
-    sns.scatterplot(
-        x=sig_strikes["sig_strikes_landed_per_minute"],
-        y=sig_strikes["sig_strikes_absorbed_per_minute"],
-        data=sig_strikes,
-        hue=sig_strikes["color"],
-        palette=dict({"#BFBFBF": "#BFBFBF", "#990000": "#990000"}),
-        s=(sig_strikes["fight_time_seconds_for"] / 15),
-        legend=False,
-        ax=ax,
-    )
-
-    ax.set_xlabel("Sig. Strikes Landed Per Minute", fontsize=12)
-    ax.set_ylabel("Sig. Strikes Absorbed Per Minute", fontsize=12)
-
-    ax.grid(zorder=0, alpha=0.2)
-    ax.set_axisbelow(True)
-
-    ax.axhline(
-        y=sig_strikes["sig_strikes_landed_per_minute"].median(),
-        linestyle="--",
-        color="black",
-        alpha=0.2,
-    )
-
-    ax.axvline(
-        x=sig_strikes["sig_strikes_absorbed_per_minute"].median(),
-        linestyle="--",
-        color="black",
-        alpha=0.2,
+    breakdown = stats.round_breakdown(ufcstats_id).drop(columns=["ufcstats_id"])
+    breakdown = breakdown.rename(
+        columns={
+            "round_group": "Round",
+            "rounds": "Rounds",
+            "sig_strikes_landed_per_minute": "Sig. Str. LPM",
+            "sig_strikes_absorbed_per_minute": "Sig. Str. APM",
+            "sig_strike_accuracy": "Sig. Str. Acc.",
+            "strikes_landed_per_minute": "Str. LPM",
+            "takedowns_per_15": "TD/15",
+            "knockdowns_per_15": "KD/15",
+            "control_share": "Ctrl. Pct.",
+            "control_against_share": "Ctrl. Agt. Pct.",
+            "fade_ratio": "Pace vs. R1",
+        }
     )
 
-    st.pyplot(ss_fig)
+    return breakdown.set_index("Round")
 
 
-def strikes_chart(ufcstats_id, weight_class):
+@profiled
+def rating_history(ufcstats_id):
     """
-    This function returns strikes chart
+    This function returns a fighter's Elo rating after each fight, by date
     """
 
-    all_fighter_career_stats = all_career_stats_df.loc[
-        (all_career_stats_df["weight_class"].str.contains(weight_class))
-    ]
-
-    weight_class_fights = all_fight_data_df.loc[
-        (all_fight_data_df["weight_class"].str.contains(weight_class))
-    ]
+    history = stats.rating_history(ufcstats_id)
 
-    average_strikes_landed = round(
-        weight_class_fights["fighter_total_strikes_landed"].sum()
-        / weight_class_fights["fight_time_seconds"].sum()
-        * 60,
-        2,
+    return history.set_index("event_date")[["rating_after"]].rename(
+        columns={"rating_after": "Elo Rating"}
     )
 
-    strikes = all_fighter_career_stats[
-        [
-            "ufcstats_id",
-            "strikes_landed_per_minute",
-            "strikes_absorbed_per_minute",
-            "fight_time_seconds_for",
-        ]
-    ]
 
-    strikes["color"] = "#BFBFBF"
-    strikes.loc[(strikes.ufcstats_id == ufcstats_id), "color"] = "#990000"
-    strikes = strikes.sort_values(by="color", ascending=False)
+@profiled
+def similar_fighters(ufcstats_id, same_division):
+    """
+    This function returns the fighters with the closest career stats, see
+    ufc_data.similar
+    """
 
-    s_fig = Figure()
-    ax = s_fig.subplots()
+    similar = stats.similar_fighters(ufcstats_id, same_division=same_division)
 
-    sns.scatterplot(
-        x=strikes["strikes_landed_per_minute"],
-        y=strikes["strikes_absorbed_per_minute"],
-        data=strikes,
-        hue=strikes["color"],
-        palette=dict({"#BFBFBF": "#BFBFBF", "#990000": "#990000"}),
-        s=(strikes["fight_time_seconds_for"] / 15),
-        legend=False,
-        ax=ax,
+    return similar.drop(columns=["ufcstats_id"]).rename(
+        columns={
+            "full_name": "Fighter",
+            "division": "Division",
+            "distance": "Distance",
+        }
     )
 
-    ax.set_xlabel("Strikes Landed Per Minute", fontsize=12)
-    ax.set_ylabel("Strikes Absorbed Per Minute", fontsize=12)
-
-    ax.grid(zorder=0, alpha=0.2)
-    ax.set_axisbelow(True)
-
-    ax.axhline(y=average_strikes_landed, linestyle="--", color="black", alpha=0.2)
-
-    ax.axvline(x=average_strikes_landed, linestyle="--", color="black", alpha=0.2)
 
-    st.pyplot(s_fig)
-
-
-def control_pct_chart(ufcstats_id, weight_class):
+@profiled
+def sig_strikes_chart(ufcstats_id, division):
     """
-    This function returns control percentage chart
+    This function starts rendering the sig strikes chart and returns a future of its png
     """
 
-    all_fighter_career_stats = all_career_stats_df.loc[
-        (all_career_stats_df["weight_class"].str.contains(weight_class))
-    ]
-    controls = all_fighter_career_stats[
-        [
-            "ufcstats_id",
-            "control_percentage",
-            "control_against_percentage",
-            "fight_time_seconds_for",
-        ]
-    ]
-
-    controls["color"] = "#BFBFBF"
-    controls.loc[(controls.ufcstats_id == ufcstats_id), "color"] = "#990000"
-    controls = controls.sort_values(by="color", ascending=False)
-
-    ctr_fig = Figure()
-    ax = ctr_fig.subplots()
-
-    sns.scatterplot(
-        x=controls["control_percentage"],
-        y=controls["control_against_percentage"],
-        data=controls,
-        hue=controls["color"],
-        palette=dict({"#BFBFBF": "#BFBFBF", "#990000": "#990000"}),
-        s=(controls["fight_time_seconds_for"] / 15),
-        legend=False,
-        ax=ax,
+    return render_async(
+        "sig_strikes", ufcstats_id, division_cohorts, division, data_version
     )
 
-    ax.set_xlabel("Control Percentage", fontsize=12)
-    ax.set_ylabel("Control Against Percentage", fontsize=12)
 
-    ax.grid(zorder=0, alpha=0.2)
-    ax.set_axisbelow(True)
+@profiled
+def strikes_chart(ufcstats_id, division):
+    """
+    This function starts rendering the strikes chart and returns a future of its png
+    """
 
-    ax.axhline(
-        y=controls["control_percentage"].median(),
-        linestyle="--",
-        color="black",
-        alpha=0.2,
+    return render_async(
+        "strikes", ufcstats_id, division_cohorts, division, data_version
     )
 
-    ax.axvline(
-        x=controls["control_against_percentage"].median(),
-        linestyle="--",
-        color="black",
-        alpha=0.2,
-    )
 
-    st.pyplot(ctr_fig)
+@profiled
+def control_pct_chart(ufcstats_id, division):
+    """
+    This function starts rendering the control percentage chart and returns a future of its png
+    """
 
+    return render_async(
+        "control_pct", ufcstats_id, division_cohorts, division, data_version
+    )
 
-def td_chart(ufcstats_id, weight_class):
-    all_fighter_career_stats = all_career_stats_df.loc[
-        (all_career_stats_df["weight_class"].str.contains(weight_class))
-    ]
 
-    takedowns = all_fighter_career_stats[
-        [
-            "ufcstats_id",
-            "takedown_accuracy",
-            "takedown_defence",
-            "fight_time_seconds_for",
-        ]
-    ]
+@profiled
+def td_chart(ufcstats_id, division):
+    """
+    This function starts rendering the takedowns chart and returns a future of its png
+    """
 
-    # removing where fighters have 0 and 0
-    takedowns = takedowns.loc[
-        (takedowns["takedown_accuracy"] > 0) & (takedowns["takedown_defence"] > 0)
-    ].reset_index()
+    return render_async("td", ufcstats_id, division_cohorts, division, data_version)
 
-    takedowns["color"] = "#BFBFBF"
-    takedowns.loc[(takedowns.ufcstats_id == ufcstats_id), "color"] = "#990000"
-    takedowns = takedowns.sort_values(by="color", ascending=False)
 
-    td_fig = Figure()
-    ax = td_fig.subplots()
+@profiled
+def avg_win_dk_chart(ufcstats_id, division):
+    """
+    This function starts rendering the average winning dk points chart and returns a future of its png
+    """
 
-    sns.scatterplot(
-        x=takedowns["takedown_accuracy"],
-        y=takedowns["takedown_defence"],
-        data=takedowns,
-        hue=takedowns["color"],
-        palette=dict({"#BFBFBF": "#BFBFBF", "#990000": "#990000"}),
-        s=(takedowns["fight_time_seconds_for"] / 15),
-        legend=False,
-        ax=ax,
+    return render_async(
+        "avg_win_dk", ufcstats_id, division_cohorts, division, data_version
     )
 
-    ax.set_xlabel("Takedown Accuracy (%)", fontsize=12)
-    ax.set_ylabel("Takedown Defence (%)", fontsize=12)
-
-    ax.grid(zorder=0, alpha=0.2)
-    ax.set_axisbelow(True)
 
-    ax.axhline(
-        y=takedowns["takedown_defence"].mean(), linestyle="--", color="black", alpha=0.2
-    )
+def show_chart(name, chart_png):
+    """
+    This function shows a chart once it has finished rendering
+    """
 
-    ax.axvline(
-        x=takedowns["takedown_accuracy"].mean(),
-        linestyle="--",
-        color="black",
-        alpha=0.2,
-    )
+    # the *_chart functions above only time submitting the render, so the
+    # wait for it is a section of its own
+    with profiler.section(f"show_chart({name})"):
+        chart = chart_png.result()
 
-    st.pyplot(td_fig)
+    st.image(chart, use_column_width=True)
 
 
-def avg_win_dk_chart(ufcstats_id, weight_class):
-    all_fighter_career_stats = all_career_stats_df.loc[
-        (all_career_stats_df["weight_class"].str.contains(weight_class))
-    ]
+def show_profile():
+    """
+    This function shows the run's timing panel, when profiling is on
+    """
 
-    avg_new_dk_pts = all_fighter_career_stats[
-        ["ufcstats_id", "avg_win_new_dk_score", "fight_time_seconds_for"]
-    ]
+    if not profiler.enabled:
+        return
 
-    # removing where fighters have nan
-    avg_new_dk_pts = avg_new_dk_pts.loc[
-        (avg_new_dk_pts["avg_win_new_dk_score"] > 0)
-    ].reset_index()
+    sections = pd.DataFrame(profiler.finish())
 
-    avg_new_dk_pts["color"] = "#BFBFBF"
-    avg_new_dk_pts.loc[(avg_new_dk_pts.ufcstats_id == ufcstats_id), "color"] = "#990000"
-    avg_new_dk_pts = avg_new_dk_pts.sort_values(by="color", ascending=False)
+    # its own row, as the run may have stopped before the key was drawn
+    profile_spacer1, profile_1, profile_spacer2 = st.columns((0.1, 3.2, 0.1))
 
-    avg_new_dk_pts_fig = Figure()
-    ax = avg_new_dk_pts_fig.subplots()
+    with profile_1:
+        with st.expander("Timing"):
+            st.caption(
+                f"Run {profiler.run_id}. Functions marked () also count towards "
+                "the section they were called from."
+            )
+            st.dataframe(sections.drop(columns=["run_id"]), hide_index=True, width=5000)
+            if profiler.profile_text:
+                st.caption(f"cProfile written to {profiler.profile_path}")
+                st.text(profiler.profile_text)
 
-    sns.scatterplot(
-        x=avg_new_dk_pts["avg_win_new_dk_score"],
-        y=avg_new_dk_pts["avg_win_new_dk_score"],
-        data=avg_new_dk_pts,
-        hue=avg_new_dk_pts["color"],
-        palette=dict({"#BFBFBF": "#BFBFBF", "#990000": "#990000"}),
-        s=(avg_new_dk_pts["fight_time_seconds_for"] / 15),
-        legend=False,
-        ax=ax,
-    )
 
-    ax.set_xlabel("Average Winning DK Points (New)", fontsize=12)
+def stop_page():
+    """
+    This function ends the run early, after finishing its profile, as
+    st.stop() skips the rest of the page
+    """
 
-    st.pyplot(avg_new_dk_pts_fig)
+    show_profile()
+    st.stop()
 
 
 # ==========================================================================
 # -------------------------------- SETUP -----------------------------------
 # ==========================================================================
-plt.style.use("default")
+matplotlib.style.use("default")
 
 st.set_page_config(
     page_title="MMA Fighter Dashboard",
@@ -367,184 +231,30 @@ st.set_page_config(
     layout="wide",
 )
 
+# ?profile=1 (or UFC_PROFILE=1) times every section below, see ufc_data.profiling
+profiler = start_profiler(st.experimental_get_query_params())
+
 # ==========================================================================
 # ----------------------------- GATHER DATA --------------------------------
 # ==========================================================================
+profiler.lap("GATHER DATA")
 
-# GETTING ALL FIGHTERS
-all_fighters_df = pd.read_csv(
-    "https://raw.githubusercontent.com/mjester93/ufc-data/main/fighters.csv?raw=True",
-    low_memory=False,
-)
-
-# GETTING CAREER STATS
-all_career_stats_df = pd.read_csv(
-    "https://raw.githubusercontent.com/mjester93/ufc-data/main/fighter_career_stats.csv?raw=True",
-    low_memory=False,
-)
-
-# GETTING INDIVIDUAL FIGHT DATA
-all_fight_data = pd.read_csv(
-    "https://raw.githubusercontent.com/mjester93/ufc-data/main/fight_data.csv?raw=True",
-    low_memory=False,
-    thousands=",",
-)
-all_fight_data["event_date"] = pd.to_datetime(all_fight_data["event_date"])
-
-all_fight_data_df = all_fight_data.sort_values(by=["event_date"], ascending=False)
-
-# getting average winning new dk score for each fighter and adding it to all_career_stats_df
-all_new_winning_dk_scores_df = (
-    all_fight_data_df.loc[all_fight_data_df["fighter_winner"] == True]
-    .groupby(["ufcstats_id"])[["ufcstats_id", "fighter_new_dk_score"]]
-    .mean("fighter_new_dk_score")
-    .rename(columns={"fighter_new_dk_score": "avg_win_new_dk_score"})
-    .reset_index()
-)
-
-all_career_stats_df = all_career_stats_df.merge(
-    all_new_winning_dk_scores_df,
-    how="left",
-    left_on="ufcstats_id",
-    right_on="ufcstats_id",
-)
-
-# getting most-recent weight_class and adding it to all_fighters_df
-most_recent_fighters_with_weights = all_fight_data_df.drop_duplicates(
-    subset=["ufcstats_id"]
-)[["ufcstats_id", "weight_class"]]
-
-all_fighters_df = all_fighters_df.merge(
-    most_recent_fighters_with_weights, left_on="ufcstats_id", right_on="ufcstats_id"
-)
+# GETTING ALL FIGHTERS, CAREER STATS AND INDIVIDUAL FIGHT DATA
+# most-recent weight class, avg winning dk score, strikes and control are
+# precomputed by `python -m ufc_data.build` (built here on first run if missing)
+# the lookups below are in-memory row slices, or indexed queries with
+# UFC_DATA_BACKEND=sqlite, see ufc_data.sqlstore
+fighter_index, division_cohorts = load_lookups()
+fighter_search = load_fighter_search(fighter_index)
 
-# getting most-recent weight_class and adding it to all_career_stats_df
-all_career_stats_df = all_career_stats_df.merge(
-    most_recent_fighters_with_weights, left_on="ufcstats_id", right_on="ufcstats_id"
-)
-
-# getting strikes and adding it to all_career_stats_df
-strikes_for_df = (
-    all_fight_data.groupby("ufcstats_id")
-    .agg(
-        {
-            "fighter_total_strikes_landed": "sum",
-            "fighter_total_strikes_attempted": "sum",
-            "fight_time_seconds": "sum",
-        }
-    )
-    .reset_index()
-)
-
-strikes_against_df = (
-    all_fight_data.groupby("opp_ufcstats_id")
-    .agg({"fighter_total_strikes_landed": "sum", "fight_time_seconds": "sum"})
-    .reset_index()
-)
-
-strikes_for_df["strikes_landed_per_minute"] = round(
-    strikes_for_df["fighter_total_strikes_landed"]
-    / strikes_for_df["fight_time_seconds"]
-    * 60,
-    2,
-)
-
-strikes_for_df["strike_accuracy"] = (
-    strikes_for_df["fighter_total_strikes_landed"]
-    / strikes_for_df["fighter_total_strikes_attempted"]
-    * 100
-)
-
-strikes_against_df["strikes_absorbed_per_minute"] = round(
-    strikes_against_df["fighter_total_strikes_landed"]
-    / strikes_against_df["fight_time_seconds"]
-    * 60,
-    2,
-)
-
-final_strikes_df = strikes_for_df.merge(
-    strikes_against_df,
-    left_on="ufcstats_id",
-    right_on="opp_ufcstats_id",
-    suffixes=("_for", "_against"),
-)[
-    [
-        "ufcstats_id",
-        "strikes_landed_per_minute",
-        "strikes_absorbed_per_minute",
-        "strike_accuracy",
-    ]
-]
-
-all_career_stats_df = all_career_stats_df.merge(
-    final_strikes_df, left_on="ufcstats_id", right_on="ufcstats_id"
-)
-
-# getting control percentage / control against percentage
-control_for_df = (
-    all_fight_data.groupby("ufcstats_id")
-    .agg({"fighter_total_control": "sum", "fight_time_seconds": "sum"})
-    .reset_index()
-)
-
-control_against_df = (
-    all_fight_data.groupby("opp_ufcstats_id")
-    .agg({"fighter_total_control": "sum", "fight_time_seconds": "sum"})
-    .reset_index()
-)
-
-control_for_df["control_percentage"] = round(
-    control_for_df["fighter_total_control"]
-    / control_for_df["fight_time_seconds"]
-    * 100,
-    2,
-)
-
-control_against_df["control_against_percentage"] = round(
-    control_against_df["fighter_total_control"]
-    / control_against_df["fight_time_seconds"]
-    * 100,
-    2,
-)
-
-final_control_df = control_for_df.merge(
-    control_against_df,
-    left_on="ufcstats_id",
-    right_on="opp_ufcstats_id",
-    suffixes=("_for", "_against"),
-)[
-    [
-        "ufcstats_id",
-        "fighter_total_control_for",
-        "fight_time_seconds_for",
-        "fighter_total_control_against",
-        "control_percentage",
-        "control_against_percentage",
-    ]
-]
-
-all_career_stats_df = all_career_stats_df.merge(
-    final_control_df, left_on="ufcstats_id", right_on="ufcstats_id"
-)
-
-# Getting takedowns absorbed
-
-# GETTING EXTERNAL IDS
-external_ids_df = pd.read_csv(
-    "https://raw.githubusercontent.com/mjester93/ufc-data/main/external_ids.csv?raw=True",
-    low_memory=False,
-    dtype={"espn_id": str, "sherdog_id": str},
-)[["ufcstats_id", "espn_id", "sherdog_id"]]
-
-# Merging with all_fighters_df
-all_fighters_df = all_fighters_df.merge(
-    external_ids_df, how="left", left_on="ufcstats_id", right_on="ufcstats_id"
-)
+# the division charts are cached per data version, see ufc_data.charts
+data_version = load_data_version()
 
 
 # ==========================================================================
 # ---------------------------- ROW 1 (TITLE) -------------------------------
 # ==========================================================================
+profiler.lap("ROW 1 (TITLE)")
 row1_spacer1, row1_1, row1_spacer2, row1_2, row1_spacer3 = st.columns(
     (0.1, 2, 1.5, 1, 0.1)
 )
@@ -561,32 +271,47 @@ with row1_2:
 # ==========================================================================
 # -------------------------------- ROW 2 -----------------------------------
 # ==========================================================================
+profiler.lap("ROW 2")
 
 row2_spacer1, row2_1, row2_spacer2, row2_2, row2_spacer3 = st.columns(
     (0.1, 1.6, 0.1, 1.6, 0.1)
 )
 
 with row2_1:
-    records = all_fighters_df.sort_values(by=["full_name"]).to_dict("records")
-
-    selected_data = st.selectbox(
+    # only the ids of the best matches go to the widget, see ufc_data.search
+    query = st.text_input("Search for a Fighter", placeholder="Name or nickname")
+    matches = fighter_search.search(query)
+    if not matches:
+        st.warning(f"No fighters match '{query}'.")
+        stop_page()
+
+    ufcstats_id = st.selectbox(
         "Select a Fighter",
-        options=records,
-        format_func=lambda record: f"{record['full_name']}",
+        options=matches,
+        format_func=fighter_search.label,
     )
 
-    ufcstats_id = selected_data.get("ufcstats_id")
+    fighter_filter = fighter_index.fighter_row(ufcstats_id)
+    fighter_career_stats_filter = fighter_index.career_row(ufcstats_id)
+
+    selected_data = fighter_filter.iloc[0]
+
     fighter_name = selected_data.get("full_name")
-    weight_class = selected_data.get("weight_class")
-    if type(weight_class) is not float:
-        weight_class = weight_class.replace("UFC", "").replace("Title", "").strip()
+    division = selected_data.get("division")
 
     espn_id = selected_data.get("espn_id")
     sherdog_id = selected_data.get("sherdog_id")
 
+# the charts above the fold render on the chart pool while the profile and
+# fight log are drawn
+sig_strikes_png = sig_strikes_chart(ufcstats_id, division)
+strikes_png = strikes_chart(ufcstats_id, division)
+control_pct_png = control_pct_chart(ufcstats_id, division)
+
 # ==========================================================================
 # --------------------------- FIGHTER INFO ---------------------------------
 # ==========================================================================
+profiler.lap("FIGHTER INFO")
 
 st.write("")
 (
@@ -607,8 +332,6 @@ with row1_1:
         "https://a.espncdn.com/combiner/i?img=/i/headshots/mma/players/full/"
     )
 
-    fighter_filter = all_fighters_df.loc[all_fighters_df["ufcstats_id"] == ufcstats_id]
-
     if len(str(espn_id)) < 5:
         st.image(
             "https://upload.wikimedia.org/wikipedia/commons/c/cd/Portrait_Placeholder_Square.png"
@@ -631,14 +354,6 @@ with row1_2:
     st.subheader(" ")
     st.write(" ")
 
-    fighter_filter = all_fighters_df.loc[all_fighters_df["ufcstats_id"] == ufcstats_id]
-    fighter_career_stats_filter = all_career_stats_df.loc[
-        all_career_stats_df["ufcstats_id"] == ufcstats_id
-    ]
-    fighter_fights = all_fight_data_df.loc[
-        all_fight_data_df["ufcstats_id"] == ufcstats_id
-    ]
-
     wins = fighter_filter["wins"].astype(int).to_string(index=False).lstrip()
     losses = fighter_filter["losses"].astype(int).to_string(index=False).lstrip()
     draws = fighter_filter["draws"].to_string(index=False).lstrip()
@@ -650,25 +365,27 @@ with row1_2:
 
     st.text(f"Name: {fighter_filter['full_name'].to_string(index=False).lstrip()}")
     st.text(f"Nickname: {nickname}")
-    st.text(
-        f"Date of Birth: {fighter_career_stats_filter['date_of_birth'].to_string(index=False).lstrip()}"
+    date_of_birth = (
+        fighter_career_stats_filter["date_of_birth"]
+        .dt.strftime("%b %d, %Y")
+        .fillna("--")
     )
+    st.text(f"Date of Birth: {date_of_birth.to_string(index=False).lstrip()}")
     st.text(f"Height: {fighter_filter['height'].to_string(index=False).lstrip()}")
     st.text(
         f"Weight: {fighter_filter['weight'].astype(int).to_string(index=False).lstrip()}"
     )
-    st.text(f"Weight Class: {weight_class}")
+    st.text(f"Weight Class: {division}")
     st.text(f"Reach: {fighter_filter['reach'].to_string(index=False).lstrip()}")
     st.text(f"Stance: {fighter_filter['stance'].to_string(index=False).lstrip()}")
     st.text(f"Record: {record}")
 
+    rating = stats.fighter_rating(ufcstats_id)
+    st.text(f"Elo Rating: {'--' if rating is None else round(rating)}")
+
 with row1_3:
     st.subheader("Fighter Stats")
 
-    fighter_career_stats_filter = all_career_stats_df.loc[
-        all_career_stats_df["ufcstats_id"] == ufcstats_id
-    ]
-
     sig_str_acc = (
         fighter_career_stats_filter["sig_strike_accuracy"]
         .astype(int)
@@ -712,16 +429,18 @@ with row1_3:
         f"*SApM: {fighter_career_stats_filter['strikes_absorbed_per_minute'].astype(float).to_string(index=False).lstrip()}"
     )
     st.text(f"*Str. Acc: {str_acc}%")
+    st.text(
+        f"*Adj. SSLpM: {fighter_career_stats_filter['adj_sig_strikes_landed_per_minute'].astype(float).to_string(index=False).lstrip()}"
+    )
+    st.text(
+        f"*Adj. SSApM: {fighter_career_stats_filter['adj_sig_strikes_absorbed_per_minute'].astype(float).to_string(index=False).lstrip()}"
+    )
     st.text(f"*Fight Time (mins): {fight_time_mins}")
 
 with row1_4:
     st.subheader(" ")
     st.write(" ")
 
-    fighter_career_stats_filter = all_career_stats_df.loc[
-        all_career_stats_df["ufcstats_id"] == ufcstats_id
-    ]
-
     td_acc = (
         fighter_career_stats_filter["takedown_accuracy"]
         .astype(int)
@@ -763,11 +482,18 @@ with row1_4:
     )
     st.text(f"*Ctrl. Pct.: {ctrl_pct}%")
     st.text(f"*Ctrl. Agt. Pct.: {ctrl_agt_pct}%")
+    st.text(
+        f"*Adj. Ctrl. Pct.: {fighter_career_stats_filter['adj_control_percentage'].astype(float).to_string(index=False).lstrip()}%"
+    )
+    st.text(
+        f"*Adj. Ctrl. Agt. Pct.: {fighter_career_stats_filter['adj_control_against_percentage'].astype(float).to_string(index=False).lstrip()}%"
+    )
     st.text(f"*Avg. Win. DK Pts.: {avg_win_new_dk_score}")
 
 # ==========================================================================
 # ---------------------------- FIGHTER LOGS --------------------------------
 # ==========================================================================
+profiler.lap("FIGHTER LOGS")
 
 st.write("")
 row2_space1, row2_1, row2_space2 = st.columns((0.1, 3, 0.1))
@@ -775,22 +501,73 @@ row2_space1, row2_1, row2_space2 = st.columns((0.1, 3, 0.1))
 
 with row2_1:
     st.subheader("Fight Log (2018-present)")
-    has_data = len(
-        all_fight_data_df.loc[all_fight_data_df["ufcstats_id"] == ufcstats_id]
-    )
+    has_data = fighter_index.fight_count(ufcstats_id)
     if has_data > 0:
-        st.dataframe(fight_logs(ufcstats_id), width=5000, height=1000)
+        options = stats.fight_log_options(ufcstats_id)
+        (
+            log_opponent,
+            log_method,
+            log_year,
+            log_sort,
+            log_order,
+            log_page,
+        ) = st.columns((1.5, 1.5, 1, 1.5, 1, 1))
+
+        # None is "All"
+        opponent = log_opponent.selectbox(
+            "Opponent", [None] + options["opponent"], format_func=lambda x: x or "All"
+        )
+        method = log_method.selectbox(
+            "Method", [None] + options["method"], format_func=lambda x: x or "All"
+        )
+        year = log_year.selectbox(
+            "Year", [None] + options["year"], format_func=lambda x: x or "All"
+        )
+        sort_by = log_sort.selectbox(
+            "Sort by",
+            list(FIGHT_LOG_LABELS),
+            index=list(FIGHT_LOG_LABELS).index("event_date"),
+            format_func=FIGHT_LOG_LABELS.get,
+        )
+        ascending = log_order.selectbox("Order", ["Descending", "Ascending"]) == (
+            "Ascending"
+        )
+        filters = {"opponent": opponent, "method": method, "year": year}
+
+        # a new fighter or filter starts again from the first page
+        page_key = f"fight_log_page_{ufcstats_id}_{opponent}_{method}_{year}"
+        page = st.session_state.get(page_key, 1)
+
+        # the page comes with the filtered count, so the page input below
+        # is drawn after it instead of counting the fights twice
+        fight_log, total = fight_logs(
+            ufcstats_id, page - 1, sort_by=sort_by, ascending=ascending, **filters
+        )
+        pages = max(1, -(-total // FIGHT_LOG_PAGE_SIZE))
+        log_page.number_input(
+            f"Page (of {pages})",
+            min_value=1,
+            max_value=pages,
+            value=1,
+            key=page_key,
+        )
+        st.dataframe(fight_log, width=5000, hide_index=True)
+        first = (page - 1) * FIGHT_LOG_PAGE_SIZE
+        st.caption(
+            f"Fights {min(first + 1, total)}-{first + len(fight_log)} of {total}"
+        )
 
     else:
         st.error(
             "Oops! This player did not fight during the selected time period. "
             "Change the filter and try again."
         )
-        st.stop()
+        stop_page()
 
 # ==========================================================================
 # --------------------------- FIGHTER CHARTS -------------------------------
 # ==========================================================================
+profiler.lap("FIGHTER CHARTS (ROW 3)")
 
 st.write("")
 row3_space1, row3_1, row3_space2, row3_2, row3_space3, row3_3, row3_space4 = st.columns(
@@ -799,39 +576,95 @@ row3_space1, row3_1, row3_space2, row3_2, row3_space3, row3_3, row3_space4 = st.
 
 with row3_1:
     st.subheader("Sig. Strikes by Class")
-    sig_strikes_chart(ufcstats_id, weight_class)
+    show_chart("sig_strikes", sig_strikes_png)
 
 with row3_2:
     st.subheader("Total Strikes by Class (2018-present)")
-    strikes_chart(ufcstats_id, weight_class)
+    show_chart("strikes", strikes_png)
 
 with row3_3:
     st.subheader("Control Percentage by Class (2018-present)")
-    control_pct_chart(ufcstats_id, weight_class)
+    show_chart("control_pct", control_pct_png)
 
 
 # ==========================================================================
 # --------------------------- FIGHTER CHARTS -------------------------------
 # ==========================================================================
+profiler.lap("FIGHTER CHARTS (ROW 4)")
 
 st.write("")
 row4_space1, row4_1, row4_space2, row4_2, row4_space3, row4_3, row4_space4 = st.columns(
     (0.15, 1.5, 0.00000001, 1.5, 0.00000001, 1.5, 0.15)
 )
 
+# these charts are below the fold, so they only render once asked for
 with row4_1:
-    st.subheader("Takedowns by Class")
-    td_chart(ufcstats_id, weight_class)
+    show_more_charts = st.toggle("Show takedown and DK points charts")
+
+if show_more_charts:
+    td_png = td_chart(ufcstats_id, division)
+    avg_win_dk_png = avg_win_dk_chart(ufcstats_id, division)
+
+    with row4_1:
+        st.subheader("Takedowns by Class")
+        show_chart("td", td_png)
+
+    with row4_3:
+        st.subheader("Avg. Win. DK Pts by Class (2018-present)")
+        show_chart("avg_win_dk", avg_win_dk_png)
+
+
+# ==========================================================================
+# --------------------------- ROUND BY ROUND -------------------------------
+# ==========================================================================
+profiler.lap("ROUND BY ROUND")
+
+st.write("")
+row5_space1, row5_1, row5_space2, row5_2, row5_space3 = st.columns(
+    (0.15, 2, 0.00000001, 1.5, 0.15)
+)
+
+fighter_rounds = round_breakdown(ufcstats_id)
+
+with row5_1:
+    st.subheader("Round by Round")
+    st.dataframe(fighter_rounds, width=5000)
 
+with row5_2:
+    st.subheader("Sig. Strikes Per Minute by Round")
+    st.bar_chart(fighter_rounds[["Sig. Str. LPM", "Sig. Str. APM"]])
 
-with row4_3:
-    st.subheader("Avg. Win. DK Pts by Class (2018-present)")
-    avg_win_dk_chart(ufcstats_id, weight_class)
+
+# ==========================================================================
+# ------------------- RATING HISTORY / SIMILAR FIGHTERS --------------------
+# ==========================================================================
+profiler.lap("RATING HISTORY / SIMILAR FIGHTERS")
+
+st.write("")
+row7_space1, row7_1, row7_space2, row7_2, row7_space3 = st.columns(
+    (0.15, 2, 0.00000001, 1.5, 0.15)
+)
+
+with row7_1:
+    st.subheader("Elo Rating History")
+    fighter_ratings = rating_history(ufcstats_id)
+    if fighter_ratings.empty:
+        st.text("No rated fights yet")
+    else:
+        st.line_chart(fighter_ratings)
+
+with row7_2:
+    st.subheader("Similar Fighters")
+    same_division = st.toggle("Same division only", value=True)
+    st.dataframe(
+        similar_fighters(ufcstats_id, same_division), hide_index=True, width=5000
+    )
 
 
 # ==========================================================================
 # -------------------------------- KEY -------------------------------------
 # ==========================================================================
+profiler.lap("KEY")
 row6_spacer1, row6_1, row6_spacer2 = st.columns((0.1, 3.2, 0.1))
 
 with row6_1:
@@ -875,4 +708,28 @@ with row6_1:
         **Ctrl. Agt. Pct.:** Control Against Percentage (total number of seconds being controlled / toglt fight time in seconds)
 
         **Avg. Win. DK Pts.** Average DraftKings Points (new scoring) in winning fights
+
+        **Adj.:** Opponent-adjusted, what the fighter would land (or have landed against them) against an \
+        average opponent, fitted over every fight at once so a record built on weak or strong opposition \
+        is corrected for it. Fighters with little fight time stay close to the average
+
+        **Similar Fighters:** The fighters whose career stats above are closest to this fighter's, \
+        with every stat standardized so each counts the same. A smaller distance is a closer match
+
+        **Round by Round:** Stats split into rounds 1, 2, 3 and the championship rounds (4-5). \
+        Sig. Str. LPM/APM are significant strikes landed/absorbed per minute of that round, \
+        TD/15 and KD/15 are takedowns and knockdowns per 15 minutes and Ctrl. Pct. is the share of the round \
+        spent in control. **Pace vs. R1** is the Sig. Str. LPM divided by the round 1 Sig. Str. LPM \
+        (below 1 means the fighter slows down)
+
+        **Elo Rating:** Rating from every UFC fight since 2018, processed in date order. Every fighter \
+        starts at 1500, a win over a higher rated opponent gains more than a win over a lower rated one, \
+        draws count as half a win and no contests are skipped
         """
+
+
+# ==========================================================================
+# ------------------------------ PROFILING ---------------------------------
+# ==========================================================================
+
+show_profile()
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ufc_data.divisions import DIVISIONS, normalize_weight_class
+from ufc_data.export import ALL_DIVISIONS, EXPORT_COLUMNS, export_model
+from ufc_data.loader import DATA_DIR
+from ufc_data.reconcile import load_fights
+
+
+# the pairs of columns whose ratio a *_def_pct column is, in the export and
+# in the checked-in file
+DEF_PCT_RATIOS = {
+    "strike_def_pct": (
+        "strikes_absorbed_per_min",
+        "strikes_att_against_per_min",
+    ),
+    "sig_strike_def_pct": (
+        "sig_strikes_absorbed_per_min",
+        "sig_strikes_att_against_per_min",
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def fight_data():
+    return load_fights()
+
+
+@pytest.fixture(scope="module")
+def fighter_names(fight_data):
+    return (
+        pd.Series(
+            fight_data["fighter_name"].to_numpy(dtype=object),
+            index=fight_data["ufcstats_id"].to_numpy(dtype=object),
+        )
+        .groupby(level=0)
+        .first()
+    )
+
+
+@pytest.fixture(scope="module")
+def model(fight_data, fighter_names):
+    return export_model(fight_data, fighter_names)
+
+
+def test_columns_match_the_checked_in_file(model):
+    """
+    This function checks that the export has the checked-in file's columns
+    in its order
+    """
+
+    checked_in = pd.read_csv(f"{DATA_DIR}/fighter-export-model.csv", nrows=0)
+
+    assert list(model.columns) == list(checked_in.columns) == EXPORT_COLUMNS
+
+
+@pytest.mark.parametrize("column", DEF_PCT_RATIOS)
+def test_def_pct_is_the_opponents_accuracy_as_in_the_checked_in_file(model, column):
+    """
+    This function checks that a *_def_pct column is the share of the
+    opponent's attempts that landed, both in the checked-in file and the
+    export, rather than 1 minus it
+    """
+
+    absorbed, attempted = DEF_PCT_RATIOS[column]
+    checked_in = pd.read_csv(f"{DATA_DIR}/fighter-export-model.csv")
+
+    for df in [checked_in, model]:
+        has = df[attempted] > 0
+        np.testing.assert_allclose(
+            df.loc[has, column],
+            df.loc[has, absorbed] / df.loc[has, attempted],
+            # both per-minute rates are rounded to 2 decimals
+            rtol=0.02,
+        )
+
+
+def test_def_pct_from_the_opponents_rows(fight_data, model):
+    """
+    This function checks each fighter's *_def_pct against their opponents'
+    landed and attempted totals summed straight from the fight table
+    """
+
+    against = fight_data.groupby("opp_ufcstats_id", observed=True)[
+        [
+            "fighter_total_strikes_landed",
+            "fighter_total_strikes_attempted",
+            "fighter_total_sig_strikes_landed",
+            "fighter_total_sig_strikes_attempted",
+            "fighter_total_takedowns",
+            "fighter_total_takedowns_attempted",
+        ]
+    ].sum()
+    against.index = against.index.astype(object)
+    rates = model.set_index("ufcstats_id")
+
+    for column, name in [
+        ("strike_def_pct", "strikes"),
+        ("sig_strike_def_pct", "sig_strikes"),
+        ("td_def_pct", "takedowns"),
+    ]:
+        landed = against[
+            "fighter_total_takedowns"
+            if name == "takedowns"
+            else f"fighter_total_{name}_landed"
+        ]
+        attempted = against[f"fighter_total_{name}_attempted"]
+        expected = (landed / attempted.where(attempted > 0)).round(4)
+
+        np.testing.assert_allclose(
+            rates[column].to_numpy(dtype=float),
+            expected.reindex(rates.index).to_numpy(dtype=float),
+            atol=1e-4,
+        )
+
+
+def test_weight_class_is_all_divisions_by_default(model):
+    """
+    This function checks that without a division option every fighter has
+    one row, with weight_class "N/A"
+    """
+
+    assert (model["weight_class"] == ALL_DIVISIONS).all()
+    assert not model["ufcstats_id"].duplicated().any()
+
+
+def test_division_keeps_only_its_fights(fight_data, fighter_names):
+    """
+    This function checks that --division writes only the fighters with
+    fights in it, with the division as weight_class
+    """
+
+    divisions = normalize_weight_class(fight_data["weight_class"])
+    welterweights = set(
+        fight_data.loc[divisions == "Welterweight", "ufcstats_id"].astype(object)
+    )
+
+    model = export_model(fight_data, fighter_names, division="Welterweight")
+
+    assert (model["weight_class"] == "Welterweight").all()
+    assert set(model["ufcstats_id"]) == welterweights
+
+
+def test_by_division_has_a_row_per_division_fought_in(fight_data, fighter_names):
+    """
+    This function checks that --by-division writes one row per fighter and
+    division they fought in
+    """
+
+    divisions = normalize_weight_class(fight_data["weight_class"])
+    fought_in = (
+        pd.DataFrame(
+            {
+                "ufcstats_id": fight_data["ufcstats_id"].to_numpy(dtype=object),
+                "weight_class": divisions.to_numpy(dtype=object),
+            }
+        )
+        .dropna()
+        .drop_duplicates()
+    )
+
+    model = export_model(fight_data, fighter_names, by_division=True)
+
+    assert set(model["weight_class"]) <= set(DIVISIONS)
+    assert set(zip(model["ufcstats_id"], model["weight_class"])) == set(
+        zip(fought_in["ufcstats_id"], fought_in["weight_class"])
+    )
+
+
+def test_jobs_match_one_process(fight_data, fighter_names, model):
+    """
+    This function checks that sharding the fighters across processes gives
+    the same export as one process
+    """
+
+    pd.testing.assert_frame_equal(
+        export_model(fight_data, fighter_names, jobs=2), model
+    )
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ufc_data import ratings
+
+
+@pytest.fixture(scope="module")
+def bouts():
+    return ratings.load_bouts()
+
+
+def rate(monkeypatch, bouts, directory, full=False):
+    """
+    This function updates the ratings in directory from bouts and returns
+    (the update's summary, the stored ratings, the stored history)
+    """
+
+    monkeypatch.setattr(ratings, "load_bouts", lambda: bouts.reset_index(drop=True))
+    summary = ratings.update_ratings(full=full, directory=str(directory))
+    stored, history, _ = ratings.read_ratings(str(directory))
+
+    return summary, stored.sort_index(), history
+
+
+def without_last_event(bouts):
+    return bouts.loc[bouts["event_id"] != bouts["event_id"].iloc[-1]]
+
+
+def without_last_bout(bouts):
+    return bouts.iloc[:-1]
+
+
+def with_changed_result(bouts):
+    changed = bouts.copy()
+    position = changed.index[len(changed) // 2]
+    changed.loc[position, "score_a"] = 1 - changed.loc[position, "score_a"]
+    return changed
+
+
+def without_a_bout(bouts):
+    return bouts.drop(index=bouts.index[len(bouts) // 3])
+
+
+def with_moved_bout(bouts):
+    moved = bouts.copy()
+    moved.loc[moved.index[len(moved) // 4], "event_date"] += pd.Timedelta(days=1)
+    return moved
+
+
+# (bouts rated first, bouts rated incrementally after), from the full bouts
+SCENARIOS = {
+    "new event": (without_last_event, lambda bouts: bouts),
+    "new bout in a rated event": (without_last_bout, lambda bouts: bouts),
+    "changed result": (lambda bouts: bouts, with_changed_result),
+    "removed bout": (lambda bouts: bouts, without_a_bout),
+    "moved bout": (lambda bouts: bouts, with_moved_bout),
+    "nothing new": (lambda bouts: bouts, lambda bouts: bouts),
+}
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_incremental_update_equals_full_replay(scenario, bouts, monkeypatch, tmp_path):
+    """
+    This function checks that rating only what changed since the stored
+    history gives the same ratings and history as rating everything again
+    """
+
+    before, after = (make(bouts) for make in SCENARIOS[scenario])
+
+    rate(monkeypatch, before, tmp_path / "incremental")
+    _, incremental, incremental_history = rate(
+        monkeypatch, after, tmp_path / "incremental"
+    )
+    _, full, full_history = rate(monkeypatch, after, tmp_path / "full", full=True)
+
+    assert incremental.index.equals(full.index)
+    np.testing.assert_allclose(incremental["rating"], full["rating"])
+    np.testing.assert_array_equal(incremental["fights"], full["fights"])
+
+    assert len(incremental_history) == len(full_history)
+    np.testing.assert_array_equal(
+        incremental_history["fight_id"].astype(str),
+        full_history["fight_id"].astype(str),
+    )
+    np.testing.assert_allclose(
+        incremental_history["rating_after"], full_history["rating_after"]
+    )
+
+
+def test_new_event_only_rates_its_bouts(bouts, monkeypatch, tmp_path):
+    """
+    This function checks that a new event is appended to the stored history
+    instead of replaying every bout
+    """
+
+    rate(monkeypatch, without_last_event(bouts), tmp_path)
+    summary, _, _ = rate(monkeypatch, bouts, tmp_path)
+
+    assert not summary["replayed"]
+    assert summary["rated_events"] == 1
+    assert summary["rated_bouts"] == len(bouts) - len(without_last_event(bouts))
@@ -0,0 +1,188 @@
+import pandas as pd
+import pytest
+
+from ufc_data.loader import load_table
+from ufc_data.reconcile import KEY_COLUMNS, REPORT_COLUMNS, reconcile
+
+
+PREFERRED = {
+    "fight_data_2019_2020": {
+        "dates": ["2019-01-01", "2020-12-31"],
+        "columns": ["fighter_name", "opp_name"],
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def fights():
+    """
+    This function returns four fight_data rows: two from 2019, one from 2022
+    and one from 2023
+    """
+
+    fight_data = load_table("fight_data").astype(
+        {"fighter_name": object, "referee": object}
+    )
+    years = fight_data["event_date"].dt.year
+
+    return pd.concat(
+        [
+            fight_data.loc[years == 2019].iloc[:2],
+            fight_data.loc[years == 2022].iloc[:1],
+            fight_data.loc[years == 2023].iloc[:1],
+        ],
+        ignore_index=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def reconciled(fights):
+    """
+    This function returns (canonical table, report) of three sources that
+    overlap on purpose:
+
+    - the 2019-2020 file renames the first 2019 fighter and changes their DK
+      score, and renames the 2022 fighter
+    - new-fight-stats has the second 2019 row twice, the second time with
+      another referee, and the 2023 row nobody else has
+    """
+
+    fight_data = fights.iloc[:3]
+
+    accurate = fights.iloc[[0, 2]].drop(columns=["time_format"])
+    accurate.loc[:, "fighter_name"] = "Renamed"
+    accurate.loc[accurate.index[0], "fighter_new_dk_score"] += 1
+
+    new_fight_stats = fights.iloc[[1, 1, 3]].reset_index(drop=True)
+    new_fight_stats.loc[1, "referee"] = "Another Referee"
+
+    tables = {
+        "fight_data": fight_data.reset_index(drop=True),
+        "new_fight_stats": new_fight_stats,
+        "fight_data_2019_2020": accurate.reset_index(drop=True),
+    }
+
+    return reconcile(tables, PREFERRED)
+
+
+def canonical_row(canonical, row):
+    keys = canonical[KEY_COLUMNS].astype(object)
+    found = canonical.loc[
+        (keys["fight_id"] == row["fight_id"]).to_numpy()
+        & (keys["ufcstats_id"] == row["ufcstats_id"]).to_numpy()
+    ]
+    assert len(found) == 1
+
+    return found.iloc[0]
+
+
+def report_row(report, change, row, source):
+    found = report.loc[
+        (report["change"] == change)
+        & (report["fight_id"] == row["fight_id"])
+        & (report["ufcstats_id"] == row["ufcstats_id"])
+        & (report["source"] == source)
+    ]
+    assert len(found) == 1
+
+    return found.iloc[0]
+
+
+def test_every_key_is_kept_once(fights, reconciled):
+    """
+    This function checks that the canonical table has one row per key of
+    any source
+    """
+
+    canonical, _ = reconciled
+
+    assert len(canonical) == len(fights)
+    assert not canonical.duplicated(subset=KEY_COLUMNS).any()
+    assert canonical_row(canonical, fights.iloc[3])["referee"] == (
+        fights.iloc[3]["referee"]
+    )
+
+
+def test_priority_source_wins_outside_the_preferred_columns(fights, reconciled):
+    """
+    This function checks that fight_data keeps its DK score and its 2022
+    name, and that each discarded value is reported next to the kept one
+    """
+
+    canonical, report = reconciled
+    first, later = fights.iloc[0], fights.iloc[2]
+
+    assert canonical_row(canonical, first)["fighter_new_dk_score"] == (
+        first["fighter_new_dk_score"]
+    )
+    assert canonical_row(canonical, later)["fighter_name"] == later["fighter_name"]
+
+    score = report_row(report, "conflict", first, "fight_data_2019_2020")
+    assert score["kept"] == "fight_data"
+    assert score["columns"] == "fighter_new_dk_score"
+    assert score["values"] == (
+        f"fighter_new_dk_score={first['fighter_new_dk_score'] + 1} "
+        f"(kept {first['fighter_new_dk_score']})"
+    )
+    assert score["reason"] == (
+        "fight_data ranks before fight_data_2019_2020 in SOURCE_PRIORITY"
+    )
+
+    name = report_row(report, "conflict", later, "fight_data_2019_2020")
+    assert name["columns"] == "fighter_name"
+    assert name["values"] == f"fighter_name=Renamed (kept {later['fighter_name']})"
+
+
+def test_preferred_columns_are_taken_in_their_dates(fights, reconciled):
+    """
+    This function checks that the 2019-2020 file's name replaces fight_data's
+    in 2019, and that the replaced value is reported against fight_data
+    """
+
+    canonical, report = reconciled
+    first = fights.iloc[0]
+
+    assert canonical_row(canonical, first)["fighter_name"] == "Renamed"
+
+    name = report_row(report, "conflict", first, "fight_data")
+    assert name["kept"] == "fight_data_2019_2020"
+    assert name["columns"] == "fighter_name"
+    assert name["values"] == f"fighter_name={first['fighter_name']} (kept Renamed)"
+    assert name["reason"] == (
+        "fight_data_2019_2020 is preferred for fighter_name, opp_name "
+        "in fights from 2019-01-01 to 2020-12-31"
+    )
+
+
+def test_repeated_key_is_a_duplicate(fights, reconciled):
+    """
+    This function checks that a key repeated in one source keeps its first
+    row and reports the other, while an identical copy in another source is
+    not reported at all
+    """
+
+    canonical, report = reconciled
+    second = fights.iloc[1]
+
+    assert canonical_row(canonical, second)["referee"] == second["referee"]
+
+    duplicate = report_row(report, "duplicate", second, "new_fight_stats")
+    assert duplicate["kept"] == "fight_data"
+    assert duplicate["columns"] == "referee"
+    assert duplicate["reason"] == "new_fight_stats has the key more than once"
+    assert (
+        (report["fight_id"] == second["fight_id"])
+        & (report["ufcstats_id"] == second["ufcstats_id"])
+    ).sum() == 1
+
+
+def test_report_columns(reconciled):
+    """
+    This function checks the report's columns and that it only has the
+    four rows the sources disagree on
+    """
+
+    _, report = reconciled
+
+    assert list(report.columns) == REPORT_COLUMNS
+    assert len(report) == 4
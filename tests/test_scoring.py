@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from ufc_data.loader import load_table
+from ufc_data.scoring import RULE_SETS, STORED_SCORES, check_scores, score_fights
+
+
+@pytest.fixture(scope="module")
+def fight_data():
+    return load_table("fight_data")
+
+
+def test_rule_sets_reproduce_stored_scores(fight_data):
+    """
+    This function checks that the DK rule sets score every fight_data row
+    exactly as its stored DK columns do
+    """
+
+    scores = score_fights(fight_data)
+
+    for name, column in STORED_SCORES.items():
+        np.testing.assert_allclose(
+            scores[name], fight_data[column].to_numpy(dtype=float), rtol=0, atol=1e-9
+        )
+
+
+def test_check_scores_finds_no_mismatches(fight_data):
+    """
+    This function checks that check_scores, which python -m ufc_data.scoring
+    exits on, counts no mismatches
+    """
+
+    assert check_scores(fight_data) == {name: 0 for name in STORED_SCORES}
+
+
+def test_check_scores_counts_a_changed_score(fight_data):
+    """
+    This function checks that check_scores notices one stored score that
+    no longer matches the rules
+    """
+
+    changed = fight_data.copy()
+    changed.loc[changed.index[0], "fighter_old_dk_score"] += 0.5
+
+    assert check_scores(changed) == {"new_dk": 0, "old_dk": 1}
+
+
+def test_score_fights_returns_one_column_per_rule_set(fight_data):
+    """
+    This function checks that score_fights returns a column for each rule set
+    """
+
+    assert list(score_fights(fight_data.head(10))) == list(RULE_SETS)
@@ -0,0 +1,32 @@
+"""
+Data layer for the ufc-data csvs and the MMA fighter dashboard.
+
+Names are imported on first use, so ``import ufc_data`` stays cheap and only
+pulls in pandas (and the cached tables) once something is actually read.
+"""
+
+import importlib
+
+
+# public name -> the module it lives in
+_EXPORTS = {
+    "load_table": "ufc_data.loader",
+    "find_fighter": "ufc_data.stats",
+    "fighter_profile": "ufc_data.stats",
+    "career_stats": "ufc_data.stats",
+    "career_stats_before": "ufc_data.stats",
+    "fight_log": "ufc_data.stats",
+    "round_breakdown": "ufc_data.stats",
+    "fighter_rating": "ufc_data.stats",
+    "rating_history": "ufc_data.stats",
+    "similar_fighters": "ufc_data.stats",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'ufc_data' has no attribute {name!r}")
+
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,175 @@
+"""
+Print or export a fighter's numbers without starting the dashboard.
+
+    python -m ufc_data search "jon jo"
+    python -m ufc_data career "Jon Jones"
+    python -m ufc_data career "Jon Jones" --as-of 2020-02-08
+    python -m ufc_data fights 07f72a2a7591b409 --format csv --output fights.csv
+    python -m ufc_data fights "Jon Jones" --method KO/TKO --sort fighter_new_dk_score
+    python -m ufc_data rounds "Israel Adesanya" --format json
+    python -m ufc_data ratings "Alex Pereira"
+    python -m ufc_data similar "Khabib Nurmagomedov" --same-division
+
+A fighter is given as a ufcstats_id or a name, which is looked up with the
+dashboard's fighter search and resolves to the best match.
+"""
+
+import argparse
+import datetime
+import sys
+
+
+FORMATS = ["table", "json", "csv"]
+
+
+def write_frame(df, output_format, output=None, transpose=False):
+    """
+    This function writes df as a table, json records or csv to output or stdout
+    """
+
+    if output_format == "json":
+        text = df.to_json(orient="records", date_format="iso", indent=2)
+    elif output_format == "csv":
+        text = df.to_csv(index=False)
+    elif transpose:
+        text = df.T.to_string(header=False)
+    else:
+        text = df.to_string(index=False)
+
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text.rstrip("\n") + "\n")
+
+
+def iso_date(text):
+    """
+    This function returns a YYYY-MM-DD argument as a date, for argparse
+    """
+
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data",
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="list the fighters matching a name")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+
+    for command, help_text in [
+        ("career", "a fighter's career stats"),
+        ("fights", "a fighter's fight log, newest first"),
+        ("rounds", "a fighter's stats by round"),
+        ("ratings", "a fighter's Elo rating history, oldest first"),
+        ("similar", "the fighters with the closest career stats"),
+    ]:
+        command_parser = commands.add_parser(command, help=help_text)
+        command_parser.add_argument("fighter", help="ufcstats_id or name")
+        command_parser.add_argument("--format", choices=FORMATS, default="table")
+        command_parser.add_argument("--output", help="file to write instead of stdout")
+        if command == "career":
+            command_parser.add_argument(
+                "--as-of",
+                type=iso_date,
+                help="career stats from the fights before this date (YYYY-MM-DD), "
+                "computed from fight_data",
+            )
+        if command == "fights":
+            fights_parser = command_parser
+            command_parser.add_argument("--opponent", help="only fights against them")
+            command_parser.add_argument("--method", help="only fights ending this way")
+            command_parser.add_argument(
+                "--year", type=int, help="only fights in this year"
+            )
+            command_parser.add_argument(
+                "--sort", help="fight log column to sort by, default newest first"
+            )
+            command_parser.add_argument(
+                "--ascending", action="store_true", help="sort smallest first"
+            )
+        if command == "similar":
+            command_parser.add_argument("--limit", type=int, default=5)
+            command_parser.add_argument(
+                "--same-division",
+                action="store_true",
+                help="only fighters from the same division",
+            )
+
+    args = parser.parse_args(argv)
+
+    # the data layer is only imported once the arguments are known to be valid
+    from ufc_data import stats
+    from ufc_data.search import load_fighter_search
+    from ufc_data.sqlstore import load_lookups
+
+    if args.command == "search":
+        # the fighters of the configured backend, as stats.find_fighter uses
+        fighter_search = load_fighter_search(load_lookups()[0])
+        for ufcstats_id in fighter_search.search(args.query, limit=args.limit):
+            print(f"{ufcstats_id}  {fighter_search.label(ufcstats_id)}")
+        return
+
+    # the columns live in the data layer, so --sort is checked here rather
+    # than with choices=
+    if args.command == "fights" and args.sort not in [None, *stats.FIGHT_LOG_COLUMNS]:
+        fights_parser.error(
+            f"argument --sort: invalid choice: {args.sort!r} (choose from "
+            + ", ".join(stats.FIGHT_LOG_COLUMNS)
+            + ")"
+        )
+
+    ufcstats_id = stats.find_fighter(args.fighter)
+    if ufcstats_id is None:
+        parser.exit(1, f"no fighter matches {args.fighter!r}\n")
+
+    if args.command == "career":
+        write_frame(
+            (
+                stats.career_stats_before(ufcstats_id, args.as_of)
+                if args.as_of
+                else stats.career_stats(ufcstats_id)
+            ),
+            args.format,
+            args.output,
+            transpose=True,
+        )
+    elif args.command == "fights":
+        write_frame(
+            stats.fight_log(
+                ufcstats_id,
+                opponent=args.opponent,
+                method=args.method,
+                year=args.year,
+                sort_by=args.sort,
+                ascending=args.ascending,
+            ),
+            args.format,
+            args.output,
+        )
+    elif args.command == "rounds":
+        write_frame(stats.round_breakdown(ufcstats_id), args.format, args.output)
+    elif args.command == "ratings":
+        write_frame(stats.rating_history(ufcstats_id), args.format, args.output)
+    elif args.command == "similar":
+        write_frame(
+            stats.similar_fighters(
+                ufcstats_id, limit=args.limit, same_division=args.same_division
+            ),
+            args.format,
+            args.output,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Opponent-adjusted career stats, fitted with sparse least squares.
+
+The raw rates (strikes absorbed per minute, control against and so on) are
+plain sums over whoever a fighter happened to fight. Here every fight_data
+row is one equation per stat family:
+
+    rate in that fight ~ mean + offense[fighter] + defense[opponent]
+
+weighted by the minutes fought and ridge-regularised towards the mean
+(``PRIOR_MINUTES`` of average fighting), so a fighter with one short fight
+stays close to average. All stat families are one block-diagonal sparse
+system solved with a single ``scipy.sparse.linalg.lsqr`` call.
+
+A fighter's adjusted offense is ``mean + offense``, what they would land
+against an average opponent, and their adjusted defense is
+``mean + defense``, what an average opponent would land against them. The
+fit is linear, so rare events can come out below zero, which is clipped.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+
+
+# stat family -> (fight_data count, scale per second, offense column, defense column)
+ADJUSTED_STATS = {
+    "sig_strikes": (
+        "fighter_total_sig_strikes_landed",
+        60,
+        "adj_sig_strikes_landed_per_minute",
+        "adj_sig_strikes_absorbed_per_minute",
+    ),
+    "strikes": (
+        "fighter_total_strikes_landed",
+        60,
+        "adj_strikes_landed_per_minute",
+        "adj_strikes_absorbed_per_minute",
+    ),
+    "knockdowns": (
+        "fighter_total_knockdowns",
+        900,
+        "adj_knockdowns_per_15_minutes",
+        "adj_knockdowns_against_per_15_minutes",
+    ),
+    "takedowns": (
+        "fighter_total_takedowns",
+        900,
+        "adj_avg_takedowns_per_15_minutes",
+        "adj_takedowns_against_per_15_minutes",
+    ),
+    "submission_attempts": (
+        "fighter_total_submission_attempts",
+        900,
+        "adj_avg_submission_attempts_per_15_minutes",
+        "adj_submission_attempts_against_per_15_minutes",
+    ),
+    "control": (
+        "fighter_total_control",
+        100,
+        "adj_control_percentage",
+        "adj_control_against_percentage",
+    ),
+}
+
+ADJUSTED_COLUMNS = [
+    column
+    for _, _, offense, defense in ADJUSTED_STATS.values()
+    for column in (offense, defense)
+]
+
+# how many minutes of average fighting every fighter starts from
+PRIOR_MINUTES = 15
+
+LSQR_TOLERANCE = 1e-10
+
+
+def adjusted_stats(fight_data):
+    """
+    This function returns every fighter's opponent-adjusted stats, indexed by
+    ufcstats_id
+    """
+
+    seconds = fight_data["fight_time_seconds"].to_numpy(dtype=float)
+    rows = seconds > 0
+    seconds = seconds[rows]
+
+    # one offense and one defense parameter per fighter and stat family
+    codes, ids = pd.factorize(
+        np.concatenate(
+            [
+                fight_data["ufcstats_id"].to_numpy(dtype=object)[rows],
+                fight_data["opp_ufcstats_id"].to_numpy(dtype=object)[rows],
+            ]
+        )
+    )
+    fighter, opponent = np.split(codes, 2)
+    fighters = len(ids)
+
+    # rows are weighted by minutes, so each is scaled by sqrt(minutes)
+    weights = np.sqrt(seconds / 60)
+    design = sparse.csr_matrix(
+        (
+            np.concatenate([weights, weights]),
+            (
+                np.tile(np.arange(len(seconds)), 2),
+                np.concatenate([fighter, fighters + opponent]),
+            ),
+        ),
+        shape=(len(seconds), 2 * fighters),
+    )
+
+    means = {}
+    targets = []
+    for family, (column, scale, _, _) in ADJUSTED_STATS.items():
+        counts = fight_data[column].to_numpy(dtype=float)[rows]
+        means[family] = counts.sum() / seconds.sum() * scale
+        targets.append(weights * (counts / seconds * scale - means[family]))
+
+    families = len(ADJUSTED_STATS)
+    solution = lsqr(
+        sparse.kron(sparse.identity(families, format="csr"), design, format="csr"),
+        np.concatenate(targets),
+        damp=np.sqrt(PRIOR_MINUTES),
+        atol=LSQR_TOLERANCE,
+        btol=LSQR_TOLERANCE,
+    )[0]
+
+    stats = pd.DataFrame(index=pd.Index(ids, name="ufcstats_id"))
+    for position, (family, (_, _, offense, defense)) in enumerate(
+        ADJUSTED_STATS.items()
+    ):
+        parameters = solution[2 * fighters * position : 2 * fighters * (position + 1)]
+        stats[offense] = np.round(
+            np.maximum(means[family] + parameters[:fighters], 0), 2
+        )
+        stats[defense] = np.round(
+            np.maximum(means[family] + parameters[fighters:], 0), 2
+        )
+
+    return stats
@@ -0,0 +1,352 @@
+"""
+Offline benchmarks of what a dashboard run costs.
+
+    python -m ufc_data.bench                              # writes build/bench.json
+    python -m ufc_data.bench --baseline old.json          # exits 1 on a regression
+    python -m ufc_data.bench --only chart --fighters 50
+
+Everything runs against the csvs in the repo, with the in-process cache
+cleared so loads are cold:
+
+- ``load_csv`` / ``load_snapshot``: every table from its csv / snapshot
+- ``derived_full`` / ``derived_incremental``: the derived build into a
+  scratch directory, from nothing and then again with nothing changed
+- ``fighter_index``: the per-fighter row index over the loaded tables
+- ``dk_scores``: every fight and every round scored with the DK rule sets
+- ``simulate_card``: the latest card in events_fights, simulated
+  ``SIMULATIONS`` times per bout
+- ``fight_logs``: one fighter's fight log
+- ``fight_log_pages``: the first page of one fighter's fight log, sorted by
+  DK points
+- ``sqlite_lookups``: one fighter's profile, career stats and fight log
+  queried from the SQLite backend
+- ``similar_fighters``: one fighter's closest fighters, within their division
+- ``<chart>_chart_cold`` / ``<chart>_chart``: a division chart with an empty
+  background cache, and with its background already drawn
+- ``rerun``: what the dashboard does for one fighter, from the lookups to
+  the three charts above the fold
+
+Each benchmark is repeated and its min/median/max in milliseconds is
+written as json. Given a ``--baseline`` from an earlier run, a median that
+got slower by more than ``--threshold`` (and by more than ``--min-delta-ms``,
+so sub-millisecond noise doesn't count) is reported as a regression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ufc_data import loader
+from ufc_data.loader import BUILD_DIR, TABLES
+
+
+DEFAULT_OUTPUT = os.path.join(BUILD_DIR, "bench.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 2.0
+
+CHART_NAMES = ["sig_strikes", "strikes", "control_pct", "td", "avg_win_dk"]
+
+
+def timed(function, repeat):
+    """
+    This function returns the wall times of repeat calls to function, in ms
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return times
+
+
+def summarize(times):
+    """
+    This function returns the min, median and max of a list of timings
+    """
+
+    return {
+        "runs": len(times),
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def sample_fighters(fighter_index, count, seed=0):
+    """
+    This function returns a reproducible sample of fighters with a fight log
+    and a division
+    """
+
+    fighters = fighter_index.fighters
+    has_fights = fighters["ufcstats_id"].map(fighter_index.fight_count) > 0
+    candidates = fighters.loc[has_fights & fighters["division"].notna()]
+    sample = candidates.sample(n=min(count, len(candidates)), random_state=seed)
+
+    return list(zip(sample["ufcstats_id"], sample["division"]))
+
+
+def cold(function):
+    """
+    This function returns function wrapped to run with an empty table cache
+    """
+
+    def run():
+        loader.clear_cache()
+        function()
+
+    return run
+
+
+def benchmarks(fighter_count, repeat):
+    """
+    This function returns {name: (function, repeat, calls per run)} for
+    every benchmark
+    """
+
+    from ufc_data.charts import ChartCache, render_async
+    from ufc_data.derived import build_derived, load_data_version
+    from ufc_data.divisions import load_division_cohorts
+    from ufc_data.index import FighterIndex, load_fighter_index
+    from ufc_data.scoring import score_fights, score_rounds
+    from ufc_data.simulate import card_bouts, finish_rates, simulate_bouts
+    from ufc_data.sqlstore import load_store
+    from ufc_data import stats
+
+    fighter_index = load_fighter_index()
+    cohorts = load_division_cohorts(fighter_index)
+    data_version = load_data_version()
+    fighters = sample_fighters(fighter_index, fighter_count)
+    # derived builds go next to the real one, never over it
+    scratch = os.path.join(BUILD_DIR, "bench_derived")
+
+    def each_fighter(function):
+        def run():
+            for ufcstats_id, division in fighters:
+                function(ufcstats_id, division)
+
+        return run
+
+    def load_csv():
+        for name in TABLES:
+            loader.read_table(name, loader.table_path(name))
+
+    def load_snapshot():
+        for name in TABLES:
+            loader.read_snapshot(name)
+
+    def derived_full():
+        build_derived(incremental=False, directory=scratch)
+
+    def derived_incremental():
+        build_derived(incremental=True, directory=scratch)
+
+    def index():
+        FighterIndex(
+            fighter_index.fights, fighter_index.fighters, fighter_index.career_stats
+        )
+
+    def dk_scores():
+        score_fights(fighter_index.fights)
+        score_rounds(loader.load_table("fight_round_data"), fighter_index.fights)
+
+    def simulate_card():
+        events_fights = loader.load_table("events_fights")
+        bouts = card_bouts(
+            events_fights, fighter_index.fights, events_fights["event_id"].iloc[-1]
+        )
+        simulate_bouts(
+            bouts, fighter_index.career_stats, finish_rates(fighter_index.fights)
+        )
+
+    def sqlite_lookups(ufcstats_id, division):
+        store = load_store()
+        store.fighter_row(ufcstats_id)
+        store.career_row(ufcstats_id)
+        store.fight_rows(ufcstats_id)
+
+    def chart_cold(chart):
+        def run():
+            chart_cache = ChartCache()
+            for ufcstats_id, division in fighters[:1]:
+                chart_cache.render(chart, ufcstats_id, cohorts, division, data_version)
+
+        return run
+
+    def chart_warm(chart):
+        chart_cache = ChartCache(maxsize=len(fighters) * len(CHART_NAMES))
+
+        def render(ufcstats_id, division):
+            chart_cache.render(chart, ufcstats_id, cohorts, division, data_version)
+
+        # the untimed first run draws the backgrounds, which is what the
+        # _cold benchmark measures
+        return each_fighter(render)
+
+    def rerun(ufcstats_id, division):
+        fighter_index.fighter_row(ufcstats_id)
+        fighter_index.career_row(ufcstats_id)
+        charts = [
+            render_async(chart, ufcstats_id, cohorts, division, data_version)
+            for chart in ["sig_strikes", "strikes", "control_pct"]
+        ]
+        stats.fight_log(ufcstats_id)
+        stats.round_breakdown(ufcstats_id)
+        for chart in charts:
+            chart.result()
+
+    # per-fighter benchmarks are divided by their calls per run, so they
+    # report the time for one fighter
+    return {
+        "load_csv": (cold(load_csv), repeat, 1),
+        "load_snapshot": (cold(load_snapshot), repeat, 1),
+        "derived_full": (derived_full, repeat, 1),
+        "derived_incremental": (derived_incremental, repeat, 1),
+        "fighter_index": (index, repeat, 1),
+        "dk_scores": (dk_scores, repeat, 1),
+        "simulate_card": (simulate_card, repeat, 1),
+        "fight_logs": (
+            each_fighter(lambda ufcstats_id, _: stats.fight_log(ufcstats_id)),
+            repeat,
+            len(fighters),
+        ),
+        "fight_log_pages": (
+            each_fighter(
+                lambda ufcstats_id, _: stats.fight_log_page(
+                    ufcstats_id, sort_by="fighter_new_dk_score"
+                )
+            ),
+            repeat,
+            len(fighters),
+        ),
+        "sqlite_lookups": (each_fighter(sqlite_lookups), repeat, len(fighters)),
+        "similar_fighters": (
+            each_fighter(
+                lambda ufcstats_id, _: stats.similar_fighters(
+                    ufcstats_id, same_division=True
+                )
+            ),
+            repeat,
+            len(fighters),
+        ),
+        **{
+            f"{chart}_chart_cold": (chart_cold(chart), repeat, 1)
+            for chart in CHART_NAMES
+        },
+        **{
+            f"{chart}_chart": (chart_warm(chart), repeat, len(fighters))
+            for chart in CHART_NAMES
+        },
+        "rerun": (each_fighter(rerun), repeat, len(fighters)),
+    }
+
+
+def run_benchmarks(fighter_count=20, repeat=5, only=None):
+    """
+    This function runs the benchmarks whose names contain any of only and
+    returns the results as a json-ready dict
+    """
+
+    results = {}
+    for name, (function, runs, per) in benchmarks(fighter_count, repeat).items():
+        if only and not any(part in name for part in only):
+            continue
+
+        # one untimed call first, so imports, caches and the os page cache are warm
+        function()
+        times = [elapsed / per for elapsed in timed(function, runs)]
+        results[name] = {**summarize(times), "calls_per_run": per}
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fighters": fighter_count,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def regressions(results, baseline, threshold, min_delta_ms):
+    """
+    This function returns the benchmarks whose median got slower than the
+    baseline's by more than threshold (a fraction) and min_delta_ms
+    """
+
+    slower = []
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+
+        delta = result["median_ms"] - before["median_ms"]
+        if delta > min_delta_ms and delta > before["median_ms"] * threshold:
+            slower.append(
+                {
+                    "name": name,
+                    "baseline_ms": before["median_ms"],
+                    "median_ms": result["median_ms"],
+                    "change_pct": round(delta / before["median_ms"] * 100, 1),
+                }
+            )
+
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.bench", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="json to write")
+    parser.add_argument("--baseline", help="json of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--fighters", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only", nargs="*", help="only run benchmarks whose name contains one of these"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.fighters, args.repeat, args.only)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results["regressions"] = regressions(
+            results, baseline, args.threshold, args.min_delta_ms
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(
+        pd.DataFrame(results["results"])
+        .T[["median_ms", "min_ms", "max_ms", "calls_per_run"]]
+        .to_string()
+    )
+    print(f"-> {args.output}")
+
+    if results.get("regressions"):
+        print(f"\n{len(results['regressions'])} regressions:")
+        print(pd.DataFrame(results["regressions"]).to_string(index=False))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Offline build of everything the dashboard reads instead of computing.
+
+    python -m ufc_data.build          # only recompute fighters with new fights
+    python -m ufc_data.build --full   # recompute every fighter
+    python -m ufc_data.build --sqlite # also write the SQLite backend
+
+Every csv is first written as a typed snapshot under build/snapshot_v<n>/,
+then the fight csvs are reconciled into one canonical fight table, the
+derived per-fighter tables are built from it and the
+Elo ratings are brought up to date with any new events. With ``--sqlite`` (or
+``UFC_DATA_BACKEND=sqlite``) the tables are then written to the SQLite
+database of ``ufc_data.sqlstore``.
+"""
+
+import argparse
+
+from ufc_data.dates import date_report
+from ufc_data.derived import build_derived, derived_dir
+from ufc_data.loader import build_lock, build_snapshot, snapshot_dir
+from ufc_data.ratings import ratings_dir, update_ratings
+from ufc_data.reconcile import reconcile_dir, reconcile_fights
+from ufc_data.sqlstore import backend, build_store, store_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.build", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="recompute every fighter and replay every rating, not only changed ones",
+    )
+    parser.add_argument(
+        "--sqlite",
+        action="store_true",
+        help="also write the tables to the SQLite backend",
+    )
+    args = parser.parse_args(argv)
+
+    # a dashboard process finding the build stale waits for this one instead
+    with build_lock():
+        rows = build_snapshot()
+        print(
+            f"snapshot: {len(rows)} tables, {sum(rows.values())} rows -> {snapshot_dir()}"
+        )
+
+        # unparsed dates are stored as NaT, so they are only visible here
+        dates = date_report()
+        for row in dates.loc[dates["unparsed"] > 0].itertuples():
+            print(
+                f"warning: {row.unparsed} {row.table}.{row.column} values match none "
+                f"of {row.formats}, see python -m ufc_data.dates"
+            )
+
+        counts = reconcile_fights()
+        print(
+            f"fights: {counts['rows']} rows, {counts['insert']} inserted, "
+            f"{counts['update']} updated, {counts['delete']} deleted, "
+            f"{counts['duplicate']} duplicates and {counts['conflict']} conflicts "
+            f"-> {reconcile_dir()}/report.csv"
+        )
+
+        manifest = build_derived(incremental=not args.full)
+        print(
+            f"derived v{manifest['version']}: recomputed {manifest['recomputed_fighters']} "
+            f"of {manifest['fighters']} fighters -> {derived_dir()}"
+        )
+        if manifest["unmatched_rounds"]:
+            print(
+                f"derived: left out {manifest['unmatched_rounds']} fight_round_data "
+                "rows without a fight in the fight table"
+            )
+
+        ratings = update_ratings(full=args.full)
+        print(
+            f"ratings: {'replayed' if ratings['replayed'] else 'appended'} "
+            f"{ratings['rated_bouts']} bouts from {ratings['rated_events']} events, "
+            f"{ratings['fighters']} fighters -> {ratings_dir()}"
+        )
+
+        if args.sqlite or backend() == "sqlite":
+            store = build_store()
+            print(
+                f"sqlite: {len(store['rows'])} tables, {sum(store['rows'].values())} "
+                f"rows -> {store_path()}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Division scatter charts rendered as a cached background plus one overlay point.
+
+Only the highlighted fighter changes between reruns, so each (chart, division,
+data version) is drawn once: the gray cohort, the reference lines, labels and
+axes go into a background that is kept in a bounded LRU. A request restores
+that background, draws the red point with ``Axes.draw_artist`` and encodes
+the pixels as a png, which costs a few milliseconds instead of a full seaborn
+render.
+
+Charts are rendered on a bounded thread pool (``render_async``) so the
+dashboard can start them before it draws the fighter profile. Matplotlib's
+own state is guarded by ``RendererAgg.lock``; png encoding happens outside it,
+and Pillow releases the GIL while encoding, so that part runs in parallel.
+"""
+
+import collections
+import concurrent.futures
+import io
+import os
+import threading
+
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg, RendererAgg
+from matplotlib.figure import Figure
+from PIL import Image
+import seaborn as sns
+
+
+GRAY = "#BFBFBF"
+RED = "#990000"
+
+CHART_DPI = 150
+CHART_CACHE_SIZE = int(os.environ.get("UFC_CHART_CACHE_SIZE", "16"))
+CHART_WORKERS = int(
+    os.environ.get("UFC_CHART_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# matplotlib is not thread-safe, every figure is drawn under the agg lock
+agg_lock = RendererAgg.lock
+
+
+def median_cross(points, x, y, cohorts, division):
+    """
+    This function returns the (horizontal, vertical) lines at the medians of
+    x and y, in the order the dashboard has always drawn them
+    """
+
+    return points[x].median(), points[y].median()
+
+
+def class_average(points, x, y, cohorts, division):
+    """
+    This function returns the division's strikes landed per minute for both lines
+    """
+
+    average = cohorts.class_strikes_landed_per_minute(division)
+
+    return average, average
+
+
+def mean_lines(points, x, y, cohorts, division):
+    """
+    This function returns the (horizontal, vertical) lines at the means of y and x
+    """
+
+    return points[y].mean(), points[x].mean()
+
+
+# chart -> the columns it plots, whether fighters at 0 are dropped, its labels,
+# whether it has a grid and where its dashed reference lines go
+CHARTS = {
+    "sig_strikes": {
+        "x": "sig_strikes_landed_per_minute",
+        "y": "sig_strikes_absorbed_per_minute",
+        "positive_only": True,
+        "xlabel": "Sig. Strikes Landed Per Minute",
+        "ylabel": "Sig. Strikes Absorbed Per Minute",
+        "grid": True,
+        "lines": median_cross,
+    },
+    "strikes": {
+        "x": "strikes_landed_per_minute",
+        "y": "strikes_absorbed_per_minute",
+        "positive_only": False,
+        "xlabel": "Strikes Landed Per Minute",
+        "ylabel": "Strikes Absorbed Per Minute",
+        "grid": True,
+        "lines": class_average,
+    },
+    "control_pct": {
+        "x": "control_percentage",
+        "y": "control_against_percentage",
+        "positive_only": False,
+        "xlabel": "Control Percentage",
+        "ylabel": "Control Against Percentage",
+        "grid": True,
+        "lines": median_cross,
+    },
+    "td": {
+        "x": "takedown_accuracy",
+        "y": "takedown_defence",
+        "positive_only": True,
+        "xlabel": "Takedown Accuracy (%)",
+        "ylabel": "Takedown Defence (%)",
+        "grid": True,
+        "lines": mean_lines,
+    },
+    "avg_win_dk": {
+        "x": "avg_win_new_dk_score",
+        "y": "avg_win_new_dk_score",
+        "positive_only": True,
+        "xlabel": "Average Winning DK Points (New)",
+        "ylabel": None,
+        "grid": False,
+        "lines": None,
+    },
+}
+
+
+def chart_points(chart, cohort):
+    """
+    This function returns the points a chart plots for a division's cohort
+    """
+
+    spec = CHARTS[chart]
+    columns = list(
+        dict.fromkeys(["ufcstats_id", spec["x"], spec["y"], "fight_time_seconds_for"])
+    )
+    points = cohort[columns].dropna(subset=[spec["x"], spec["y"]])
+
+    # removing where fighters have 0 and 0
+    if spec["positive_only"]:
+        points = points.loc[(points[spec["x"]] > 0) & (points[spec["y"]] > 0)]
+
+    return points.reset_index(drop=True)
+
+
+class ChartBackground:
+    """
+    A rendered division chart without its highlighted fighter
+    """
+
+    def __init__(self, chart, cohorts, division):
+        spec = CHARTS[chart]
+        self.points = chart_points(chart, cohorts.cohort(division)).set_index(
+            "ufcstats_id"
+        )
+        self.x = spec["x"]
+        self.y = spec["y"]
+        self.lock = threading.Lock()
+
+        with agg_lock:
+            self.draw(spec, cohorts, division)
+
+    def draw(self, spec, cohorts, division):
+        """
+        This function draws everything but the highlighted fighter
+        """
+
+        self.figure = Figure(dpi=CHART_DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.subplots()
+        ax = self.ax
+
+        sns.scatterplot(
+            x=self.points[self.x],
+            y=self.points[self.y],
+            color=GRAY,
+            s=(self.points["fight_time_seconds_for"] / 15),
+            legend=False,
+            ax=ax,
+        )
+
+        ax.set_xlabel(spec["xlabel"], fontsize=12)
+        if spec["ylabel"]:
+            ax.set_ylabel(spec["ylabel"], fontsize=12)
+
+        if spec["grid"]:
+            ax.grid(zorder=0, alpha=0.2)
+            ax.set_axisbelow(True)
+
+        if spec["lines"] is not None:
+            hline, vline = spec["lines"](self.points, self.x, self.y, cohorts, division)
+            ax.axhline(y=hline, linestyle="--", color="black", alpha=0.2)
+            ax.axvline(x=vline, linestyle="--", color="black", alpha=0.2)
+
+        # the overlay point is animated, so it is left out of the background
+        linewidths = ax.collections[0].get_linewidths() if ax.collections else [0.0]
+        self.overlay = ax.scatter(
+            [0.0],
+            [0.0],
+            s=[0.0],
+            color=RED,
+            edgecolor="w",
+            linewidth=linewidths[0],
+            animated=True,
+        )
+
+        self.figure.tight_layout()
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def render(self, ufcstats_id):
+        """
+        This function returns the chart as png bytes with a fighter highlighted
+        """
+
+        with self.lock:
+            with agg_lock:
+                self.canvas.restore_region(self.background)
+
+                if ufcstats_id in self.points.index:
+                    point = self.points.loc[[ufcstats_id]].iloc[0]
+                    self.overlay.set_offsets([[point[self.x], point[self.y]]])
+                    self.overlay.set_sizes([point["fight_time_seconds_for"] / 15])
+                    self.ax.draw_artist(self.overlay)
+
+            width, height = self.canvas.get_width_height()
+            image = io.BytesIO()
+            # png encoding is most of the remaining cost, the alpha channel and
+            # zlib effort add to it without changing what is shown
+            Image.frombuffer(
+                "RGBA", (width, height), self.canvas.buffer_rgba(), "raw", "RGBA", 0, 1
+            ).convert("RGB").save(image, format="png", compress_level=1)
+
+        return image.getvalue()
+
+
+class ChartCache:
+    """
+    An LRU of chart backgrounds keyed by (chart, division, data version)
+    """
+
+    def __init__(self, maxsize=CHART_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.backgrounds = collections.OrderedDict()
+        # key -> Future of a background being drawn, so concurrent misses for
+        # the same key wait on the first one instead of drawing it again
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def background(self, chart, cohorts, division, data_version):
+        """
+        This function returns a chart's background, rendering it on a miss
+        """
+
+        key = (chart, division, data_version)
+
+        with self.lock:
+            background = self.backgrounds.get(key)
+            if background is not None:
+                self.backgrounds.move_to_end(key)
+                return background
+
+            pending = self.pending.get(key)
+            if pending is None:
+                self.pending[key] = concurrent.futures.Future()
+
+        if pending is not None:
+            return pending.result()
+
+        try:
+            background = ChartBackground(chart, cohorts, division)
+        except BaseException as error:
+            with self.lock:
+                self.pending.pop(key).set_exception(error)
+            raise
+
+        with self.lock:
+            self.backgrounds[key] = background
+            self.backgrounds.move_to_end(key)
+            while len(self.backgrounds) > self.maxsize:
+                self.backgrounds.popitem(last=False)
+            self.pending.pop(key).set_result(background)
+
+        return background
+
+    def render(self, chart, ufcstats_id, cohorts, division, data_version):
+        """
+        This function returns a division chart as png bytes with a fighter highlighted
+        """
+
+        return self.background(chart, cohorts, division, data_version).render(
+            ufcstats_id
+        )
+
+
+chart_cache = ChartCache()
+
+chart_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=CHART_WORKERS, thread_name_prefix="chart"
+)
+
+
+def render_async(chart, ufcstats_id, cohorts, division, data_version):
+    """
+    This function starts rendering a division chart on the chart pool and
+    returns a Future of its png bytes
+    """
+
+    return chart_executor.submit(
+        chart_cache.render, chart, ufcstats_id, cohorts, division, data_version
+    )
@@ -0,0 +1,111 @@
+"""
+Report of the date values the declared formats can't read.
+
+    python -m ufc_data.dates
+
+Every date column is parsed with the formats listed for it in
+``ufc_data.schema.DATE_FORMATS``. A value none of them reads becomes NaT like
+a missing date does, so this lists those rows per table and column, with the
+distinct values behind them, instead of letting them disappear from joins.
+"""
+
+import argparse
+
+import pandas as pd
+
+from ufc_data.loader import TABLES, table_path
+from ufc_data.schema import DATE_FORMATS, MISSING_DATES, parse_dates
+
+
+def read_date_columns(name):
+    """
+    This function returns the raw date columns of a table's csv, as strings
+    """
+
+    return pd.read_csv(
+        table_path(name),
+        usecols=list(DATE_FORMATS[name]),
+        dtype=str,
+        encoding=TABLES[name].get("read_csv", {}).get("encoding"),
+    )
+
+
+def unparsed_dates(name):
+    """
+    This function returns the rows of a table's csv whose dates didn't parse,
+    with the table, column and raw value of each
+    """
+
+    df = read_date_columns(name)
+
+    frames = []
+    for column, formats in DATE_FORMATS[name].items():
+        _, unparsed = parse_dates(df[column], formats)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "table": name,
+                    "column": column,
+                    # +2, the header is line 1 of the csv
+                    "line": df.index[unparsed] + 2,
+                    "value": df.loc[unparsed, column],
+                }
+            )
+        )
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def date_report(names=None):
+    """
+    This function returns a DataFrame of rows, missing and unparsed dates per
+    date column
+    """
+
+    rows = []
+    for name in names or DATE_FORMATS:
+        df = read_date_columns(name)
+
+        for column, formats in DATE_FORMATS[name].items():
+            _, unparsed = parse_dates(df[column], formats)
+            rows.append(
+                {
+                    "table": name,
+                    "column": column,
+                    "formats": " | ".join(formats),
+                    "rows": len(df),
+                    "missing": int(
+                        (df[column].isna() | df[column].isin(MISSING_DATES)).sum()
+                    ),
+                    "unparsed": int(unparsed.sum()),
+                }
+            )
+
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.dates", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        "tables", nargs="*", help=f"tables to check, from {sorted(DATE_FORMATS)}"
+    )
+    args = parser.parse_args(argv)
+
+    report = date_report(args.tables)
+    print(report.to_string(index=False))
+
+    for name in report.loc[report["unparsed"] > 0, "table"].unique():
+        unparsed = unparsed_dates(name)
+        print(f"\n{name}: {len(unparsed)} unparsed dates")
+        print(
+            unparsed.groupby(["column", "value"])["line"]
+            .agg(["count", "min", "max"])
+            .rename(columns={"min": "first_line", "max": "last_line"})
+            .to_string()
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+"""
+Derived per-fighter stats built from the canonical fight table, which is
+fight_data.csv plus whatever the other fight csvs add (see
+``ufc_data.reconcile``).
+
+The dashboard used to rebuild these on every script run. They are now built
+once by ``python -m ufc_data.build`` into a versioned directory of snapshots (see
+``ufc_data.snapshot``) under ``build/`` and the dashboard only reads the result with ``load_derived``.
+
+Each fighter row carries a ``fights_hash`` of every fight_data row the fighter
+appears in (as ``ufcstats_id`` or ``opp_ufcstats_id``). An incremental build
+only recomputes fighters whose hash changed, so a new event touches a few
+dozen fighters instead of the whole table.
+
+The per-round stats (see ``ufc_data.rounds``), the point-in-time fight
+features (see ``ufc_data.history``) and the opponent-adjusted stats (see
+``ufc_data.adjusted``) are one vectorized pass or sparse solve each and are
+rebuilt in full every time.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.adjusted import adjusted_stats
+from ufc_data.divisions import normalize_weight_class
+from ufc_data.history import fight_features
+from ufc_data.loader import (
+    BUILD_DIR,
+    build_lock,
+    cached_read,
+    file_fingerprint,
+    file_key,
+    fingerprint_matches,
+    load_table,
+    table_path,
+)
+from ufc_data.reconcile import SOURCE_PRIORITY, load_fights
+from ufc_data.rounds import matched_rounds, round_stats
+from ufc_data.snapshot import read_frame, read_meta, write_frame
+
+
+# bump this whenever the columns or formulas below change
+DERIVED_VERSION = 13
+
+SOURCE_TABLES = [
+    *SOURCE_PRIORITY,
+    "career_stats",
+    "fighters",
+    "external_ids",
+    "fight_round_data",
+]
+
+# the fight_data columns the aggregates depend on, and so the columns that are hashed
+HASHED_COLUMNS = [
+    "fight_id",
+    "event_date",
+    "weight_class",
+    "ufcstats_id",
+    "opp_ufcstats_id",
+    "fighter_winner",
+    "fighter_new_dk_score",
+    "fighter_total_strikes_landed",
+    "fighter_total_strikes_attempted",
+    "fighter_total_control",
+    "fight_time_seconds",
+]
+
+
+def derived_dir(version=DERIVED_VERSION):
+    """
+    This function returns the directory a version of the derived tables lives in
+    """
+
+    return os.path.join(BUILD_DIR, f"derived_v{version}")
+
+
+def fighter_hashes(fight_data):
+    """
+    This function returns a uint64 hash per fighter of every fight row they appear in
+    """
+
+    row_hashes = pd.util.hash_pandas_object(
+        fight_data[HASHED_COLUMNS], index=False
+    ).to_numpy()
+
+    ids = np.concatenate(
+        [
+            fight_data["ufcstats_id"].to_numpy(dtype=object),
+            fight_data["opp_ufcstats_id"].to_numpy(dtype=object),
+        ]
+    )
+    codes, uniques = pd.factorize(ids)
+
+    # summing is order independent, and uint64 addition wraps instead of overflowing
+    hashes = np.zeros(len(uniques), dtype=np.uint64)
+    np.add.at(hashes, codes, np.concatenate([row_hashes, row_hashes]))
+
+    return pd.Series(hashes, index=pd.Index(uniques, name="ufcstats_id"))
+
+
+def fighter_aggregates(fight_data):
+    """
+    This function returns the fight-log stats for every fighter in fight_data:
+    average winning dk score, most-recent weight class and division, strikes
+    and control
+    """
+
+    # getting average winning new dk score
+    avg_win_new_dk_score = (
+        fight_data.loc[fight_data["fighter_winner"] == True]
+        .groupby("ufcstats_id", observed=True)["fighter_new_dk_score"]
+        .mean()
+        .rename("avg_win_new_dk_score")
+    )
+
+    # getting most-recent weight_class
+    weight_class = (
+        fight_data.sort_values(by="event_date", ascending=False, kind="mergesort")
+        .drop_duplicates(subset=["ufcstats_id"])
+        .set_index("ufcstats_id")["weight_class"]
+    )
+
+    # getting strikes and control for / against
+    # observed=True, the id columns are categoricals and a subset of the rows
+    # must not come back with every fighter in the categories
+    totals_for = fight_data.groupby("ufcstats_id", observed=True).agg(
+        {
+            "fighter_total_strikes_landed": "sum",
+            "fighter_total_strikes_attempted": "sum",
+            "fighter_total_control": "sum",
+            "fight_time_seconds": "sum",
+        }
+    )
+
+    totals_against = (
+        fight_data.groupby("opp_ufcstats_id", observed=True)
+        .agg(
+            {
+                "fighter_total_strikes_landed": "sum",
+                "fighter_total_control": "sum",
+                "fight_time_seconds": "sum",
+            }
+        )
+        .rename_axis("ufcstats_id")
+    )
+
+    totals = totals_for.join(
+        totals_against, how="inner", lsuffix="_for", rsuffix="_against"
+    )
+
+    aggregates = pd.DataFrame(index=totals.index)
+    aggregates["avg_win_new_dk_score"] = avg_win_new_dk_score
+    aggregates["weight_class"] = weight_class
+    aggregates["division"] = normalize_weight_class(weight_class)
+
+    aggregates["strikes_landed_per_minute"] = round(
+        totals["fighter_total_strikes_landed_for"]
+        / totals["fight_time_seconds_for"]
+        * 60,
+        2,
+    )
+    aggregates["strikes_absorbed_per_minute"] = round(
+        totals["fighter_total_strikes_landed_against"]
+        / totals["fight_time_seconds_against"]
+        * 60,
+        2,
+    )
+    aggregates["strike_accuracy"] = (
+        totals["fighter_total_strikes_landed_for"]
+        / totals["fighter_total_strikes_attempted"]
+        * 100
+    )
+
+    aggregates["fighter_total_control_for"] = totals["fighter_total_control_for"]
+    aggregates["fight_time_seconds_for"] = totals["fight_time_seconds_for"]
+    aggregates["fighter_total_control_against"] = totals[
+        "fighter_total_control_against"
+    ]
+    aggregates["control_percentage"] = round(
+        totals["fighter_total_control_for"] / totals["fight_time_seconds_for"] * 100,
+        2,
+    )
+    aggregates["control_against_percentage"] = round(
+        totals["fighter_total_control_against"]
+        / totals["fight_time_seconds_against"]
+        * 100,
+        2,
+    )
+
+    return aggregates
+
+
+def update_aggregates(fight_data, previous=None):
+    """
+    This function returns (aggregates, recomputed fighter count), only
+    recomputing the fighters whose fights_hash differs from previous
+    """
+
+    hashes = fighter_hashes(fight_data)
+
+    if previous is None:
+        changed = hashes.index
+    else:
+        previous_hashes = previous["fights_hash"].reindex(hashes.index)
+        changed = hashes.index[previous_hashes.to_numpy() != hashes.to_numpy()]
+
+    affected_rows = fight_data["ufcstats_id"].isin(changed) | fight_data[
+        "opp_ufcstats_id"
+    ].isin(changed)
+    recomputed = fighter_aggregates(fight_data.loc[affected_rows])
+    recomputed = recomputed.loc[recomputed.index.isin(changed)]
+
+    if previous is None:
+        aggregates = recomputed
+    else:
+        # fighters that no longer appear in fight_data are dropped too
+        unchanged = previous.drop(columns=["fights_hash"])
+        unchanged = unchanged.loc[
+            unchanged.index.isin(hashes.index) & ~unchanged.index.isin(changed)
+        ]
+        aggregates = pd.concat([unchanged, recomputed])
+
+    aggregates = aggregates.sort_index()
+    aggregates["fights_hash"] = hashes.reindex(aggregates.index)
+
+    return aggregates, len(recomputed)
+
+
+def fighter_fights(fight_data):
+    """
+    This function returns the fight table sorted by fighter and then newest
+    fight first, the order ufc_data.index slices fight logs from
+    """
+
+    return fight_data.sort_values(
+        by=["ufcstats_id", "event_date"], ascending=[True, False], kind="mergesort"
+    ).reset_index(drop=True)
+
+
+def merge_derived(aggregates, adjusted, career_stats, fighters, external_ids):
+    """
+    This function returns (fighters, career stats) with the aggregates and
+    the opponent-adjusted stats merged in
+    """
+
+    aggregates = aggregates.drop(columns=["fights_hash"]).reset_index()
+
+    career_stats = career_stats.merge(aggregates, on="ufcstats_id")
+    career_stats = career_stats.merge(
+        adjusted.reset_index(), how="left", on="ufcstats_id"
+    )
+
+    fighters = fighters.merge(
+        aggregates[["ufcstats_id", "weight_class", "division"]], on="ufcstats_id"
+    )
+    fighters = fighters.merge(
+        external_ids[["ufcstats_id", "espn_id", "sherdog_id"]],
+        how="left",
+        on="ufcstats_id",
+    )
+
+    return fighters, career_stats
+
+
+def read_aggregates(directory):
+    """
+    This function returns a previously built aggregates table, or None
+    """
+
+    directory = os.path.join(directory, "fighter_aggregates")
+    if read_meta(directory) is None:
+        return None
+
+    return read_frame(directory, mmap=False).set_index("ufcstats_id")
+
+
+def read_manifest(directory=None):
+    """
+    This function returns the manifest of a derived build, or None
+    """
+
+    path = os.path.join(directory or derived_dir(), "manifest.json")
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def data_version(sources):
+    """
+    This function returns a short id of the derived version and source csvs,
+    which changes whenever any derived number can change
+    """
+
+    sha1 = hashlib.sha1(str(DERIVED_VERSION).encode())
+    for name in sorted(sources):
+        sha1.update(sources[name]["sha1"].encode())
+
+    return sha1.hexdigest()[:12]
+
+
+def build_derived(incremental=True, directory=None):
+    """
+    This function builds the derived tables and returns the manifest it wrote
+    """
+
+    directory = directory or derived_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    fight_data = load_fights()
+
+    previous = None
+    manifest = read_manifest(directory)
+    if incremental and manifest is not None and manifest["version"] == DERIVED_VERSION:
+        previous = read_aggregates(directory)
+
+    aggregates, recomputed = update_aggregates(fight_data, previous)
+
+    fighters, career_stats = merge_derived(
+        aggregates,
+        adjusted_stats(fight_data),
+        load_table("career_stats"),
+        load_table("fighters"),
+        load_table("external_ids"),
+    )
+
+    write_frame(aggregates.reset_index(), os.path.join(directory, "fighter_aggregates"))
+    write_frame(fighters, os.path.join(directory, "fighters"))
+    write_frame(career_stats, os.path.join(directory, "career_stats"))
+    fight_round_data = load_table("fight_round_data")
+    write_frame(
+        round_stats(fight_round_data, fight_data),
+        os.path.join(directory, "round_stats"),
+    )
+    write_frame(fight_features(fight_data), os.path.join(directory, "fight_features"))
+    write_frame(fighter_fights(fight_data), os.path.join(directory, "fighter_fights"))
+
+    sources = {name: file_fingerprint(table_path(name)) for name in SOURCE_TABLES}
+    manifest = {
+        "version": DERIVED_VERSION,
+        "data_version": data_version(sources),
+        "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "sources": sources,
+        "fighters": len(aggregates),
+        "recomputed_fighters": recomputed,
+        "unmatched_rounds": int((~matched_rounds(fight_round_data, fight_data)).sum()),
+    }
+
+    # the manifest goes last so a half-written build is never picked up
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def is_fresh(manifest):
+    """
+    This function returns whether a manifest still matches the source csvs
+    """
+
+    if manifest is None or manifest.get("version") != DERIVED_VERSION:
+        return False
+
+    return all(
+        fingerprint_matches(table_path(name), manifest["sources"].get(name, {}))
+        if manifest["sources"].get(name)
+        else False
+        for name in SOURCE_TABLES
+    )
+
+
+def read_derived(directory):
+    """
+    This function reads the built (fighters, career stats) tables
+    """
+
+    return (
+        read_frame(os.path.join(directory, "fighters")),
+        read_frame(os.path.join(directory, "career_stats")),
+    )
+
+
+def load_derived(build_if_stale=True):
+    """
+    This function returns the derived (fighters, career stats) tables, building
+    them first if they are missing or older than the source csvs
+    """
+
+    directory = derived_dir()
+    key = (
+        file_key(os.path.join(directory, "manifest.json")),
+        tuple(file_key(table_path(name)) for name in SOURCE_TABLES),
+    )
+
+    def reader():
+        if not is_fresh(read_manifest(directory)):
+            if not build_if_stale:
+                raise RuntimeError(
+                    f"{directory} is missing or stale, run python -m ufc_data.build"
+                )
+            # another process may have built it while this one waited
+            with build_lock():
+                if not is_fresh(read_manifest(directory)):
+                    build_derived(directory=directory)
+        return read_derived(directory)
+
+    return cached_read("derived", key, reader)
+
+
+def load_data_version():
+    """
+    This function returns the data_version of the current derived build
+    """
+
+    load_derived()
+    directory = derived_dir()
+
+    return cached_read(
+        "data_version",
+        file_key(os.path.join(directory, "manifest.json")),
+        lambda: read_manifest(directory)["data_version"],
+    )
+
+
+def load_round_stats():
+    """
+    This function returns the per-round stats of the current derived build,
+    indexed by ufcstats_id
+    """
+
+    load_derived()
+    directory = derived_dir()
+
+    # sorted by ufcstats_id, so .loc[ufcstats_id:ufcstats_id] is a binary search
+    return cached_read(
+        "round_stats",
+        file_key(os.path.join(directory, "manifest.json")),
+        lambda: read_frame(os.path.join(directory, "round_stats")).set_index(
+            "ufcstats_id"
+        ),
+    )
+
+
+def load_fight_features():
+    """
+    This function returns the point-in-time fight features of the current
+    derived build, see ufc_data.history
+    """
+
+    load_derived()
+    directory = derived_dir()
+
+    return cached_read(
+        "fight_features",
+        file_key(os.path.join(directory, "manifest.json")),
+        lambda: read_frame(os.path.join(directory, "fight_features")),
+    )
+
+
+def load_fighter_fights():
+    """
+    This function returns the fight table of the current derived build,
+    sorted by fighter and then newest fight first
+    """
+
+    load_derived()
+    directory = derived_dir()
+
+    # memory-mapped, so every process serving the dashboard shares one copy
+    return cached_read(
+        "fighter_fights",
+        file_key(os.path.join(directory, "manifest.json")),
+        lambda: read_frame(os.path.join(directory, "fighter_fights")),
+    )
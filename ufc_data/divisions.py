@@ -0,0 +1,129 @@
+"""
+Weight classes normalized to divisions, and per-division cohorts.
+
+fight_data.csv spells a division many ways: "Welterweight", "UFC Welterweight
+Title", "UFC Interim Welterweight Title", "Ultimate Fighter 33 Welterweight
+Tournament Title". ``normalize_weight_class`` maps all of them to one
+categorical division, so cohorts are exact matches instead of substring scans
+(which also pulled "Women's Flyweight" into "Flyweight" and "Light
+Heavyweight" into "Heavyweight").
+"""
+
+import pandas as pd
+
+from ufc_data.loader import cached_read
+
+
+# lightest to heaviest, men then women
+DIVISIONS = [
+    "Strawweight",
+    "Flyweight",
+    "Bantamweight",
+    "Featherweight",
+    "Lightweight",
+    "Welterweight",
+    "Middleweight",
+    "Light Heavyweight",
+    "Heavyweight",
+    "Super Heavyweight",
+    "Women's Strawweight",
+    "Women's Flyweight",
+    "Women's Bantamweight",
+    "Women's Featherweight",
+    "Catch Weight",
+    "Open Weight",
+]
+
+# longest names first, so "Women's Flyweight" wins over "Flyweight"
+_MATCH_ORDER = sorted(DIVISIONS, key=len, reverse=True)
+
+
+def division_of(weight_class):
+    """
+    This function returns the division of one weight class string, or None
+    """
+
+    if not isinstance(weight_class, str):
+        return None
+
+    lowered = weight_class.lower()
+    for division in _MATCH_ORDER:
+        if division.lower() in lowered:
+            return division
+
+    return None
+
+
+def normalize_weight_class(weight_classes):
+    """
+    This function returns a Series of weight classes as a categorical division,
+    only looking at each distinct spelling once
+    """
+
+    codes, uniques = pd.factorize(weight_classes)
+    divisions = pd.Categorical(
+        [division_of(weight_class) for weight_class in uniques], categories=DIVISIONS
+    )
+
+    return pd.Series(
+        divisions.take(codes, allow_fill=True),
+        index=weight_classes.index,
+        name="division",
+    )
+
+
+class DivisionCohorts:
+    """
+    Career stats partitioned by division, plus per-division class averages
+    """
+
+    def __init__(self, career_stats, fight_data):
+        self.cohorts = {
+            division: cohort
+            for division, cohort in career_stats.groupby(
+                "division", observed=True, sort=False
+            )
+        }
+        self.empty = career_stats.iloc[0:0]
+
+        fight_divisions = normalize_weight_class(fight_data["weight_class"])
+        totals = (
+            fight_data[["fighter_total_strikes_landed", "fight_time_seconds"]]
+            .groupby(fight_divisions.to_numpy(), sort=False)
+            .sum()
+        )
+        self.strikes_landed_per_minute = round(
+            totals["fighter_total_strikes_landed"] / totals["fight_time_seconds"] * 60,
+            2,
+        ).to_dict()
+
+    def cohort(self, division):
+        """
+        This function returns the career stats of every fighter in a division
+        """
+
+        return self.cohorts.get(division, self.empty)
+
+    def class_strikes_landed_per_minute(self, division):
+        """
+        This function returns a division's total strikes landed per minute
+        """
+
+        return self.strikes_landed_per_minute.get(division, float("nan"))
+
+
+def load_division_cohorts(fighter_index):
+    """
+    This function returns the DivisionCohorts over a FighterIndex's tables,
+    building them again only when the fighter index was rebuilt
+    """
+
+    # the cached value holds on to the index, so its id can't be reused
+    return cached_read(
+        "division_cohorts",
+        id(fighter_index),
+        lambda: (
+            fighter_index,
+            DivisionCohorts(fighter_index.career_stats, fighter_index.fights),
+        ),
+    )[1]
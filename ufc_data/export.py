@@ -0,0 +1,322 @@
+"""
+fighter-export-model.csv for every fighter, the rate table the projection
+models read.
+
+    python -m ufc_data.export                              # every fighter, whole history
+    python -m ufc_data.export --by-division --since 2022-01-01
+    python -m ufc_data.export --division Welterweight --output welterweights.csv
+    python -m ufc_data.export --jobs 4
+
+Every rate comes from the canonical fight table (see ``ufc_data.reconcile``):
+per-fight totals of what the fighter did and what was done to them, summed
+with one groupby per fighter (and division, with ``--by-division``) and
+divided once. Rows are written for fighters with at least one fight in the
+window. ``weight_class`` is the division with ``--by-division`` or
+``--division`` and "N/A" otherwise. The ``*_def_pct`` columns keep the meaning
+they have in the checked-in file: the share of the opponent's attempts that
+landed, so lower is better.
+
+``--jobs`` shards the fighters across a process pool. Each shard gets the
+fight rows of its own fighters (and of their opponents in those fights) and
+computes the per-fight totals itself, so the shards never overlap and the
+parent only concatenates.
+"""
+
+import argparse
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.divisions import DIVISIONS, normalize_weight_class
+from ufc_data.history import fight_totals
+from ufc_data.loader import BUILD_DIR
+
+
+DEFAULT_OUTPUT = os.path.join(BUILD_DIR, "fighter-export-model.csv")
+
+ALL_DIVISIONS = "N/A"
+
+# the columns of fighter-export-model.csv, in its order
+EXPORT_COLUMNS = [
+    "ufcstats_id",
+    "fighter_name",
+    "weight_class",
+    "strikes_att_per_min",
+    "strikes_landed_per_min",
+    "strike_pct",
+    "strikes_absorbed_per_min",
+    "strikes_att_against_per_min",
+    "strike_def_pct",
+    "sig_strikes_att_per_minute",
+    "sig_strikes_landed_per_min",
+    "sig_strike_pct",
+    "sig_strikes_absorbed_per_min",
+    "sig_strikes_att_against_per_min",
+    "sig_strike_def_pct",
+    "td_att_per_15_min",
+    "td_landed_per_15_min",
+    "td_pct",
+    "td_def_pct",
+    "sub_att_per_15_min",
+    "control_pct",
+    "control_against_pct",
+]
+
+SUMMED = [
+    "seconds",
+    "strikes_attempted",
+    "strikes_landed",
+    "strikes_absorbed",
+    "opp_strikes_attempted",
+    "sig_strikes_attempted",
+    "sig_strikes_landed",
+    "sig_strikes_absorbed",
+    "opp_sig_strikes_attempted",
+    "takedowns_attempted",
+    "takedowns",
+    "opp_takedowns",
+    "opp_takedowns_attempted",
+    "submission_attempts",
+    "control",
+    "control_against",
+]
+
+
+def export_rates(totals):
+    """
+    This function returns the export model's rates from summed totals
+    """
+
+    minutes = totals["seconds"] / 60
+
+    def ratio(numerator, denominator, scale=1):
+        # nothing attempted is NaN rather than 0 or inf
+        return (numerator * scale / denominator.where(denominator > 0)).astype(float)
+
+    rates = pd.DataFrame(index=totals.index)
+    for prefix, name in [("", "strikes"), ("sig_", "sig_strikes")]:
+        attempted = totals[f"{name}_attempted"]
+        landed = totals[f"{name}_landed"]
+        absorbed = totals[f"{name}_absorbed"]
+        attempted_against = totals[f"opp_{name}_attempted"]
+
+        rates[f"{name}_att_per_min{'ute' if prefix else ''}"] = round(
+            ratio(attempted, minutes), 2
+        )
+        rates[f"{name}_landed_per_min"] = round(ratio(landed, minutes), 2)
+        rates[f"{prefix}strike_pct"] = round(ratio(landed, attempted), 4)
+        rates[f"{name}_absorbed_per_min"] = round(ratio(absorbed, minutes), 2)
+        rates[f"{name}_att_against_per_min"] = round(
+            ratio(attempted_against, minutes), 2
+        )
+        rates[f"{prefix}strike_def_pct"] = round(ratio(absorbed, attempted_against), 4)
+
+    rates["td_att_per_15_min"] = round(
+        ratio(totals["takedowns_attempted"], minutes, 15), 2
+    )
+    rates["td_landed_per_15_min"] = round(ratio(totals["takedowns"], minutes, 15), 2)
+    rates["td_pct"] = round(
+        ratio(totals["takedowns"], totals["takedowns_attempted"]), 4
+    )
+    rates["td_def_pct"] = round(
+        ratio(totals["opp_takedowns"], totals["opp_takedowns_attempted"]), 4
+    )
+    rates["sub_att_per_15_min"] = round(
+        ratio(totals["submission_attempts"], minutes, 15), 2
+    )
+    rates["control_pct"] = round(ratio(totals["control"], totals["seconds"]), 4)
+    rates["control_against_pct"] = round(
+        ratio(totals["control_against"], totals["seconds"]), 4
+    )
+
+    return rates
+
+
+def aggregate(totals):
+    """
+    This function returns one row of rates per ufcstats_id and weight_class
+    in the per-fight totals
+    """
+
+    summed = totals.groupby(["ufcstats_id", "weight_class"], sort=True)[SUMMED].sum()
+
+    return export_rates(summed).reset_index()
+
+
+def model_totals(fight_data, by_division=False, division=None, since=None, until=None):
+    """
+    This function returns the per-fight totals in the window, with the
+    weight_class they are grouped under
+    """
+
+    totals = fight_totals(fight_data)
+    totals["weight_class"] = ALL_DIVISIONS
+    if by_division or division:
+        totals["weight_class"] = normalize_weight_class(
+            fight_data["weight_class"]
+        ).to_numpy(dtype=object)
+
+    keep = np.ones(len(totals), dtype=bool)
+    if division:
+        keep &= (totals["weight_class"] == division).to_numpy()
+    if since:
+        keep &= (totals["event_date"] >= pd.Timestamp(since)).to_numpy()
+    if until:
+        keep &= (totals["event_date"] < pd.Timestamp(until)).to_numpy()
+    totals = totals.loc[keep]
+
+    return totals[["ufcstats_id", "weight_class", *SUMMED]]
+
+
+def shards(fight_data, jobs):
+    """
+    This function returns the fight rows split into jobs (fight rows, their
+    fighters' ids) shards by fighter, each with the opponents' rows of the
+    shard's fights so the totals against them can be computed
+    """
+
+    ids = fight_data["ufcstats_id"].to_numpy(dtype=object)
+    codes, uniques = pd.factorize(ids)
+    opp_codes = pd.Index(uniques).get_indexer(
+        fight_data["opp_ufcstats_id"].to_numpy(dtype=object)
+    )
+
+    return [
+        (
+            fight_data.loc[(codes % jobs == shard) | (opp_codes % jobs == shard)],
+            uniques[np.arange(len(uniques)) % jobs == shard],
+        )
+        for shard in range(jobs)
+    ]
+
+
+def shard_rates(shard, by_division, division, since, until):
+    """
+    This function returns the rates of the fighters of one shard
+    """
+
+    fight_data, ids = shard
+    totals = model_totals(fight_data, by_division, division, since, until)
+
+    return aggregate(totals.loc[totals["ufcstats_id"].isin(ids)])
+
+
+def export_model(
+    fight_data,
+    fighter_names,
+    by_division=False,
+    division=None,
+    since=None,
+    until=None,
+    jobs=1,
+):
+    """
+    This function returns the export model for every fighter with fights in
+    the window, sorted by name, given ufcstats_id -> fighter name
+    """
+
+    if jobs > 1:
+        options = [by_division, division, since, until]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rates = pd.concat(
+                pool.map(
+                    shard_rates,
+                    shards(fight_data, jobs),
+                    *([option] * jobs for option in options),
+                )
+            )
+    else:
+        rates = aggregate(model_totals(fight_data, by_division, division, since, until))
+
+    rates["fighter_name"] = rates["ufcstats_id"].map(fighter_names)
+
+    return rates.sort_values(
+        by=["fighter_name", "ufcstats_id", "weight_class"],
+        kind="mergesort",
+        ignore_index=True,
+    )[EXPORT_COLUMNS]
+
+
+def load_fighter_names(fight_data):
+    """
+    This function returns ufcstats_id -> name, from fighters.csv and then from
+    the fight table for anyone it is missing
+    """
+
+    from ufc_data.loader import load_table
+
+    fighters = load_table("fighters")
+    names = pd.Series(
+        fighters["full_name"].astype(str).str.strip().to_numpy(),
+        index=fighters["ufcstats_id"].to_numpy(dtype=object),
+    )
+    fight_names = pd.Series(
+        fight_data["fighter_name"].to_numpy(dtype=object),
+        index=fight_data["ufcstats_id"].to_numpy(dtype=object),
+    )
+
+    names = pd.concat([names, fight_names])
+
+    return names[~names.index.duplicated(keep="first")]
+
+
+def iso_date(text):
+    """
+    This function returns a YYYY-MM-DD argument as a date, for argparse
+    """
+
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.export",
+        description=" ".join(__doc__.strip().splitlines()[:2]),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument(
+        "--by-division",
+        action="store_true",
+        help="one row per fighter and division they fought in",
+    )
+    parser.add_argument(
+        "--division", choices=DIVISIONS, help="only fights in this division"
+    )
+    parser.add_argument(
+        "--since", type=iso_date, help="only fights on or after this date (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--until", type=iso_date, help="only fights before this date (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="processes to shard the fighters across"
+    )
+    args = parser.parse_args(argv)
+
+    from ufc_data.reconcile import load_fights
+
+    fight_data = load_fights()
+    model = export_model(
+        fight_data,
+        load_fighter_names(fight_data),
+        by_division=args.by_division,
+        division=args.division,
+        since=args.since,
+        until=args.until,
+        jobs=args.jobs,
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    model.to_csv(args.output, index=False)
+    print(f"{len(model)} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Filtered, sorted and paged views of a fighter's fight log.
+
+A fighter's fights are already a contiguous, newest-first slice of the
+fight table (see ``ufc_data.index``). Filtering by opponent, method or year
+and sorting by any column only look at those columns of the slice, as NumPy
+arrays, and produce row positions; the frame itself is only copied for the
+rows of the page being shown and the columns being projected, so a fighter
+with a long history costs the same to draw as one with three fights.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+FIGHT_LOG_PAGE_SIZE = 25
+
+# filter name -> the fight table column it matches
+FIGHT_LOG_FILTERS = {
+    "opponent": "opp_name",
+    "method": "method",
+}
+
+
+def fight_log_options(fights):
+    """
+    This function returns the values each filter can take in a fighter's
+    fights: {"opponent": [...], "method": [...], "year": [newest first]}
+    """
+
+    options = {
+        name: sorted(
+            str(value)
+            for value in pd.unique(fights[column].to_numpy(dtype=object))
+            if isinstance(value, str)
+        )
+        for name, column in FIGHT_LOG_FILTERS.items()
+    }
+    years = fights["event_date"].dt.year.dropna().unique()
+    options["year"] = sorted((int(year) for year in years), reverse=True)
+
+    return options
+
+
+def fight_log_positions(
+    fights, opponent=None, method=None, year=None, sort_by=None, ascending=False
+):
+    """
+    This function returns the positions of the fights that pass the filters,
+    in sort order (the fights' own order when sort_by is None)
+    """
+
+    keep = np.ones(len(fights), dtype=bool)
+    for name, value in [("opponent", opponent), ("method", method)]:
+        if value is not None:
+            keep &= fights[FIGHT_LOG_FILTERS[name]].to_numpy(dtype=object) == value
+    if year is not None:
+        keep &= fights["event_date"].dt.year.to_numpy() == year
+
+    positions = np.flatnonzero(keep)
+    if sort_by is None:
+        return positions
+
+    # a stable sort of one column, so ties keep the newest-first order
+    values = fights[sort_by].iloc[positions].reset_index(drop=True)
+    order = values.sort_values(
+        ascending=ascending, kind="mergesort", na_position="last"
+    ).index.to_numpy()
+
+    return positions[order]
+
+
+def fight_log_page(fights, columns, page=0, page_size=FIGHT_LOG_PAGE_SIZE, **filters):
+    """
+    This function returns (one page of the filtered and sorted fights with
+    only the given columns, the number of fights that pass the filters)
+    """
+
+    positions = fight_log_positions(fights, **filters)
+    start = page * page_size
+
+    rows = fights.iloc[
+        positions[start : start + page_size], fights.columns.get_indexer(columns)
+    ]
+
+    return rows, len(positions)
@@ -0,0 +1,240 @@
+"""
+Point-in-time career stats, as they stood before any fight or on any date.
+
+fighter_career_stats.csv and the derived stats are career totals as of the
+last scrape, so using them to evaluate a past fight (against its
+``fighter_odds``, say) leaks what happened after it. ``fight_features`` gives
+every fight_data row the fighter's and the opponent's career stats from
+their earlier fights only: per-day totals, a cumulative sum per fighter,
+minus the day itself so fights on the same day never see each other. The whole
+table is one vectorized pass instead of a recomputation per fight.
+
+``career_stats_as_of`` is the same stats for every fighter on one date.
+
+The counts come from fight_data.csv, so "career" here starts with the first
+fight in it (2018), not with a fighter's debut.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# total name -> the fight_data column summed for the fighter
+TOTALS_FOR = {
+    "sig_strikes_landed": "fighter_total_sig_strikes_landed",
+    "sig_strikes_attempted": "fighter_total_sig_strikes_attempted",
+    "strikes_landed": "fighter_total_strikes_landed",
+    "strikes_attempted": "fighter_total_strikes_attempted",
+    "takedowns": "fighter_total_takedowns",
+    "takedowns_attempted": "fighter_total_takedowns_attempted",
+    "submission_attempts": "fighter_total_submission_attempts",
+    "control": "fighter_total_control",
+}
+
+# total name -> the opponent's fight_data column summed against the fighter
+TOTALS_AGAINST = {
+    "sig_strikes_absorbed": "fighter_total_sig_strikes_landed",
+    "opp_sig_strikes_attempted": "fighter_total_sig_strikes_attempted",
+    "strikes_absorbed": "fighter_total_strikes_landed",
+    "opp_strikes_attempted": "fighter_total_strikes_attempted",
+    "opp_takedowns": "fighter_total_takedowns",
+    "opp_takedowns_attempted": "fighter_total_takedowns_attempted",
+    "control_against": "fighter_total_control",
+}
+
+# methods of bouts with no result, as opposed to draws (which are decisions)
+NO_CONTEST_METHODS = ["Overturned", "Could Not Continue"]
+
+# the stats career_stats computes from the totals, as the dashboard shows them
+CAREER_STATS = [
+    "fights",
+    "wins",
+    "losses",
+    "draws",
+    "no_contests",
+    "sig_strikes_landed_per_minute",
+    "sig_strike_accuracy",
+    "sig_strikes_absorbed_per_minute",
+    "sig_strike_defence",
+    "strikes_landed_per_minute",
+    "strike_accuracy",
+    "strikes_absorbed_per_minute",
+    "avg_takedowns_per_15_minutes",
+    "takedown_accuracy",
+    "takedown_defence",
+    "avg_submission_attempts_per_15_minutes",
+    "control_percentage",
+    "control_against_percentage",
+    "avg_win_new_dk_score",
+]
+
+
+def fight_totals(fight_data):
+    """
+    This function returns one row of int64/float64 totals per fight_data row,
+    with what the fighter did and what their opponent did to them
+    """
+
+    fights = fight_data[
+        ["fight_id", "event_date", "ufcstats_id", "opp_ufcstats_id"]
+    ].astype({"fight_id": object, "ufcstats_id": object, "opp_ufcstats_id": object})
+
+    # the small int columns are cast before summing so nothing wraps around
+    totals = pd.DataFrame(
+        {
+            name: fight_data[column].to_numpy(dtype=np.int64)
+            for name, column in TOTALS_FOR.items()
+        },
+        index=fight_data.index,
+    )
+    totals["seconds"] = fight_data["fight_time_seconds"].to_numpy(dtype=np.int64)
+    totals["fights"] = 1
+    totals["wins"] = fight_data["fighter_winner"].to_numpy(dtype=np.int64)
+    totals["win_new_dk_score"] = np.where(
+        totals["wins"] == 1, fight_data["fighter_new_dk_score"].to_numpy(), 0.0
+    )
+
+    # getting the opponent's row of the same fight
+    opponent = pd.DataFrame(
+        {
+            name: fight_data[column].to_numpy(dtype=np.int64)
+            for name, column in TOTALS_AGAINST.items()
+        }
+    )
+    opponent["opp_winner"] = fight_data["fighter_winner"].to_numpy(dtype=np.int64)
+    opponent["fight_id"] = fights["fight_id"].to_numpy()
+    opponent["opp_ufcstats_id"] = fights["ufcstats_id"].to_numpy()
+    against = fights[["fight_id", "opp_ufcstats_id"]].merge(
+        opponent, on=["fight_id", "opp_ufcstats_id"], how="left"
+    )
+    for name in TOTALS_AGAINST:
+        totals[name] = against[name].fillna(0).to_numpy(dtype=np.int64)
+
+    # a loss is only a fight the opponent won; draws, no contests and
+    # overturned results have neither side marked as the winner
+    totals["losses"] = against["opp_winner"].fillna(0).to_numpy(dtype=np.int64)
+    no_result = 1 - totals["wins"] - totals["losses"]
+    is_no_contest = fight_data["method"].isin(NO_CONTEST_METHODS).to_numpy()
+    totals["draws"] = np.where(is_no_contest, 0, no_result)
+    totals["no_contests"] = np.where(is_no_contest, no_result, 0)
+
+    return pd.concat([fights, totals], axis=1)
+
+
+def career_rates(totals):
+    """
+    This function returns the CAREER_STATS computed from summed totals
+    """
+
+    minutes = totals["seconds"] / 60
+
+    def ratio(numerator, denominator, scale=1):
+        # no fights yet, or nothing attempted, is NaN rather than 0 or inf
+        return (numerator * scale / denominator.where(denominator > 0)).astype(float)
+
+    stats = pd.DataFrame(index=totals.index)
+    stats["fights"] = totals["fights"]
+    stats["wins"] = totals["wins"]
+    stats["losses"] = totals["losses"]
+    stats["draws"] = totals["draws"]
+    stats["no_contests"] = totals["no_contests"]
+
+    stats["sig_strikes_landed_per_minute"] = round(
+        ratio(totals["sig_strikes_landed"], minutes), 2
+    )
+    stats["sig_strike_accuracy"] = round(
+        ratio(totals["sig_strikes_landed"], totals["sig_strikes_attempted"], 100)
+    )
+    stats["sig_strikes_absorbed_per_minute"] = round(
+        ratio(totals["sig_strikes_absorbed"], minutes), 2
+    )
+    stats["sig_strike_defence"] = round(
+        100
+        - ratio(
+            totals["sig_strikes_absorbed"], totals["opp_sig_strikes_attempted"], 100
+        )
+    )
+    stats["strikes_landed_per_minute"] = round(
+        ratio(totals["strikes_landed"], minutes), 2
+    )
+    stats["strike_accuracy"] = ratio(
+        totals["strikes_landed"], totals["strikes_attempted"], 100
+    )
+    stats["strikes_absorbed_per_minute"] = round(
+        ratio(totals["strikes_absorbed"], minutes), 2
+    )
+    stats["avg_takedowns_per_15_minutes"] = round(
+        ratio(totals["takedowns"], minutes, 15), 2
+    )
+    stats["takedown_accuracy"] = round(
+        ratio(totals["takedowns"], totals["takedowns_attempted"], 100)
+    )
+    stats["takedown_defence"] = round(
+        100 - ratio(totals["opp_takedowns"], totals["opp_takedowns_attempted"], 100)
+    )
+    stats["avg_submission_attempts_per_15_minutes"] = round(
+        ratio(totals["submission_attempts"], minutes, 15), 2
+    )
+    stats["control_percentage"] = round(
+        ratio(totals["control"], totals["seconds"], 100), 2
+    )
+    stats["control_against_percentage"] = round(
+        ratio(totals["control_against"], totals["seconds"], 100), 2
+    )
+    stats["avg_win_new_dk_score"] = ratio(totals["win_new_dk_score"], totals["wins"])
+
+    return stats
+
+
+def fight_features(fight_data):
+    """
+    This function returns every fight_data row with the fighter's and the
+    opponent's (opp_*) career stats from before that fight's date
+    """
+
+    totals = fight_totals(fight_data)
+    summed = totals.columns.drop(
+        ["fight_id", "event_date", "ufcstats_id", "opp_ufcstats_id"]
+    )
+
+    # getting each fighter's totals per day, then everything before that day
+    daily = totals.groupby(["ufcstats_id", "event_date"], sort=True)[summed].sum()
+    before = daily.groupby(level="ufcstats_id").cumsum() - daily
+    stats = career_rates(before).reset_index()
+
+    features = totals[["fight_id", "event_date", "ufcstats_id", "opp_ufcstats_id"]]
+    features = features.merge(stats, on=["ufcstats_id", "event_date"], how="left")
+
+    opponent_stats = stats.rename(
+        columns={
+            "ufcstats_id": "opp_ufcstats_id",
+            **{stat: f"opp_{stat}" for stat in CAREER_STATS},
+        }
+    )
+    features = features.merge(
+        opponent_stats, on=["opp_ufcstats_id", "event_date"], how="left"
+    )
+
+    features["fighter_odds"] = fight_data["fighter_odds"].to_numpy()
+    features["fighter_winner"] = fight_data["fighter_winner"].to_numpy()
+
+    return features.sort_values(
+        by=["event_date", "fight_id", "ufcstats_id"],
+        kind="mergesort",
+        ignore_index=True,
+    )
+
+
+def career_stats_as_of(fight_data, date):
+    """
+    This function returns every fighter's career stats from their fights
+    before date, indexed by ufcstats_id
+    """
+
+    totals = fight_totals(fight_data)
+    totals = totals.loc[totals["event_date"] < pd.Timestamp(date)]
+    summed = totals.columns.drop(
+        ["fight_id", "event_date", "ufcstats_id", "opp_ufcstats_id"]
+    )
+
+    return career_rates(totals.groupby("ufcstats_id")[summed].sum())
@@ -0,0 +1,122 @@
+"""
+Per-fighter row index over the fight, fighter and career stats tables.
+
+The derived build writes the fight table sorted by fighter and then newest
+fight first (``fighter_fights``), so a fighter's fight log is the contiguous
+slice ``fights.iloc[start:stop]`` of the memory-mapped table, which worker
+processes share instead of each sorting their own copy. The
+fighter and career stats tables get a ufcstats_id -> row position dict. Every
+lookup is a dict hit plus a positional slice instead of a full-column
+``df["ufcstats_id"] == ufcstats_id`` scan.
+"""
+
+import numpy as np
+
+from ufc_data.derived import load_derived, load_fighter_fights
+from ufc_data.loader import cached_read
+
+
+class FighterIndex:
+    """
+    Row positions of every fighter in the fight, fighter and career stats tables
+    """
+
+    def __init__(self, fighter_fights, fighters, career_stats):
+        # sorted by fighter and then newest fight first, see derived.fighter_fights
+        self.fights = fighter_fights
+        self.fighters = fighters
+        self.career_stats = career_stats
+
+        ids = self.fights["ufcstats_id"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        stops = np.r_[starts[1:], len(ids)]
+        self.fight_slices = {
+            ids[start]: (start, stop)
+            for start, stop in zip(starts.tolist(), stops.tolist())
+        }
+
+        self.fighter_positions = first_positions(fighters["ufcstats_id"])
+        self.career_positions = first_positions(career_stats["ufcstats_id"])
+
+    def fight_count(self, ufcstats_id):
+        """
+        This function returns how many fights a fighter has in the fight table
+        """
+
+        start, stop = self.fight_slices.get(ufcstats_id, (0, 0))
+
+        return stop - start
+
+    def fight_rows(self, ufcstats_id):
+        """
+        This function returns a fighter's fights, newest first
+        """
+
+        start, stop = self.fight_slices.get(ufcstats_id, (0, 0))
+
+        return self.fights.iloc[start:stop]
+
+    def bout_rows(self, ufcstats_id):
+        """
+        This function returns both fighters' rows of each of a fighter's fights
+        """
+
+        fight_ids = self.fight_rows(ufcstats_id)["fight_id"]
+
+        return self.fights.loc[self.fights["fight_id"].isin(fight_ids)]
+
+    def fighter_row(self, ufcstats_id):
+        """
+        This function returns a fighter's profile as a one-row DataFrame
+        (empty if the fighter is unknown)
+        """
+
+        return row_at(self.fighters, self.fighter_positions, ufcstats_id)
+
+    def career_row(self, ufcstats_id):
+        """
+        This function returns a fighter's career stats as a one-row DataFrame
+        (empty if the fighter is unknown)
+        """
+
+        return row_at(self.career_stats, self.career_positions, ufcstats_id)
+
+
+def first_positions(ids):
+    """
+    This function returns {id: position of its first row}
+    """
+
+    ids = ids.to_numpy()
+    uniques, positions = np.unique(ids, return_index=True)
+
+    return dict(zip(uniques.tolist(), positions.tolist()))
+
+
+def row_at(df, positions, ufcstats_id):
+    """
+    This function returns the row of df at an id's position, as a DataFrame
+    """
+
+    position = positions.get(ufcstats_id)
+
+    return df.iloc[0:0] if position is None else df.iloc[position : position + 1]
+
+
+def load_fighter_index():
+    """
+    This function returns the FighterIndex over the loaded tables, building it
+    again only when one of them was reloaded
+    """
+
+    fighter_fights = load_fighter_fights()
+    fighters, career_stats = load_derived()
+
+    # the index holds on to the frames, so their ids can't be reused while cached
+    key = (id(fighter_fights), id(fighters), id(career_stats))
+
+    return cached_read(
+        "fighter_index",
+        key,
+        lambda: FighterIndex(fighter_fights, fighters, career_stats),
+    )
@@ -0,0 +1,344 @@
+"""
+Local-first loading of the csvs that ship with this repo.
+
+Every table is read from the repo checkout and the parsed DataFrame is kept
+in a process-wide cache keyed on the file path plus its mtime and size, so a
+Streamlit rerun only pays for an ``os.stat`` call. Editing or replacing a csv
+changes its key and the next call re-reads it.
+
+When ``python -m ufc_data.build`` has written a typed snapshot of a table
+(see ``ufc_data.snapshot``) and it still matches the csv, the snapshot is
+loaded instead of parsing the csv.
+
+The raw.githubusercontent.com copy is only used as a fallback when the local
+file is missing and the fallback is enabled, either per call or with the
+``UFC_DATA_REMOTE_FALLBACK`` env var.
+
+Frames handed out by ``load_table`` are shared between callers. Treat them as
+read-only and build new frames (merge, assign, copy) instead of mutating them.
+
+The cache is per process, so every Streamlit session (each runs on its own
+thread) shares one copy of each table, and concurrent first sessions wait for
+a single read instead of each building their own. Several server processes
+share the memory-mapped build in ``BUILD_DIR``; whichever finds it stale
+rebuilds it under ``build_lock`` while the others wait and then map it.
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # windows, where builds are only locked within a process
+    fcntl = None
+
+import pandas as pd
+
+from ufc_data.schema import SCHEMAS, apply_schema
+from ufc_data.snapshot import META_FILE, read_frame, read_meta, write_frame
+
+
+DATA_DIR = os.environ.get(
+    "UFC_DATA_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+BUILD_DIR = os.environ.get("UFC_DATA_BUILD_DIR", os.path.join(DATA_DIR, "build"))
+
+# bump this whenever the snapshot layout changes (schema changes are detected)
+SNAPSHOT_VERSION = 1
+
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/mjester93/ufc-data/main/"
+
+# name -> file in the repo and extra read_csv arguments, column types live in ufc_data.schema
+TABLES = {
+    "fighters": {
+        "file": "fighters.csv",
+        "read_csv": {"low_memory": False},
+    },
+    "career_stats": {
+        "file": "fighter_career_stats.csv",
+        "read_csv": {"low_memory": False},
+    },
+    "fight_data": {
+        "file": "fight_data.csv",
+        "read_csv": {"low_memory": False, "thousands": ","},
+    },
+    "fight_round_data": {
+        "file": "fight_round_data.csv",
+        "read_csv": {"low_memory": False, "thousands": ","},
+    },
+    "external_ids": {
+        "file": "external_ids.csv",
+        "read_csv": {
+            "low_memory": False,
+            "dtype": {"espn_id": str, "sherdog_id": str},
+        },
+    },
+    "events": {
+        "file": "events.csv",
+        "read_csv": {"low_memory": False},
+    },
+    "events_fights": {
+        "file": "events_fights.csv",
+        "read_csv": {"low_memory": False},
+    },
+    "betting_odds": {
+        "file": "betting_odds.csv",
+        "read_csv": {"low_memory": False, "encoding": "utf-8-sig"},
+    },
+    "new_fight_stats": {
+        "file": "new-fight-stats.csv",
+        "read_csv": {"low_memory": False, "thousands": ","},
+    },
+    "fight_data_2019_2020": {
+        "file": "fight_data - 2019-2020 ACCURATE.csv",
+        "read_csv": {"low_memory": False, "thousands": ","},
+    },
+    "fighter_export_model": {
+        "file": "fighter-export-model.csv",
+        "read_csv": {"low_memory": False},
+    },
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+# held while a missing value is read, so concurrent misses read it once; one
+# lock for every cache name, so readers that build (under build_lock) and
+# builds that read always take the two locks in the same order
+_read_lock = threading.RLock()
+
+_build_lock = threading.RLock()
+_build_lock_depth = 0
+
+
+def table_path(name):
+    """
+    This function returns the local path of a table's csv
+    """
+
+    return os.path.join(DATA_DIR, TABLES[name]["file"])
+
+
+def remote_url(name):
+    """
+    This function returns the raw github url of a table's csv
+    """
+
+    return f"{REMOTE_BASE_URL}{TABLES[name]['file'].replace(' ', '%20')}?raw=True"
+
+
+def file_key(path):
+    """
+    This function returns the cache key of a local file, or None if it is missing
+    """
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def remote_fallback_enabled():
+    """
+    This function returns whether the remote csvs may be used when a local one is missing
+    """
+
+    return os.environ.get("UFC_DATA_REMOTE_FALLBACK", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+
+def read_table(name, source):
+    """
+    This function parses a table from a path or url, without caching
+    """
+
+    df = pd.read_csv(source, **TABLES[name].get("read_csv", {}))
+
+    return apply_schema(df, SCHEMAS[name], table=name)
+
+
+def snapshot_dir(name=None):
+    """
+    This function returns the snapshot directory, or a table's directory in it
+    """
+
+    directory = os.path.join(BUILD_DIR, f"snapshot_v{SNAPSHOT_VERSION}")
+
+    return directory if name is None else os.path.join(directory, name)
+
+
+def read_snapshot(name):
+    """
+    This function returns a table from its snapshot, or None if there is no
+    snapshot matching the current csv
+    """
+
+    directory = snapshot_dir(name)
+    meta = read_meta(directory)
+    if meta is None or meta["schema"] != SCHEMAS[name]:
+        return None
+    if not fingerprint_matches(table_path(name), meta["source"]):
+        return None
+
+    return read_frame(directory, meta)
+
+
+def build_snapshot(names=None):
+    """
+    This function parses the csvs and writes a snapshot of each table, returning
+    {name: rows}
+    """
+
+    rows = {}
+    for name in names or TABLES:
+        path = table_path(name)
+        meta = write_frame(
+            read_table(name, path),
+            snapshot_dir(name),
+            schema=SCHEMAS[name],
+            meta={"table": name, "source": file_fingerprint(path)},
+        )
+        rows[name] = meta["rows"]
+
+    return rows
+
+
+def load_table(name, remote_fallback=None):
+    """
+    This function returns the parsed DataFrame for a table, reading it at most
+    once per version of the file
+    """
+
+    if name not in TABLES:
+        raise KeyError(f"unknown table {name!r}, expected one of {sorted(TABLES)}")
+
+    path = table_path(name)
+    key = file_key(path)
+    source = path
+
+    if key is None:
+        if remote_fallback is None:
+            remote_fallback = remote_fallback_enabled()
+        if not remote_fallback:
+            raise FileNotFoundError(
+                f"{path} does not exist, set UFC_DATA_REMOTE_FALLBACK=1 to read it from github"
+            )
+        source = remote_url(name)
+        return cached_read(name, (source,), lambda: read_table(name, source))
+
+    def reader():
+        df = read_snapshot(name)
+        return read_table(name, source) if df is None else df
+
+    key = (key, file_key(os.path.join(snapshot_dir(name), META_FILE)))
+
+    return cached_read(name, key, reader)
+
+
+def cached_read(cache_name, key, reader):
+    """
+    This function returns the cached result of reader() for cache_name, calling
+    it again only when key changes
+    """
+
+    with _cache_lock:
+        cached = _cache.get(cache_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    with _read_lock:
+        # another thread may have read it while this one waited
+        with _cache_lock:
+            cached = _cache.get(cache_name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+        value = reader()
+
+        with _cache_lock:
+            _cache[cache_name] = (key, value)
+
+    return value
+
+
+@contextlib.contextmanager
+def build_lock():
+    """
+    This function holds an exclusive lock on BUILD_DIR across processes and
+    threads, for writing build outputs (nested uses only lock once)
+    """
+
+    global _build_lock_depth
+
+    with _build_lock:
+        if _build_lock_depth or fcntl is None:
+            _build_lock_depth += 1
+            try:
+                yield
+            finally:
+                _build_lock_depth -= 1
+            return
+
+        os.makedirs(BUILD_DIR, exist_ok=True)
+        with open(os.path.join(BUILD_DIR, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            _build_lock_depth += 1
+            try:
+                yield
+            finally:
+                _build_lock_depth -= 1
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def file_fingerprint(path):
+    """
+    This function returns the size, mtime and sha1 of a file
+    """
+
+    stat = os.stat(path)
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": sha1.hexdigest(),
+    }
+
+
+def fingerprint_matches(path, fingerprint):
+    """
+    This function returns whether a file still matches a fingerprint, only
+    hashing it when the size or mtime moved (e.g. after a git checkout)
+    """
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+
+    if stat.st_size != fingerprint["size"]:
+        return False
+    if stat.st_mtime_ns == fingerprint["mtime_ns"]:
+        return True
+
+    return file_fingerprint(path)["sha1"] == fingerprint["sha1"]
+
+
+def clear_cache():
+    """
+    This function drops every cached table
+    """
+
+    with _cache_lock:
+        _cache.clear()
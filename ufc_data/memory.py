@@ -0,0 +1,89 @@
+"""
+Per-table memory report for the compact schema.
+
+    python -m ufc_data.memory
+
+For every table this compares the DataFrame pandas infers from the csv
+(object strings, int64/float64) with the one ``apply_schema`` produces, using
+``memory_usage(deep=True)``. When a snapshot exists it also shows how much of
+the compact frame is memory-mapped, i.e. shared between every process that
+loads it rather than counted against each one.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.loader import TABLES, read_snapshot, table_path
+from ufc_data.schema import SCHEMAS, apply_schema
+
+
+def mapped_bytes(df):
+    """
+    This function returns how many bytes of df's columns are backed by a memory map
+    """
+
+    total = 0
+    for column in df.columns:
+        values = df[column].array
+        arrays = [getattr(values, "codes", None), getattr(values, "_ndarray", None)]
+        for array in arrays:
+            base = array
+            while isinstance(base, np.ndarray) and not isinstance(base, np.memmap):
+                base = base.base
+            if isinstance(base, np.memmap):
+                total += array.nbytes
+
+    return total
+
+
+def memory_report(names=None):
+    """
+    This function returns a DataFrame of per-table memory before and after the
+    compact schema, in bytes
+    """
+
+    rows = []
+    for name in names or TABLES:
+        default = pd.read_csv(table_path(name), **TABLES[name].get("read_csv", {}))
+        compact = apply_schema(default, SCHEMAS[name], table=name)
+        snapshot = read_snapshot(name)
+
+        rows.append(
+            {
+                "table": name,
+                "rows": len(default),
+                "default_bytes": int(default.memory_usage(deep=True).sum()),
+                "compact_bytes": int(compact.memory_usage(deep=True).sum()),
+                "mapped_bytes": 0 if snapshot is None else mapped_bytes(snapshot),
+            }
+        )
+
+    report = pd.DataFrame(rows)
+    report.loc[len(report)] = ["total", *report.drop(columns="table").sum()]
+    report["saved_pct"] = round(
+        (1 - report["compact_bytes"] / report["default_bytes"]) * 100, 1
+    )
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.memory", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        "tables", nargs="*", help=f"tables to report, from {sorted(TABLES)}"
+    )
+    args = parser.parse_args(argv)
+
+    report = memory_report(args.tables)
+    for column in ["default_bytes", "compact_bytes", "mapped_bytes"]:
+        report[column.replace("_bytes", "_mb")] = round(report.pop(column) / 1e6, 2)
+
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
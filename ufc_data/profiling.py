@@ -0,0 +1,244 @@
+"""
+Opt-in timing, memory and cProfile instrumentation of a dashboard run.
+
+Off by default. It is switched on for every run with ``UFC_PROFILE=1`` or for
+one page with ``?profile=1``; ``UFC_PROFILE=cprofile`` / ``?profile=cprofile``
+also runs the whole script under cProfile.
+
+The dashboard marks where each of its sections starts with
+``profiler.lap(name)`` and wraps its helpers in ``@profiled``. Every section
+records its wall time and the change in the process' resident memory, is
+logged as one json line on the ``ufc_data.profile`` logger (and appended to
+``UFC_PROFILE_LOG`` if set), and is shown in a collapsed panel at the bottom
+of the page. cProfile output is dumped to ``build/profiles/`` as well. The
+dashboard calls ``finish`` before each ``st.stop()`` too, so a run cut short
+by it is still logged.
+
+When profiling is off ``start_profiler`` returns a profiler whose methods do
+nothing, so the instrumented script costs the same as before.
+"""
+
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+
+from ufc_data.loader import BUILD_DIR
+
+
+PROFILE_ENV = "UFC_PROFILE"
+PROFILE_LOG_ENV = "UFC_PROFILE_LOG"
+PROFILE_DIR = os.path.join(BUILD_DIR, "profiles")
+PROFILE_TOP = 30
+
+logger = logging.getLogger("ufc_data.profile")
+
+# the profiler of the script run on this thread, see profiled
+_active = threading.local()
+
+
+def rss_mb():
+    """
+    This function returns the process' resident memory in MB, or its peak
+    where the current value can't be read
+    """
+
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError, AttributeError):
+        import resource
+
+        # ru_maxrss is in KB on linux and in bytes on macos
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if peak > 1 << 32 else peak / 1e3
+
+
+def profile_mode(query_params=None):
+    """
+    This function returns None, "timing" or "cprofile" from the query
+    parameters (as Streamlit returns them) or the environment
+    """
+
+    values = (query_params or {}).get("profile") or [os.environ.get(PROFILE_ENV)]
+    value = (values[0] or "").lower()
+
+    if value == "cprofile":
+        return "cprofile"
+    if value in ("1", "true", "yes", "timing"):
+        return "timing"
+
+    return None
+
+
+class NullProfiler:
+    """
+    A profiler that records nothing, used when profiling is off
+    """
+
+    enabled = False
+
+    def lap(self, name):
+        pass
+
+    @contextlib.contextmanager
+    def section(self, name):
+        yield
+
+    def stop(self):
+        pass
+
+    def finish(self):
+        return []
+
+
+class Profiler:
+    """
+    Per-section wall time and memory of one script run, plus optional cProfile
+    """
+
+    enabled = True
+
+    def __init__(self, mode="timing"):
+        self.mode = mode
+        self.run_id = uuid.uuid4().hex[:12]
+        self.sections = []
+        self.current = None
+        self.profile = None
+        self.profile_path = None
+        self.profile_text = None
+        self.started = time.perf_counter()
+        self.rss_start = rss_mb()
+
+        if mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def record(self, name, started, rss_before):
+        """
+        This function records a finished section and logs it
+        """
+
+        section = {
+            "run_id": self.run_id,
+            "section": name,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "rss_mb": round(rss_mb(), 1),
+        }
+        section["rss_delta_mb"] = round(section["rss_mb"] - rss_before, 1)
+        self.sections.append(section)
+        log_section(section)
+
+    def lap(self, name):
+        """
+        This function ends the running section, if any, and starts another one
+        """
+
+        if self.current is not None:
+            self.record(*self.current)
+        self.current = (name, time.perf_counter(), rss_mb())
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """
+        This function times the body of a with block as a section
+        """
+
+        started, rss_before = time.perf_counter(), rss_mb()
+        try:
+            yield
+        finally:
+            self.record(name, started, rss_before)
+
+    def stop(self):
+        """
+        This function stops the run's cProfile, if any
+        """
+
+        if self.profile is not None:
+            self.profile.disable()
+
+    def finish(self):
+        """
+        This function ends the run and returns its sections in the order
+        they started, with a total
+        """
+
+        if self.current is not None:
+            self.record(*self.current)
+            self.current = None
+        self.record("total", self.started, self.rss_start)
+
+        if self.profile is not None:
+            self.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profile_path = os.path.join(PROFILE_DIR, f"{self.run_id}.prof")
+            self.profile.dump_stats(self.profile_path)
+
+            text = io.StringIO()
+            pstats.Stats(self.profile, stream=text).sort_stats(
+                "cumulative"
+            ).print_stats(PROFILE_TOP)
+            self.profile_text = text.getvalue()
+
+        return sorted(self.sections, key=lambda section: section["start_ms"])
+
+
+def log_section(section):
+    """
+    This function writes a section as one json line to the profile logger
+    and, if set, the UFC_PROFILE_LOG file
+    """
+
+    line = json.dumps(section)
+    logger.info(line)
+
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if path:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+def start_profiler(query_params=None):
+    """
+    This function returns the profiler for this script run, a NullProfiler
+    unless profiling was asked for
+    """
+
+    # a run that ended without finish() leaves its cProfile hooked to this
+    # thread, where it would keep profiling every later run
+    previous = getattr(_active, "profiler", None)
+    if previous is not None:
+        previous.stop()
+
+    mode = profile_mode(query_params)
+    profiler = NullProfiler() if mode is None else Profiler(mode)
+    _active.profiler = profiler
+
+    return profiler
+
+
+def profiled(function):
+    """
+    This function wraps function so that each call is a section of the
+    running profiler
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = getattr(_active, "profiler", None)
+        if profiler is None or not profiler.enabled:
+            return function(*args, **kwargs)
+        with profiler.section(f"{function.__name__}()"):
+            return function(*args, **kwargs)
+
+    return wrapper
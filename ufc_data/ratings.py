@@ -0,0 +1,457 @@
+"""
+Elo ratings of every fighter, updated one event at a time.
+
+Bouts come from events_fights.csv (with dates from events.csv) plus any
+fight_data-shaped drop such as new-fight-stats.csv, one row per fight_id.
+Events are rated in date order and every bout of an event uses the ratings
+from before it, so an event is one vectorized update. Draws score 0.5 and
+no contests (overturned results, accidental fouls) are skipped. Fighters
+start at ``INITIAL_RATING`` and move faster (``K_FACTOR_NEW``) for their
+first ``PROVISIONAL_FIGHTS`` fights.
+
+The current ratings and the per-bout history are kept under
+``build/ratings_v<n>/``. ``update_ratings`` only rates the bouts that are not
+in the history yet, so a new event costs one update instead of a replay of
+every event. History is only replayed when it would change: different
+parameters, or a bout that was added before the end of the history (or to an
+event that is already rated), removed, or given a different result or date.
+The replay starts from the event of the earliest such bout.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.loader import (
+    BUILD_DIR,
+    build_lock,
+    cached_read,
+    file_fingerprint,
+    file_key,
+    fingerprint_matches,
+    load_table,
+    table_path,
+)
+from ufc_data.snapshot import META_FILE, read_frame, read_meta, write_frame
+
+
+# bump this whenever the stored columns change
+RATINGS_VERSION = 1
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+K_FACTOR_NEW = 48.0
+PROVISIONAL_FIGHTS = 5
+
+RATING_PARAMS = {
+    "initial_rating": INITIAL_RATING,
+    "k_factor": K_FACTOR,
+    "k_factor_new": K_FACTOR_NEW,
+    "provisional_fights": PROVISIONAL_FIGHTS,
+}
+
+SOURCE_TABLES = ["events_fights", "events", "new_fight_stats"]
+
+BOUT_COLUMNS = [
+    "event_date",
+    "event_id",
+    "fight_id",
+    "fighter_a",
+    "fighter_b",
+    "score_a",
+]
+
+
+def ratings_dir():
+    """
+    This function returns the directory the ratings and their history live in
+    """
+
+    return os.path.join(BUILD_DIR, f"ratings_v{RATINGS_VERSION}")
+
+
+def pair_fighters(rows, score):
+    """
+    This function returns one bout per fight_id from two rows per fight, with
+    fighter_a's score computed by score(first rows)
+    """
+
+    rows = rows.sort_values(by=["fight_id", "ufcstats_id"], kind="mergesort")
+    first = rows.drop_duplicates(subset=["fight_id"], keep="first")
+    second = rows.drop_duplicates(subset=["fight_id"], keep="last")
+    second = second.set_index("fight_id")["ufcstats_id"].reindex(first["fight_id"])
+
+    bouts = first[["event_date", "event_id", "fight_id"]].copy()
+    bouts["fighter_a"] = first["ufcstats_id"].to_numpy()
+    bouts["fighter_b"] = second.to_numpy()
+    bouts["score_a"] = score(first)
+
+    # a fight with a single row has no opponent to rate against
+    return bouts.loc[bouts["fighter_a"] != bouts["fighter_b"]]
+
+
+def bouts_from_events(events_fights, events):
+    """
+    This function returns the bouts of events_fights.csv, dated by events.csv
+    """
+
+    rows = events_fights.astype(
+        {
+            "event_id": object,
+            "fight_id": object,
+            "fighter_id": object,
+            "winning_fighter": object,
+        }
+    ).rename(columns={"fighter_id": "ufcstats_id"})
+    rows = rows.merge(events[["event_id", "event_date"]], on="event_id", how="inner")
+
+    def score(first):
+        winner = first["winning_fighter"]
+        return np.select(
+            [winner == first["ufcstats_id"], winner == "DRAW", winner.notna()],
+            [1.0, 0.5, 0.0],
+            default=np.nan,
+        )
+
+    return pair_fighters(rows, score)
+
+
+def bouts_from_fight_data(fight_data):
+    """
+    This function returns the bouts of a fight_data-shaped table
+    """
+
+    rows = fight_data[
+        ["event_date", "event_id", "fight_id", "ufcstats_id", "fighter_winner"]
+    ].astype({"event_id": object, "fight_id": object, "ufcstats_id": object})
+    rows["method"] = fight_data["method"].astype(object).to_numpy()
+    rows["decided"] = rows.groupby("fight_id")["fighter_winner"].transform("any")
+
+    def score(first):
+        # nobody won: a decision is a draw, anything else is a no contest
+        is_decision = first["method"].str.startswith("Decision", na=False)
+        return np.select(
+            [first["fighter_winner"], first["decided"], is_decision],
+            [1.0, 0.0, 0.5],
+            default=np.nan,
+        )
+
+    return pair_fighters(rows, score)
+
+
+def load_bouts():
+    """
+    This function returns every rated bout (no contests dropped) in date order
+    """
+
+    bouts = pd.concat(
+        [
+            bouts_from_events(load_table("events_fights"), load_table("events")),
+            bouts_from_fight_data(load_table("new_fight_stats")),
+        ],
+        ignore_index=True,
+    )
+    bouts = bouts.drop_duplicates(subset=["fight_id"], keep="first")
+    bouts = bouts.loc[bouts["score_a"].notna()]
+
+    return bouts.sort_values(
+        by=["event_date", "event_id", "fight_id"], kind="mergesort", ignore_index=True
+    )[BOUT_COLUMNS]
+
+
+def rate_bouts(bouts, ratings=None):
+    """
+    This function rates bouts event by event starting from ratings (a frame
+    of rating and fights indexed by ufcstats_id) and returns (ratings, history)
+    """
+
+    ratings = ratings if ratings is not None else empty_ratings()
+    ids = (
+        pd.Index(ratings.index)
+        .append(
+            pd.Index(pd.unique(bouts[["fighter_a", "fighter_b"]].to_numpy().ravel()))
+        )
+        .drop_duplicates()
+    )
+
+    rating = ratings["rating"].reindex(ids, fill_value=INITIAL_RATING).to_numpy()
+    fights = ratings["fights"].reindex(ids, fill_value=0).to_numpy(dtype=np.int64)
+    last_event_date = ratings["last_event_date"].reindex(ids).to_numpy()
+
+    a = ids.get_indexer(bouts["fighter_a"])
+    b = ids.get_indexer(bouts["fighter_b"])
+    score_a = bouts["score_a"].to_numpy(dtype=float)
+    dates = bouts["event_date"].to_numpy()
+
+    before_a = np.empty(len(bouts))
+    before_b = np.empty(len(bouts))
+    after_a = np.empty(len(bouts))
+    after_b = np.empty(len(bouts))
+    expected_a = np.empty(len(bouts))
+
+    # bouts are in event order, every bout of an event sees the pre-event ratings
+    event_codes = pd.factorize(bouts["event_id"])[0]
+    starts = np.flatnonzero(np.r_[True, event_codes[1:] != event_codes[:-1]])
+    stops = np.r_[starts[1:], len(bouts)]
+    for start, stop in zip(starts, stops):
+        i, j = a[start:stop], b[start:stop]
+        ra, rb = rating[i], rating[j]
+        expected = 1 / (1 + 10 ** ((rb - ra) / 400))
+
+        k_a = np.where(fights[i] < PROVISIONAL_FIGHTS, K_FACTOR_NEW, K_FACTOR)
+        k_b = np.where(fights[j] < PROVISIONAL_FIGHTS, K_FACTOR_NEW, K_FACTOR)
+        delta = score_a[start:stop] - expected
+
+        np.add.at(rating, i, k_a * delta)
+        np.add.at(rating, j, -k_b * delta)
+        np.add.at(fights, i, 1)
+        np.add.at(fights, j, 1)
+        last_event_date[i] = dates[start]
+        last_event_date[j] = dates[start]
+
+        before_a[start:stop], before_b[start:stop] = ra, rb
+        after_a[start:stop], after_b[start:stop] = rating[i], rating[j]
+        expected_a[start:stop] = expected
+
+    # one history row per fighter per bout
+    side_a = pd.DataFrame(
+        {
+            "ufcstats_id": bouts["fighter_a"].to_numpy(),
+            "opp_ufcstats_id": bouts["fighter_b"].to_numpy(),
+            "score": score_a,
+            "expected": expected_a,
+            "rating_before": before_a,
+            "rating_after": after_a,
+        }
+    )
+    side_b = pd.DataFrame(
+        {
+            "ufcstats_id": bouts["fighter_b"].to_numpy(),
+            "opp_ufcstats_id": bouts["fighter_a"].to_numpy(),
+            "score": 1 - score_a,
+            "expected": 1 - expected_a,
+            "rating_before": before_b,
+            "rating_after": after_b,
+        }
+    )
+    for column in ["fight_id", "event_id", "event_date"]:
+        side_a.insert(0, column, bouts[column].to_numpy())
+        side_b.insert(0, column, bouts[column].to_numpy())
+
+    # interleaved, so appended history reads the same as a replayed one
+    history = pd.concat([side_a, side_b]).sort_index(kind="mergesort")
+    history = history.reset_index(drop=True)
+
+    ratings = pd.DataFrame(
+        {"rating": rating, "fights": fights, "last_event_date": last_event_date},
+        index=ids.rename("ufcstats_id"),
+    )
+    ratings["last_event_date"] = pd.to_datetime(ratings["last_event_date"])
+
+    return ratings, history
+
+
+def empty_ratings():
+    """
+    This function returns a ratings frame without any fighters
+    """
+
+    return pd.DataFrame(
+        {
+            "rating": pd.Series(dtype=float),
+            "fights": pd.Series(dtype=np.int64),
+            "last_event_date": pd.Series(dtype="datetime64[ns]"),
+        },
+        index=pd.Index([], dtype=object, name="ufcstats_id"),
+    )
+
+
+def read_ratings(directory):
+    """
+    This function returns the stored (ratings, history, ratings metadata),
+    or None when there is nothing usable
+    """
+
+    meta = read_meta(os.path.join(directory, "ratings"))
+    history_meta = read_meta(os.path.join(directory, "history"))
+    if meta is None or history_meta is None:
+        return None
+
+    # the history is written first, a mismatch means the last update died halfway
+    if meta.get("params") != RATING_PARAMS or meta["history_rows"] != (
+        history_meta["rows"]
+    ):
+        return None
+
+    ratings = read_frame(os.path.join(directory, "ratings"), meta=meta, mmap=False)
+    history = read_frame(os.path.join(directory, "history"), mmap=False)
+
+    return ratings.set_index("ufcstats_id"), history, meta
+
+
+def rated_bouts(history):
+    """
+    This function returns the bouts a stored history was rated from, in the
+    order they were rated
+    """
+
+    # the history interleaves the two sides of a bout, fighter_a's comes first
+    first = history.iloc[::2]
+
+    return pd.DataFrame(
+        {
+            "event_date": first["event_date"].to_numpy(),
+            "event_id": first["event_id"].to_numpy(dtype=object),
+            "fight_id": first["fight_id"].to_numpy(dtype=object),
+            "fighter_a": first["ufcstats_id"].to_numpy(dtype=object),
+            "fighter_b": first["opp_ufcstats_id"].to_numpy(dtype=object),
+            "score_a": first["score"].to_numpy(dtype=float),
+        }
+    )
+
+
+def replay_start(stored, bouts):
+    """
+    This function returns how many bouts at the start of the stored history
+    can be kept: the ones before the event of the first bout that was added,
+    removed or changed
+    """
+
+    size = min(len(stored), len(bouts))
+    same = np.ones(size, dtype=bool)
+    for column in BOUT_COLUMNS:
+        same &= stored[column].to_numpy()[:size] == bouts[column].to_numpy()[:size]
+
+    changed = np.flatnonzero(~same)
+    first = changed[0] if len(changed) else size
+    if first == len(stored) == len(bouts):
+        return first
+
+    # every bout of an event is rated from the same ratings, so a changed
+    # event is rated again from its first bout
+    events = [
+        table["event_id"].iloc[first] for table in [stored, bouts] if first < len(table)
+    ]
+    untouched = np.flatnonzero(~bouts["event_id"].iloc[:first].isin(events))
+
+    return untouched[-1] + 1 if len(untouched) else 0
+
+
+def ratings_before(history):
+    """
+    This function returns the ratings a history leaves every fighter with
+    """
+
+    if not len(history):
+        return empty_ratings()
+
+    ratings = history.groupby("ufcstats_id", sort=False).agg(
+        rating=("rating_after", "last"),
+        fights=("fight_id", "size"),
+        last_event_date=("event_date", "max"),
+    )
+    ratings["fights"] = ratings["fights"].astype(np.int64)
+
+    return ratings
+
+
+def update_ratings(full=False, directory=None):
+    """
+    This function rates the bouts that are not in the stored history yet and
+    returns a summary. The stored history is kept up to the first bout that
+    was added before its end, removed or changed, and rated again from there
+    (from the start if full)
+    """
+
+    directory = directory or ratings_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    bouts = load_bouts()
+    stored = None if full else read_ratings(directory)
+
+    if stored is None:
+        ratings, history = rate_bouts(bouts)
+        new_bouts = bouts
+        replay = True
+    else:
+        ratings, history, _ = stored
+        kept = replay_start(rated_bouts(history), bouts)
+        new_bouts = bouts.iloc[kept:]
+
+        # a kept history leaves every fighter at their last rating_after
+        replay = kept < len(history) // 2
+        if replay:
+            history = history.iloc[: 2 * kept]
+            ratings = ratings_before(history)
+        if len(new_bouts):
+            ratings, new_history = rate_bouts(new_bouts, ratings)
+            history = pd.concat([history, new_history], ignore_index=True)
+
+    write_frame(history, os.path.join(directory, "history"))
+    write_frame(
+        ratings.reset_index(),
+        os.path.join(directory, "ratings"),
+        meta={
+            "params": RATING_PARAMS,
+            "history_rows": len(history),
+            "sources": {
+                name: file_fingerprint(table_path(name)) for name in SOURCE_TABLES
+            },
+        },
+    )
+
+    return {
+        "replayed": replay,
+        "rated_bouts": len(new_bouts),
+        "rated_events": int(new_bouts["event_id"].nunique()),
+        "bouts": int(len(history) // 2),
+        "fighters": len(ratings),
+    }
+
+
+def is_fresh(meta):
+    """
+    This function returns whether stored ratings still match their sources
+    """
+
+    if meta is None or meta.get("params") != RATING_PARAMS:
+        return False
+
+    return all(
+        fingerprint_matches(table_path(name), meta["sources"].get(name, {}))
+        if meta["sources"].get(name)
+        else False
+        for name in SOURCE_TABLES
+    )
+
+
+def load_ratings():
+    """
+    This function returns (ratings indexed by ufcstats_id, history sorted by
+    fighter and date and indexed by ufcstats_id), updating them first if the
+    sources changed
+    """
+
+    directory = ratings_dir()
+    key = (
+        file_key(os.path.join(directory, "ratings", META_FILE)),
+        tuple(file_key(table_path(name)) for name in SOURCE_TABLES),
+    )
+
+    def reader():
+        if not is_fresh(read_meta(os.path.join(directory, "ratings"))):
+            # another process may have updated them while this one waited
+            with build_lock():
+                if not is_fresh(read_meta(os.path.join(directory, "ratings"))):
+                    update_ratings(directory=directory)
+        ratings, history, _ = read_ratings(directory)
+
+        # sorted, so .loc[ufcstats_id:ufcstats_id] is a binary search
+        history = history.sort_values(
+            by=["ufcstats_id", "event_date", "fight_id"], kind="mergesort"
+        ).set_index("ufcstats_id")
+
+        return ratings, history
+
+    return cached_read("ratings", key, reader)
@@ -0,0 +1,546 @@
+"""
+One canonical fight table from every fight_data-shaped csv.
+
+fight_data.csv, "fight_data - 2019-2020 ACCURATE.csv" and new-fight-stats.csv
+all hold one row per (fight_id, ufcstats_id) and overlap, so reading more
+than one of them double-counts fights. Every row is hashed twice, once by its
+key and once by its content (the columns all sources have), which is enough
+to sort the rows of all sources into:
+
+- ``duplicate``: a key repeated inside one source, only the first row is kept
+- ``conflict``: a key another source has with different content, the source
+  earlier in ``SOURCE_PRIORITY`` wins, except for the columns
+  ``PREFERRED_COLUMNS`` takes from another source for fights in a date range.
+  Every discarded value is reported next to the one kept, with the reason
+- ``insert`` / ``update`` / ``delete``: how the canonical table changed since
+  the last build
+
+Keys found in only some sources are kept from whichever has them, with the
+columns their source lacks (``time_format``) filled from the other sources.
+The table and the report are written to ``build/reconciled_v<n>/``:
+
+    python -m ufc_data.reconcile
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.loader import (
+    BUILD_DIR,
+    build_lock,
+    cached_read,
+    file_fingerprint,
+    file_key,
+    fingerprint_matches,
+    load_table,
+    table_path,
+)
+from ufc_data.schema import CATEGORY, FIGHT_COLUMNS, SCHEMAS
+from ufc_data.snapshot import META_FILE, read_frame, read_meta, write_frame
+
+
+# bump this whenever the canonical table or the report change shape
+RECONCILE_VERSION = 3
+
+# highest priority first: the maintained fight_data.csv wins and the data
+# drops only add the fights it does not have yet
+SOURCE_PRIORITY = ["fight_data", "new_fight_stats", "fight_data_2019_2020"]
+
+# source -> the columns it outranks every other source for, in fights from
+# the first to the last date. Checked column by column against fight_data.csv,
+# the 2019-2020 file only improves the names: they are the ones the fighters
+# fought under then. Its DK scores are rounded to one decimal, its control
+# times disagree with fight_round_data, and its referees, methods and details
+# are blanker or older, so fight_data.csv keeps those
+PREFERRED_COLUMNS = {
+    "fight_data_2019_2020": {
+        "dates": ["2019-01-01", "2020-12-31"],
+        "columns": ["fighter_name", "opp_name"],
+    },
+}
+
+KEY_COLUMNS = ["fight_id", "ufcstats_id"]
+
+REPORT_COLUMNS = [
+    "change",
+    "fight_id",
+    "ufcstats_id",
+    "source",
+    "kept",
+    "columns",
+    "values",
+    "reason",
+]
+
+
+def reconcile_dir():
+    """
+    This function returns the directory the canonical fight table lives in
+    """
+
+    return os.path.join(BUILD_DIR, f"reconciled_v{RECONCILE_VERSION}")
+
+
+def compared_columns(tables):
+    """
+    This function returns the non-key columns every source has
+    """
+
+    return [
+        column
+        for column in FIGHT_COLUMNS
+        if column not in KEY_COLUMNS
+        and all(column in df.columns for df in tables.values())
+    ]
+
+
+def row_hashes(df, columns):
+    """
+    This function returns a uint64 hash of each row's values in columns
+    """
+
+    # categoricals hash their values, so tables with different categories agree
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def differing(left, right, columns):
+    """
+    This function returns a bool array of, for each pair of aligned rows,
+    which of the columns differ
+    """
+
+    return np.column_stack(
+        [
+            ~(
+                (
+                    left[column].to_numpy(dtype=object)
+                    == right[column].to_numpy(dtype=object)
+                )
+                | (left[column].isna().to_numpy() & right[column].isna().to_numpy())
+            )
+            for column in columns
+        ]
+    ).reshape(len(left), len(columns))
+
+
+def differing_columns(differs, columns):
+    """
+    This function returns, for each row of a differing() array, the
+    comma-separated columns whose values differ
+    """
+
+    return [",".join(np.asarray(columns)[row]) for row in differs]
+
+
+def differing_values(differs, columns, left, right):
+    """
+    This function returns, for each row of a differing() array, the left
+    row's values that differ from the right row's, as "column=left (kept right)"
+    """
+
+    values = [
+        (
+            column,
+            left[column].astype(str).to_numpy(),
+            right[column].astype(str).to_numpy(),
+        )
+        for column in columns
+    ]
+
+    return [
+        "; ".join(
+            f"{column}={lost[i]} (kept {kept[i]})"
+            for (column, lost, kept), differs_i in zip(values, row)
+            if differs_i
+        )
+        for i, row in enumerate(differs)
+    ]
+
+
+def preferred_rows(df, source, preferred):
+    """
+    This function returns a bool array of the rows of a source that fall in
+    the date range it is preferred for, if it has one
+    """
+
+    if source not in preferred:
+        return np.zeros(len(df), dtype=bool)
+
+    first, last = (pd.Timestamp(date) for date in preferred[source]["dates"])
+    dates = df["event_date"]
+
+    return ((dates >= first) & (dates <= last)).to_numpy()
+
+
+def report_rows(change, differs, columns, left, right, source, kept, reason):
+    """
+    This function returns the report rows of the left rows that have a
+    differing column, with their values against the right rows'
+    """
+
+    has = differs.any(axis=1) if change == "conflict" else np.ones(len(left), bool)
+    differs, left, right = differs[has], left.iloc[has], right.iloc[has]
+
+    return pd.DataFrame(
+        {
+            "change": change,
+            "fight_id": left["fight_id"].to_numpy(dtype=object),
+            "ufcstats_id": left["ufcstats_id"].to_numpy(dtype=object),
+            "source": source,
+            "kept": kept,
+            "columns": differing_columns(differs, columns),
+            "values": differing_values(differs, columns, left, right),
+            "reason": reason,
+        }
+    )
+
+
+def reconcile(tables, preferred=None):
+    """
+    This function returns (the canonical fight table, a report of duplicate
+    and conflicting rows) from {source: fight table}, highest priority first,
+    and {source: {"dates": [first, last], "columns": [...]}} it is preferred for
+    """
+
+    preferred = PREFERRED_COLUMNS if preferred is None else preferred
+    compared = compared_columns(tables)
+
+    rows = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "rank": rank,
+                    "position": np.arange(len(df)),
+                    "key": row_hashes(df, KEY_COLUMNS),
+                    "content": row_hashes(df, compared),
+                }
+            )
+            for rank, df in enumerate(tables.values())
+        ],
+        ignore_index=True,
+    )
+
+    # the first row of each key, by priority and then file order, is the one kept
+    rows = rows.sort_values(by=["key", "rank", "position"], kind="mergesort")
+    first = rows.groupby("key", sort=False).transform("first")
+    rows["kept_rank"] = first["rank"].to_numpy()
+    rows["kept_position"] = first["position"].to_numpy()
+
+    # a key seen before in the same source is a duplicate whoever wins it,
+    # identical copies in another source are expected overlap, not news
+    duplicate = rows.groupby(["key", "rank"], sort=False).cumcount() > 0
+    conflict = (rows["rank"] != rows["kept_rank"]) & (
+        rows["content"] != first["content"]
+    )
+    losers = rows.loc[duplicate | conflict].copy()
+    losers["change"] = np.where(duplicate[losers.index], "duplicate", "conflict")
+
+    names = list(tables)
+    report = [empty_report()]
+    taken = []
+    for (rank, kept_rank, change), group in losers.groupby(
+        ["rank", "kept_rank", "change"]
+    ):
+        source, kept = names[rank], names[kept_rank]
+        loser_rows = tables[source].iloc[group["position"]]
+        kept_rows = tables[kept].iloc[group["kept_position"]]
+        differs = differing(loser_rows, kept_rows, compared)
+
+        if change == "duplicate":
+            reason = f"{source} has the key more than once"
+            report.append(
+                report_rows(
+                    change,
+                    differs,
+                    compared,
+                    loser_rows,
+                    kept_rows,
+                    source,
+                    kept,
+                    reason,
+                )
+            )
+            continue
+
+        # the preferred columns of the rows in range are taken from the loser,
+        # so it is the kept source's values there that are discarded
+        is_taken = np.zeros_like(differs)
+        if source in preferred:
+            is_taken[:, np.isin(compared, preferred[source]["columns"])] = True
+            is_taken &= preferred_rows(loser_rows, source, preferred)[:, None]
+            taken.append(loser_rows.loc[is_taken.any(axis=1)])
+
+            first_date, last_date = preferred[source]["dates"]
+            reason = (
+                f"{source} is preferred for "
+                f"{', '.join(preferred[source]['columns'])} "
+                f"in fights from {first_date} to {last_date}"
+            )
+            report.append(
+                report_rows(
+                    change,
+                    differs & is_taken,
+                    compared,
+                    kept_rows,
+                    loser_rows,
+                    kept,
+                    source,
+                    reason,
+                )
+            )
+
+        reason = f"{kept} ranks before {source} in SOURCE_PRIORITY"
+        report.append(
+            report_rows(
+                change,
+                differs & ~is_taken,
+                compared,
+                loser_rows,
+                kept_rows,
+                source,
+                kept,
+                reason,
+            )
+        )
+
+    canonical = take_preferred(canonical_table(tables, rows), taken, preferred)
+
+    return canonical, pd.concat(report, ignore_index=True)
+
+
+def take_preferred(canonical, taken, preferred):
+    """
+    This function returns the canonical table with the preferred columns of
+    the taken rows written over the kept ones
+    """
+
+    columns = sorted(
+        {column for source in preferred.values() for column in source["columns"]}
+    )
+    taken = [rows for rows in taken if len(rows)]
+    if not taken:
+        return canonical
+
+    taken = pd.concat([rows[KEY_COLUMNS + columns] for rows in taken])
+    taken = taken.astype({column: object for column in KEY_COLUMNS + columns})
+    keys = pd.MultiIndex.from_frame(
+        canonical[KEY_COLUMNS].astype({column: object for column in KEY_COLUMNS})
+    )
+    positions = keys.get_indexer(pd.MultiIndex.from_frame(taken[KEY_COLUMNS]))
+
+    canonical = canonical.copy()
+    for column in columns:
+        values = canonical[column].to_numpy(dtype=object).copy()
+        values[positions] = taken[column].to_numpy()
+        canonical[column] = values
+        if FIGHT_COLUMNS[column] == CATEGORY:
+            canonical[column] = canonical[column].astype(CATEGORY)
+
+    return canonical
+
+
+def canonical_table(tables, rows):
+    """
+    This function returns the kept row of every key in priority and file
+    order, with the columns its source lacks filled from the other sources
+    """
+
+    kept = rows.loc[
+        (rows["rank"] == rows["kept_rank"])
+        & (rows["position"] == rows["kept_position"])
+    ].sort_values(by=["rank", "position"])
+
+    parts = []
+    for rank, df in enumerate(tables.values()):
+        part = df.iloc[kept.loc[kept["rank"] == rank, "position"]]
+        for column in FIGHT_COLUMNS:
+            if column in part.columns:
+                continue
+
+            # getting the column from the highest priority source that has the key
+            values = pd.Series(np.nan, index=part.index, dtype=object)
+            for other in tables.values():
+                if column not in other.columns:
+                    continue
+                lookup = other.drop_duplicates(subset=KEY_COLUMNS).set_index(
+                    KEY_COLUMNS
+                )[column]
+                found = lookup.reindex(pd.MultiIndex.from_frame(part[KEY_COLUMNS]))
+                values = values.fillna(pd.Series(found.to_numpy(), index=part.index))
+            part = part.assign(**{column: values})
+        parts.append(part[list(FIGHT_COLUMNS)])
+
+    canonical = pd.concat(parts, ignore_index=True)
+
+    # categories differ between sources, so concat left those columns as objects
+    for column, kind in FIGHT_COLUMNS.items():
+        if kind == CATEGORY and canonical[column].dtype != CATEGORY:
+            canonical[column] = canonical[column].astype(object).astype(CATEGORY)
+
+    return canonical
+
+
+def empty_report():
+    """
+    This function returns a report without any rows
+    """
+
+    return pd.DataFrame({column: pd.Series(dtype=object) for column in REPORT_COLUMNS})
+
+
+def changes(previous, canonical):
+    """
+    This function returns the insert, update and delete rows between the
+    previous canonical table and the new one
+    """
+
+    if previous is None:
+        previous = canonical.iloc[:0]
+
+    def keyed(df):
+        return pd.DataFrame(
+            {
+                "key": row_hashes(df, KEY_COLUMNS),
+                "content": row_hashes(df, list(FIGHT_COLUMNS)),
+                "fight_id": df["fight_id"].to_numpy(dtype=object),
+                "ufcstats_id": df["ufcstats_id"].to_numpy(dtype=object),
+            }
+        )
+
+    merged = keyed(previous).merge(
+        keyed(canonical), on="key", how="outer", suffixes=("_old", ""), indicator=True
+    )
+    merged["change"] = np.select(
+        [
+            merged["_merge"] == "right_only",
+            merged["_merge"] == "left_only",
+            merged["content_old"] != merged["content"],
+        ],
+        ["insert", "delete", "update"],
+        default="",
+    )
+    merged = merged.loc[merged["change"] != ""]
+
+    return pd.DataFrame(
+        {
+            "change": merged["change"].to_numpy(),
+            "fight_id": merged["fight_id"].fillna(merged["fight_id_old"]).to_numpy(),
+            "ufcstats_id": merged["ufcstats_id"]
+            .fillna(merged["ufcstats_id_old"])
+            .to_numpy(),
+            "source": "",
+            "kept": "",
+            "columns": "",
+            "values": "",
+            "reason": "",
+        }
+    )
+
+
+def reconcile_fights(directory=None):
+    """
+    This function writes the canonical fight table and its report and returns
+    the number of rows per change
+    """
+
+    directory = directory or reconcile_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    tables = {name: load_table(name) for name in SOURCE_PRIORITY}
+    canonical, report = reconcile(tables)
+
+    previous = None
+    if read_meta(os.path.join(directory, "fights")) is not None:
+        previous = read_frame(os.path.join(directory, "fights"), mmap=False)
+    report = pd.concat([changes(previous, canonical), report], ignore_index=True)
+
+    counts = {
+        "rows": len(canonical),
+        **{name: len(tables[name]) for name in SOURCE_PRIORITY},
+        **{
+            change: int((report["change"] == change).sum())
+            for change in ["insert", "update", "delete", "duplicate", "conflict"]
+        },
+    }
+
+    report.to_csv(os.path.join(directory, "report.csv"), index=False)
+    # the table goes last, its metadata is what marks the build as complete
+    write_frame(
+        canonical,
+        os.path.join(directory, "fights"),
+        schema=FIGHT_COLUMNS,
+        meta={
+            "priority": SOURCE_PRIORITY,
+            "preferred": PREFERRED_COLUMNS,
+            "sources": {
+                name: file_fingerprint(table_path(name)) for name in SOURCE_PRIORITY
+            },
+            "counts": counts,
+        },
+    )
+
+    return counts
+
+
+def is_fresh(meta):
+    """
+    This function returns whether a canonical table still matches its sources
+    """
+
+    if (
+        meta is None
+        or meta.get("priority") != SOURCE_PRIORITY
+        or meta.get("preferred") != PREFERRED_COLUMNS
+    ):
+        return False
+
+    return all(
+        fingerprint_matches(table_path(name), meta["sources"].get(name, {}))
+        if meta["sources"].get(name)
+        else False
+        for name in SOURCE_PRIORITY
+    )
+
+
+def load_fights():
+    """
+    This function returns the canonical fight table, reconciling the sources
+    first if they changed since the last build
+    """
+
+    directory = os.path.join(reconcile_dir(), "fights")
+    key = (
+        file_key(os.path.join(directory, META_FILE)),
+        tuple(file_key(table_path(name)) for name in SOURCE_PRIORITY),
+    )
+
+    def reader():
+        if not is_fresh(read_meta(directory)):
+            # another process may have reconciled them while this one waited
+            with build_lock():
+                if not is_fresh(read_meta(directory)):
+                    reconcile_fights()
+        return read_frame(directory)
+
+    return cached_read("fights", key, reader)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.reconcile",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.parse_args(argv)
+
+    counts = reconcile_fights()
+    print(
+        ", ".join(f"{name} {count}" for name, count in counts.items())
+        + f" -> {reconcile_dir()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
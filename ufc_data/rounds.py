@@ -0,0 +1,161 @@
+"""
+Per-fighter, per-round stats built from fight_round_data.csv.
+
+Rounds are grouped into round 1, round 2, round 3 and the championship rounds
+(4 and 5). Every number is a sum over one groupby of the whole round table,
+so the build computes all fighters at once.
+
+fight_round_data.csv has no clock, so round lengths come from fight_data.csv:
+every round before the last one went the full five minutes and the last one
+lasted whatever is left of ``fight_time_seconds``. Rounds of a fight the fight
+table does not have are left out (the build reports how many).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+ROUND_SECONDS = 300
+
+# round number -> round group, in the order the dashboard shows them
+ROUND_GROUPS = {
+    1: "Round 1",
+    2: "Round 2",
+    3: "Round 3",
+    4: "Rounds 4-5",
+    5: "Rounds 4-5",
+}
+
+# round stat -> the name of its per-group total
+ROUND_TOTALS = {
+    "fighter_round_knockdowns": "knockdowns",
+    "fighter_round_sig_strikes_landed": "sig_strikes_landed",
+    "fighter_round_sig_strikes_attempted": "sig_strikes_attempted",
+    "fighter_round_strikes_landed": "strikes_landed",
+    "fighter_round_takedowns": "takedowns",
+    "fighter_round_control": "control",
+    "opp_sig_strikes_landed": "sig_strikes_absorbed",
+    "opp_control": "control_against",
+    "round_seconds": "seconds",
+}
+
+
+def matched_rounds(fight_round_data, fight_data):
+    """
+    This function returns a bool array of the round rows whose fight and
+    fighter are in the fight table
+    """
+
+    def keys(df):
+        return pd.MultiIndex.from_frame(df[["fight_id", "ufcstats_id"]].astype(object))
+
+    return keys(fight_round_data).isin(keys(fight_data))
+
+
+def round_seconds(fight_round_data, fight_data):
+    """
+    This function returns how long each row's round lasted, in seconds, for
+    round rows that all have a fight, see matched_rounds
+    """
+
+    fights = fight_data[["fight_id", "ufcstats_id", "round", "fight_time_seconds"]]
+    fights = fights.rename(columns={"round": "final_round"})
+    merged = fight_round_data[["fight_id", "ufcstats_id", "round"]].merge(
+        fights, on=["fight_id", "ufcstats_id"], how="inner"
+    )
+
+    final_round = merged["final_round"].to_numpy(dtype=np.int64)
+    last_round_seconds = merged["fight_time_seconds"].to_numpy(
+        dtype=np.int64
+    ) - ROUND_SECONDS * (final_round - 1)
+    seconds = np.where(
+        merged["round"].to_numpy() < final_round, ROUND_SECONDS, last_round_seconds
+    )
+
+    return pd.Series(seconds, index=fight_round_data.index, name="round_seconds")
+
+
+def round_stats(fight_round_data, fight_data):
+    """
+    This function returns one row per fighter and round group with their
+    per-minute output, control share and pace against round 1
+    """
+
+    # a round without its fight has no length to divide by
+    fight_round_data = fight_round_data.loc[
+        matched_rounds(fight_round_data, fight_data)
+    ]
+
+    rounds = fight_round_data[["fight_id", "ufcstats_id", "round"]].copy()
+    for column in [
+        "fighter_round_knockdowns",
+        "fighter_round_sig_strikes_landed",
+        "fighter_round_sig_strikes_attempted",
+        "fighter_round_strikes_landed",
+        "fighter_round_takedowns",
+        "fighter_round_control",
+    ]:
+        rounds[column] = fight_round_data[column].astype(np.int64)
+
+    # getting what the opponent did in the same round, both fighters of a
+    # round share its (fight_id, round) group
+    round_totals = rounds.groupby(["fight_id", "round"], observed=True)[
+        ["fighter_round_sig_strikes_landed", "fighter_round_control"]
+    ].transform("sum")
+    rounds["opp_sig_strikes_landed"] = (
+        round_totals["fighter_round_sig_strikes_landed"]
+        - rounds["fighter_round_sig_strikes_landed"]
+    )
+    rounds["opp_control"] = (
+        round_totals["fighter_round_control"] - rounds["fighter_round_control"]
+    )
+
+    rounds["round_seconds"] = round_seconds(fight_round_data, fight_data)
+    rounds["round_group"] = pd.Categorical(
+        rounds["round"].map(ROUND_GROUPS),
+        categories=list(dict.fromkeys(ROUND_GROUPS.values())),
+    )
+
+    grouped = rounds.groupby(["ufcstats_id", "round_group"], observed=True)
+    totals = grouped[list(ROUND_TOTALS)].sum().rename(columns=ROUND_TOTALS)
+    totals["rounds"] = grouped.size()
+
+    stats = pd.DataFrame(index=totals.index)
+    stats["rounds"] = totals["rounds"]
+    minutes = totals["seconds"] / 60
+    stats["sig_strikes_landed_per_minute"] = round(
+        totals["sig_strikes_landed"] / minutes, 2
+    )
+    stats["sig_strikes_absorbed_per_minute"] = round(
+        totals["sig_strikes_absorbed"] / minutes, 2
+    )
+    stats["sig_strike_accuracy"] = round(
+        totals["sig_strikes_landed"] / totals["sig_strikes_attempted"] * 100, 2
+    )
+    stats["strikes_landed_per_minute"] = round(totals["strikes_landed"] / minutes, 2)
+    stats["takedowns_per_15"] = round(totals["takedowns"] / minutes * 15, 2)
+    stats["knockdowns_per_15"] = round(totals["knockdowns"] / minutes * 15, 2)
+    stats["control_share"] = round(totals["control"] / totals["seconds"] * 100, 2)
+    stats["control_against_share"] = round(
+        totals["control_against"] / totals["seconds"] * 100, 2
+    )
+
+    # getting the fade ratio, sig strike pace in the round group over round 1
+    first_round_pace = (
+        stats["sig_strikes_landed_per_minute"]
+        .xs(ROUND_GROUPS[1], level="round_group")
+        .reindex(stats.index.get_level_values("ufcstats_id"))
+        .set_axis(stats.index)
+    )
+    stats["fade_ratio"] = round(
+        stats["sig_strikes_landed_per_minute"] / first_round_pace, 2
+    )
+
+    # fighters who landed nothing in round 1 have no fade ratio
+    stats = stats.replace([np.inf, -np.inf], np.nan)
+
+    stats = stats.reset_index()
+    stats["ufcstats_id"] = stats["ufcstats_id"].astype(object)
+    stats["round_group"] = stats["round_group"].astype(object)
+
+    return stats.sort_values(by="ufcstats_id", kind="mergesort", ignore_index=True)
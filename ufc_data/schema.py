@@ -0,0 +1,308 @@
+"""
+Explicit, compact column types for every csv in the repo.
+
+A kind is ``"str"``, ``"category"`` or a numpy dtype name. Both the csv
+reader and the snapshot builder go through ``apply_schema`` so a table has
+the same dtypes whichever way it was loaded.
+
+Strings that repeat (ids in the fight tables, names, events, referees,
+methods) are categoricals, counts and seconds are int16, percentages and
+rounds are int8 and 0/1 flags are bools. Dates are parsed with the formats
+each csv actually writes them in (``DATE_FORMATS``), never inferred. ``python -m ufc_data.memory`` reports
+what this saves per table. Sums and means of the small ints are computed in
+int64/float64 by pandas, but anything doing elementwise integer arithmetic
+on them should cast first.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+STR = "str"
+CATEGORY = "category"
+BOOL = "bool"
+INT8 = "int8"
+INT16 = "int16"
+INT = "int64"
+FLOAT = "float64"
+DATE = "datetime64[ns]"
+
+# the per-fight (fighter_total_*) and per-round (fighter_round_*) stat columns,
+# the *_percentage ones are INT8 and the rest INT16
+COUNT_STATS = [
+    "knockdowns",
+    "sig_strikes_landed",
+    "sig_strikes_attempted",
+    "sig_strike_percentage",
+    "strikes_landed",
+    "strikes_attempted",
+    "strike_percentage",
+    "takedowns",
+    "takedowns_attempted",
+    "takedowns_percentage",
+    "submission_attempts",
+    "reversals",
+    "control",
+] + [
+    f"sig_strikes_{target}_{stat}"
+    for target in ["head", "body", "leg", "distance", "clinch", "ground"]
+    for stat in ["landed", "attempts", "percentage"]
+]
+
+FIGHTER_COLUMNS = {
+    "ufcstats_id": STR,
+    "first_name": STR,
+    "last_name": STR,
+    "full_name": STR,
+    "nickname": STR,
+    "height": STR,
+    "weight": STR,
+    "reach": STR,
+    "stance": STR,
+    "wins": INT16,
+    "losses": INT16,
+    "draws": STR,
+}
+
+
+def count_kind(stat):
+    """
+    This function returns the kind of a fighter_total_* / fighter_round_* column
+    """
+
+    return INT8 if stat.endswith("percentage") else INT16
+
+
+FIGHT_COLUMNS = {
+    "fight_id": CATEGORY,
+    "event_id": CATEGORY,
+    "event_name": CATEGORY,
+    "event_date": DATE,
+    "weight_class": CATEGORY,
+    "referee": CATEGORY,
+    "details": CATEGORY,
+    "ufcstats_id": CATEGORY,
+    "fighter_name": CATEGORY,
+    "opp_ufcstats_id": CATEGORY,
+    "opp_name": CATEGORY,
+    "method": CATEGORY,
+    "is_decision": BOOL,
+    "round": INT8,
+    "time": CATEGORY,
+    "time_format": CATEGORY,
+    "fight_time_seconds": INT16,
+    "fighter_odds": FLOAT,
+    "fighter_winner": BOOL,
+    "fighter_new_dk_score": FLOAT,
+    "fighter_old_dk_score": FLOAT,
+    **{f"fighter_total_{stat}": count_kind(stat) for stat in COUNT_STATS},
+}
+
+SCHEMAS = {
+    "fighters": {
+        **FIGHTER_COLUMNS,
+        "weight": FLOAT,
+        "reach": FLOAT,
+        "draws": INT16,
+        "belt": BOOL,
+    },
+    "career_stats": {
+        **FIGHTER_COLUMNS,
+        "date_of_birth": DATE,
+        "sig_strikes_landed_per_minute": FLOAT,
+        "sig_strike_accuracy": INT8,
+        "sig_strikes_absorbed_per_minute": FLOAT,
+        "sig_strike_defence": INT8,
+        "avg_takedowns_per_15_minutes": FLOAT,
+        "takedown_accuracy": INT8,
+        "takedown_defence": INT8,
+        "avg_submission_attempts_per_15_minutes": FLOAT,
+    },
+    "fight_data": FIGHT_COLUMNS,
+    "new_fight_stats": FIGHT_COLUMNS,
+    "fight_data_2019_2020": {
+        column: kind
+        for column, kind in FIGHT_COLUMNS.items()
+        if column != "time_format"
+    },
+    "fight_round_data": {
+        "fight_id": CATEGORY,
+        "ufcstats_id": CATEGORY,
+        "round": INT8,
+        **{f"fighter_round_{stat}": count_kind(stat) for stat in COUNT_STATS},
+    },
+    "external_ids": {
+        "ufcstats_id": STR,
+        "fighter_name": STR,
+        "date_of_birth": DATE,
+        "espn_id": STR,
+        "sherdog_id": STR,
+    },
+    "events": {
+        "event_id": STR,
+        "name": STR,
+        "event_date": DATE,
+        "location": CATEGORY,
+    },
+    "events_fights": {
+        "event_id": CATEGORY,
+        "fight_id": CATEGORY,
+        "fighter_id": CATEGORY,
+        "fighter_name": CATEGORY,
+        "winning_fighter": CATEGORY,
+        "weight_class": CATEGORY,
+    },
+    "betting_odds": {
+        "fight_id": CATEGORY,
+        "event_id": CATEGORY,
+        "event_name": CATEGORY,
+        "event_date": DATE,
+        "ufcstats_id": CATEGORY,
+        "fighter_name": CATEGORY,
+        "fighter_odds": FLOAT,
+    },
+    "fighter_export_model": {
+        "ufcstats_id": STR,
+        "fighter_name": STR,
+        "weight_class": STR,
+        **{
+            column: FLOAT
+            for column in [
+                "strikes_att_per_min",
+                "strikes_landed_per_min",
+                "strike_pct",
+                "strikes_absorbed_per_min",
+                "strikes_att_against_per_min",
+                "strike_def_pct",
+                "sig_strikes_att_per_minute",
+                "sig_strikes_landed_per_min",
+                "sig_strike_pct",
+                "sig_strikes_absorbed_per_min",
+                "sig_strikes_att_against_per_min",
+                "sig_strike_def_pct",
+                "td_att_per_15_min",
+                "td_landed_per_15_min",
+                "td_pct",
+                "td_def_pct",
+                "sub_att_per_15_min",
+                "control_pct",
+                "control_against_pct",
+            ]
+        },
+    },
+}
+
+# table -> date column -> the formats it is written in, tried in order on
+# whatever the previous ones could not read
+DATE_FORMATS = {
+    "fight_data": {"event_date": ["%Y-%m-%d"]},
+    "new_fight_stats": {"event_date": ["%Y-%m-%d"]},
+    "fight_data_2019_2020": {"event_date": ["%m/%d/%Y"]},
+    # 2021 rows were appended as "1-May-21"
+    "betting_odds": {"event_date": ["%m/%d/%Y", "%d-%b-%y"]},
+    "events": {"event_date": ["%B %d, %Y"]},
+    "external_ids": {"date_of_birth": ["%m/%d/%Y"]},
+    "career_stats": {"date_of_birth": ["%b %d, %Y"]},
+}
+
+# placeholders for an unknown date, which become NaT without being reported
+MISSING_DATES = ["--"]
+
+
+def kind_of(series):
+    """
+    This function returns the schema kind of an already-typed column
+    """
+
+    if series.dtype == object:
+        return STR
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return CATEGORY
+
+    return str(series.dtype)
+
+
+def infer_schema(df):
+    """
+    This function returns a schema for a DataFrame built from typed tables
+    """
+
+    return {column: kind_of(df[column]) for column in df.columns}
+
+
+def apply_schema(df, schema, table="table"):
+    """
+    This function returns df with its columns cast to the schema's kinds,
+    raising if the csv and the schema disagree on the columns
+    """
+
+    missing = [column for column in schema if column not in df.columns]
+    extra = [column for column in df.columns if column not in schema]
+    if missing or extra:
+        raise ValueError(
+            f"{table} does not match its schema: missing {missing}, unexpected {extra}"
+        )
+
+    columns = {}
+    for column, kind in schema.items():
+        values = df[column]
+        if kind in (STR, CATEGORY):
+            values = values.astype(object)
+            values = values.where(values.isna(), values.astype(str))
+            if kind == CATEGORY:
+                values = values.astype(CATEGORY)
+        elif kind == DATE:
+            values, _ = parse_dates(values, date_formats(table, column))
+        elif str(values.dtype) != kind:
+            if np.issubdtype(np.dtype(kind), np.integer):
+                check_int_range(values, kind, f"{table}.{column}")
+            values = values.astype(kind)
+        columns[column] = values
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+def date_formats(table, column):
+    """
+    This function returns the declared formats of a date column
+    """
+
+    formats = DATE_FORMATS.get(table, {}).get(column)
+    if not formats:
+        raise ValueError(f"{table}.{column} is a date without a declared format")
+
+    return formats
+
+
+def parse_dates(values, formats):
+    """
+    This function returns (dates, unparsed), where unparsed marks the rows
+    that hold a value none of the formats could read
+    """
+
+    strings = values.astype(object)
+    dates = pd.Series(pd.NaT, index=values.index, dtype=DATE)
+    unparsed = (strings.notna() & ~strings.isin(MISSING_DATES)).to_numpy()
+
+    for date_format in formats:
+        if not unparsed.any():
+            break
+        parsed = pd.to_datetime(
+            strings[unparsed], format=date_format, errors="coerce"
+        ).to_numpy()
+        dates.iloc[np.flatnonzero(unparsed)] = parsed
+        unparsed[unparsed] = np.isnat(parsed)
+
+    return dates, pd.Series(unparsed, index=values.index, name=values.name)
+
+
+def check_int_range(values, kind, name):
+    """
+    This function raises if a column would wrap around when cast to a small int
+    """
+
+    info = np.iinfo(kind)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(
+            f"{name} has values in [{values.min()}, {values.max()}], which do not fit {kind}"
+        )
@@ -0,0 +1,274 @@
+"""
+DraftKings-style fantasy points for every fight and every round.
+
+A rule set gives points per stat (any ``fighter_total_<stat>`` /
+``fighter_round_<stat>`` column, e.g. ``sig_strikes_landed`` or ``control``
+in seconds), a bonus for winning by finishing in each round, a decision
+bonus and a quick-win bonus. Scoring is one matrix product of the stat
+columns with the points of every rule set, plus the bonuses, so several rule
+sets cost about the same as one.
+
+``NEW_DK_RULES`` and ``OLD_DK_RULES`` reproduce the ``fighter_new_dk_score``
+and ``fighter_old_dk_score`` columns of fight_data.csv, which
+``python -m ufc_data.scoring`` checks:
+
+    python -m ufc_data.scoring
+    python -m ufc_data.scoring --rules rules.json --output scores.csv
+    python -m ufc_data.scoring --rules rules.json --rounds --output rounds.csv
+
+A rules file is a json object of rule set name -> rule set, shaped like
+``NEW_DK_RULES``.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# 0.2 for every strike and another 0.2 if it was significant
+NEW_DK_RULES = {
+    "points": {
+        "strikes_landed": 0.2,
+        "sig_strikes_landed": 0.2,
+        "takedowns": 5,
+        "knockdowns": 10,
+        "control": 0.03,
+    },
+    # finishing round -> points for winning inside it
+    "finish_bonus": {1: 90, 2: 70, 3: 45, 4: 40, 5: 40},
+    "decision_bonus": 30,
+    "quick_win_seconds": 60,
+    "quick_win_bonus": 25,
+}
+
+OLD_DK_RULES = {
+    "points": {
+        "sig_strikes_landed": 0.5,
+        "takedowns": 8,
+        "knockdowns": 10,
+    },
+    "finish_bonus": {1: 90, 2: 70, 3: 45, 4: 40, 5: 40},
+    "decision_bonus": 30,
+    "quick_win_seconds": 0,
+    "quick_win_bonus": 0,
+}
+
+RULE_SETS = {"new_dk": NEW_DK_RULES, "old_dk": OLD_DK_RULES}
+
+# rule set -> the fight_data column it reproduces
+STORED_SCORES = {
+    "new_dk": "fighter_new_dk_score",
+    "old_dk": "fighter_old_dk_score",
+}
+
+# the fight_data columns the bonuses depend on
+OUTCOME_COLUMNS = [
+    "fight_id",
+    "ufcstats_id",
+    "fighter_winner",
+    "is_decision",
+    "round",
+    "fight_time_seconds",
+]
+
+
+def points_matrix(rule_sets):
+    """
+    This function returns (stats, a stats x rule sets array of points)
+    """
+
+    stats = list(
+        dict.fromkeys(stat for rules in rule_sets.values() for stat in rules["points"])
+    )
+    points = np.array(
+        [
+            [rules["points"].get(stat, 0) for rules in rule_sets.values()]
+            for stat in stats
+        ],
+        dtype=float,
+    ).reshape(len(stats), len(rule_sets))
+
+    return stats, points
+
+
+def bonus_points(outcome, rule_sets):
+    """
+    This function returns a rows x rule sets array of win bonuses, given each
+    row's fighter_winner, is_decision, round (the one the fight ended in) and
+    fight_time_seconds
+    """
+
+    won = outcome["fighter_winner"].to_numpy(dtype=bool)
+    decision = outcome["is_decision"].to_numpy(dtype=bool)
+    final_round = outcome["round"].to_numpy(dtype=np.int64)
+    seconds = outcome["fight_time_seconds"].to_numpy(dtype=np.int64)
+
+    bonus = np.zeros((len(outcome), len(rule_sets)))
+    for position, rules in enumerate(rule_sets.values()):
+        # json keys are strings, so the finishing rounds are normalised to ints
+        finish_bonus = pd.Series(
+            {int(r): points for r, points in rules["finish_bonus"].items()},
+            dtype=float,
+        )
+        finish = finish_bonus.reindex(final_round, fill_value=0).to_numpy()
+        quick = (seconds < rules["quick_win_seconds"]) * rules["quick_win_bonus"]
+
+        bonus[:, position] = np.where(
+            won,
+            np.where(decision, rules["decision_bonus"], finish + quick),
+            0,
+        )
+
+    return bonus
+
+
+def score_frame(stat_values, outcome, rule_sets):
+    """
+    This function returns the points of every row under every rule set
+    """
+
+    stats, points = points_matrix(rule_sets)
+    values = np.empty((len(outcome), len(stats)))
+    for position, stat in enumerate(stats):
+        values[:, position] = stat_values(stat)
+
+    scores = values @ points + bonus_points(outcome, rule_sets)
+
+    return pd.DataFrame(np.round(scores, 2), columns=list(rule_sets))
+
+
+def score_fights(fight_data, rule_sets=RULE_SETS):
+    """
+    This function returns one column of points per rule set for every
+    fight_data row, aligned with fight_data
+    """
+
+    scores = score_frame(
+        lambda stat: fight_data[f"fighter_total_{stat}"].to_numpy(dtype=float),
+        fight_data,
+        rule_sets,
+    )
+
+    return scores.set_axis(fight_data.index)
+
+
+def score_rounds(fight_round_data, fight_data, rule_sets=RULE_SETS):
+    """
+    This function returns fight_id, ufcstats_id, round and one column of
+    points per rule set for every fight_round_data row, with the win bonus
+    counted in the round the fight ended in
+    """
+
+    rounds = fight_round_data[["fight_id", "ufcstats_id", "round"]]
+    outcome = rounds.merge(
+        fight_data[OUTCOME_COLUMNS].rename(columns={"round": "final_round"}),
+        on=["fight_id", "ufcstats_id"],
+        how="left",
+    )
+
+    # only the last round carries the result, earlier rounds just their stats
+    last_round = (outcome["round"] == outcome["final_round"]).to_numpy()
+    outcome["fighter_winner"] = outcome["fighter_winner"].eq(True) & last_round
+    outcome["is_decision"] = outcome["is_decision"].eq(True)
+    outcome["round"] = outcome["final_round"].fillna(0)
+    outcome["fight_time_seconds"] = outcome["fight_time_seconds"].fillna(0)
+
+    scores = score_frame(
+        lambda stat: fight_round_data[f"fighter_round_{stat}"].to_numpy(dtype=float),
+        outcome,
+        rule_sets,
+    )
+
+    return pd.concat([rounds.reset_index(drop=True), scores], axis=1).set_axis(
+        fight_round_data.index
+    )
+
+
+def check_scores(fight_data):
+    """
+    This function returns how many fight_data rows each built-in rule set
+    scores differently from the stored column it reproduces
+    """
+
+    scores = score_fights(fight_data, {name: RULE_SETS[name] for name in STORED_SCORES})
+
+    return {
+        name: int(
+            (~np.isclose(scores[name], fight_data[column].to_numpy(dtype=float))).sum()
+        )
+        for name, column in STORED_SCORES.items()
+    }
+
+
+def read_rule_sets(path):
+    """
+    This function returns the rule sets in a json file, with missing bonuses
+    defaulting to none
+    """
+
+    with open(path) as f:
+        rule_sets = json.load(f)
+
+    defaults = {
+        "points": {},
+        "finish_bonus": {},
+        "decision_bonus": 0,
+        "quick_win_seconds": 0,
+        "quick_win_bonus": 0,
+    }
+
+    return {name: {**defaults, **rules} for name, rules in rule_sets.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.scoring",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.add_argument("--rules", help="json file of rule sets, default the DK ones")
+    parser.add_argument(
+        "--rounds", action="store_true", help="score every round instead of every fight"
+    )
+    parser.add_argument("--output", help="csv to write the scores to")
+    args = parser.parse_args(argv)
+
+    from ufc_data.loader import load_table
+
+    rule_sets = read_rule_sets(args.rules) if args.rules else RULE_SETS
+    fight_data = load_table("fight_data")
+
+    start = time.perf_counter()
+    if args.rounds:
+        scores = score_rounds(load_table("fight_round_data"), fight_data, rule_sets)
+    else:
+        scores = pd.concat(
+            [
+                fight_data[["fight_id", "ufcstats_id"]],
+                score_fights(fight_data, rule_sets),
+            ],
+            axis=1,
+        )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"scored {len(scores)} rows with {len(rule_sets)} rule sets "
+        f"in {elapsed_ms:.1f} ms",
+        file=sys.stderr,
+    )
+
+    if args.output:
+        scores.to_csv(args.output, index=False)
+
+    if not args.rules:
+        mismatches = check_scores(fight_data)
+        for name, count in mismatches.items():
+            print(f"{name}: {count} rows differ from {STORED_SCORES[name]}")
+        if any(mismatches.values()):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
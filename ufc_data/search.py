@@ -0,0 +1,253 @@
+"""
+Fighter name search over full names, nicknames and aliases.
+
+The index is built once per fighter table: every searchable name is
+normalized (lowercase, accents and punctuation dropped) and split into
+tokens and trigrams. A query is scored against all fighters at once with
+NumPy:
+
+- the whole query as a prefix of a name ("jon jo" -> "jon jones")
+- each query token as a whole token or a prefix of one ("jones", "jon")
+- each query token's trigram overlap with a name's tokens, so misspellings
+  still match ("adesnya" -> "adesanya")
+
+and only the ufcstats_ids of the best matches are handed to the widget, so
+the dashboard never ships the whole fighter table to the browser.
+"""
+
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+from ufc_data.loader import cached_read, load_table
+
+
+SEARCH_LIMIT = 25
+
+# how much each kind of match adds to a fighter's score
+NAME_PREFIX_SCORE = 4.0
+TOKEN_SCORE = 2.0
+TOKEN_PREFIX_SCORE = 1.5
+TRIGRAM_SCORE = 1.0
+
+# the least a fighter must score to be returned at all
+MIN_SCORE = 0.4
+
+# nicknames and aliases rank just below the same match on the full name
+FIELD_WEIGHTS = {"full_name": 1.0, "nickname": 0.8, "alias": 0.9}
+
+
+def normalize(text):
+    """
+    This function returns text lowercased, without accents or punctuation
+    """
+
+    if not isinstance(text, str):
+        return ""
+
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+
+def trigrams(name):
+    """
+    This function returns the distinct trigrams of a normalized name, padded
+    so that short names and word starts count
+    """
+
+    padded = f"  {name} "
+
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FighterSearch:
+    """
+    Token, prefix and trigram indexes over every fighter's searchable names
+    """
+
+    def __init__(self, fighters, aliases=None):
+        self.ids = fighters["ufcstats_id"].to_numpy(dtype=object)
+        self.labels = dict(zip(self.ids, fighter_labels(fighters)))
+
+        # fighters in name order, for an empty query and for ties
+        self.default_order = np.argsort(
+            fighters["full_name"].fillna("").str.strip().to_numpy(dtype=str),
+            kind="mergesort",
+        )
+        self.rank = np.empty(len(self.ids), dtype=np.int64)
+        self.rank[self.default_order] = np.arange(len(self.ids))
+
+        fields = {
+            "full_name": fighters["full_name"].to_numpy(dtype=object),
+            "nickname": fighters["nickname"].to_numpy(dtype=object),
+        }
+        if aliases is not None:
+            fields["alias"] = (
+                aliases.drop_duplicates(subset=["ufcstats_id"])
+                .set_index("ufcstats_id")["fighter_name"]
+                .reindex(self.ids)
+                .to_numpy(dtype=object)
+            )
+
+        # one entry per (name, fighter), sorted by name for prefix lookups
+        entries = sorted(
+            {
+                (normalize(value), position, FIELD_WEIGHTS[field])
+                for field, values in fields.items()
+                for position, value in enumerate(values)
+                if normalize(value)
+            }
+        )
+        self.names = [name for name, _, _ in entries]
+        self.entry_positions = np.array([position for _, position, _ in entries])
+        self.entry_weights = np.array([weight for _, _, weight in entries])
+
+        # every fighter's tokens across all of their names, with the weight
+        # of the best name each token appears in
+        tokens = {}
+        for name, position, weight in entries:
+            for token in name.split():
+                fighters_with_token = tokens.setdefault(token, {})
+                fighters_with_token[position] = max(
+                    fighters_with_token.get(position, 0.0), weight
+                )
+        self.tokens = sorted(tokens)
+
+        # every (token, fighter) pair, to take each fighter's best token at once
+        self.pair_tokens = np.repeat(
+            np.arange(len(self.tokens)), [len(tokens[token]) for token in self.tokens]
+        )
+        self.pair_positions = np.array(
+            [position for token in self.tokens for position in tokens[token]]
+        )
+        self.pair_weights = np.array(
+            [weight for token in self.tokens for weight in tokens[token].values()]
+        )
+
+        grams = {}
+        for i, token in enumerate(self.tokens):
+            for gram in trigrams(token):
+                grams.setdefault(gram, []).append(i)
+        self.grams = {gram: np.array(token_ids) for gram, token_ids in grams.items()}
+        self.token_trigrams = np.array([len(trigrams(token)) for token in self.tokens])
+
+    def prefix_range(self, keys, prefix):
+        """
+        This function returns the [start, stop) of the sorted keys starting
+        with prefix
+        """
+
+        start = bisect.bisect_left(keys, prefix)
+        stop = bisect.bisect_left(keys, prefix + "\uffff", lo=start)
+
+        return start, stop
+
+    def scores(self, query):
+        """
+        This function returns every fighter's match score for a query
+        """
+
+        scores = np.zeros(len(self.ids))
+        query = normalize(query)
+        if not query:
+            return scores
+
+        # getting whole-name prefix matches
+        start, stop = self.prefix_range(self.names, query)
+        np.maximum.at(
+            scores,
+            self.entry_positions[start:stop],
+            NAME_PREFIX_SCORE * self.entry_weights[start:stop],
+        )
+
+        # getting the best match of each query token among a fighter's tokens:
+        # the token itself, a token it is a prefix of, or the most similar
+        # token by trigrams, shared / (query token + token - shared)
+        for token in query.split():
+            token_scores = np.zeros(len(self.tokens))
+
+            token_grams = trigrams(token)
+            matched = [self.grams[gram] for gram in token_grams if gram in self.grams]
+            if matched:
+                shared = np.bincount(
+                    np.concatenate(matched), minlength=len(self.tokens)
+                )
+                union = len(token_grams) + self.token_trigrams - shared
+                token_scores = TRIGRAM_SCORE * shared / union
+
+            start, stop = self.prefix_range(self.tokens, token)
+            token_scores[start:stop] = np.maximum(
+                token_scores[start:stop], TOKEN_PREFIX_SCORE
+            )
+            if start < stop and self.tokens[start] == token:
+                token_scores[start] = TOKEN_SCORE
+
+            best_token = np.zeros(len(self.ids))
+            np.maximum.at(
+                best_token,
+                self.pair_positions,
+                token_scores[self.pair_tokens] * self.pair_weights,
+            )
+            scores += best_token
+
+        # a stray shared trigram is not a match
+        scores[scores < MIN_SCORE] = 0.0
+
+        return scores
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        This function returns the ufcstats_ids of the best matches for a
+        query, best first (fighters in name order for an empty query)
+        """
+
+        scores = self.scores(query)
+        if not scores.any():
+            if normalize(query):
+                return []
+            return self.ids[self.default_order[:limit]].tolist()
+
+        limit = min(limit, int((scores > 0).sum()))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.lexsort((self.rank[best], -scores[best]))]
+
+        return self.ids[best].tolist()
+
+    def label(self, ufcstats_id):
+        """
+        This function returns how a fighter is shown in the search results
+        """
+
+        return self.labels.get(ufcstats_id, ufcstats_id)
+
+
+def fighter_labels(fighters):
+    """
+    This function returns 'Full Name "Nickname"' for every fighter
+    """
+
+    names = fighters["full_name"].fillna("").astype(str).str.strip()
+    nicknames = fighters["nickname"].fillna("").astype(str).str.strip()
+
+    return names.where(nicknames == "", names + ' "' + nicknames + '"').tolist()
+
+
+def load_fighter_search(fighter_index):
+    """
+    This function returns the FighterSearch over a FighterIndex's fighters,
+    building it again only when the fighter index was rebuilt
+    """
+
+    # the cached value holds on to the index, so its id can't be reused
+    return cached_read(
+        "fighter_search",
+        id(fighter_index),
+        lambda: (
+            fighter_index,
+            FighterSearch(fighter_index.fighters, load_table("external_ids")),
+        ),
+    )[1]
@@ -0,0 +1,105 @@
+"""
+Fighters who fight like a given fighter.
+
+Every fighter in the derived career table is a vector of their
+fighter_career_stats.csv rates plus the derived strike, control and DK
+stats, standardized so each stat counts the same. A ``cKDTree`` over all
+fighters, and one per division, answers "the k closest fighters" in well
+under a millisecond. The trees are built once per data_version.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.derived import load_data_version, load_derived
+from ufc_data.loader import cached_read
+
+
+# the career table columns a fighter is compared on
+SIMILARITY_STATS = [
+    "sig_strikes_landed_per_minute",
+    "sig_strike_accuracy",
+    "sig_strikes_absorbed_per_minute",
+    "sig_strike_defence",
+    "avg_takedowns_per_15_minutes",
+    "takedown_accuracy",
+    "takedown_defence",
+    "avg_submission_attempts_per_15_minutes",
+    "strikes_landed_per_minute",
+    "strike_accuracy",
+    "strikes_absorbed_per_minute",
+    "control_percentage",
+    "control_against_percentage",
+    "avg_win_new_dk_score",
+]
+
+SIMILAR_LIMIT = 5
+
+
+class SimilarFighters:
+    """
+    Standardized career stats of every fighter in k-d trees, overall and per division
+    """
+
+    def __init__(self, career_stats):
+        self.ids = career_stats["ufcstats_id"].to_numpy(dtype=object)
+        self.positions = {ufcstats_id: i for i, ufcstats_id in enumerate(self.ids)}
+        self.divisions = career_stats["division"].to_numpy(dtype=object)
+
+        # a missing stat (no wins, so no winning dk score) counts as average
+        values = career_stats[SIMILARITY_STATS].to_numpy(dtype=float)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+        self.vectors = np.nan_to_num((values - mean) / np.where(std > 0, std, 1))
+
+        # scipy is only imported once a tree is built, not with ufc_data.stats
+        from scipy.spatial import cKDTree
+
+        self.tree = cKDTree(self.vectors)
+        self.division_trees = {}
+        for division in pd.unique(self.divisions):
+            members = np.flatnonzero(self.divisions == division)
+            self.division_trees[division] = (members, cKDTree(self.vectors[members]))
+
+    def similar(self, ufcstats_id, limit=SIMILAR_LIMIT, same_division=False):
+        """
+        This function returns (ufcstats_ids, distances) of the limit fighters
+        closest to a fighter, closest first, without the fighter themselves
+        """
+
+        position = self.positions.get(ufcstats_id)
+        if position is None:
+            return [], []
+
+        members, tree = (
+            self.division_trees[self.divisions[position]]
+            if same_division
+            else (None, self.tree)
+        )
+
+        # one extra neighbour, the fighter is their own closest match
+        count = min(limit + 1, tree.n)
+        distances, neighbours = tree.query(self.vectors[position], k=count)
+        distances = np.atleast_1d(distances)
+        neighbours = np.atleast_1d(neighbours)
+        if members is not None:
+            neighbours = members[neighbours]
+
+        keep = neighbours != position
+        return (
+            list(self.ids[neighbours[keep]][:limit]),
+            list(distances[keep][:limit]),
+        )
+
+
+def load_similar_fighters():
+    """
+    This function returns the SimilarFighters over the derived career table,
+    built again only when the data_version changes
+    """
+
+    return cached_read(
+        "similar_fighters",
+        load_data_version(),
+        lambda: SimilarFighters(load_derived()[1]),
+    )
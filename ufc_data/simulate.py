@@ -0,0 +1,420 @@
+"""
+Monte Carlo fights and whole event cards from per-minute rates.
+
+Every bout is simulated ``sims`` times at once with batched NumPy draws,
+with no Python loop over simulations (or over the bouts of a card):
+
+- each side's rates are the mean of what it lands and what the other side
+  gives up, from the opponent-adjusted career stats (``ufc_data.adjusted``)
+- each side finishes the fight by KO/TKO or submission at a constant hazard,
+  its knockdown or submission attempt rate times how often one of those ends
+  a fight (fitted on fight_data, ``finish_rates``), the earliest finish
+  before the scheduled time wins and otherwise the fight goes to the judges
+- the stats over the minutes fought are Poisson draws (control is a
+  binomial split of the seconds), and the judges give a decision to the
+  side with more ``JUDGING_RULES`` points
+- every simulated fight is scored with ``ufc_data.scoring``
+
+which gives win, method and fantasy point distributions per fighter:
+
+    python -m ufc_data.simulate --event 00a905a4a4a2b071
+    python -m ufc_data.simulate --fight "Jon Jones" "Stipe Miocic" --rounds 5
+    python -m ufc_data.simulate --event "UFC 309: Jones vs. Miocic" --sims 200000
+
+A card's bouts come from events_fights.csv, scheduled for as many rounds as
+fight_data says they were, or ``--rounds`` (3 by default) for fights it does
+not have yet.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.scoring import RULE_SETS, points_matrix, read_rule_sets, score_frame
+
+
+SIMULATIONS = 100_000
+
+ROUND_MINUTES = 5
+DEFAULT_ROUNDS = 3
+
+# stat -> (offense column, defense column, minutes the rates are per)
+RATE_STATS = {
+    "sig_strikes_landed": (
+        "adj_sig_strikes_landed_per_minute",
+        "adj_sig_strikes_absorbed_per_minute",
+        1,
+    ),
+    "strikes_landed": (
+        "adj_strikes_landed_per_minute",
+        "adj_strikes_absorbed_per_minute",
+        1,
+    ),
+    "knockdowns": (
+        "adj_knockdowns_per_15_minutes",
+        "adj_knockdowns_against_per_15_minutes",
+        15,
+    ),
+    "takedowns": (
+        "adj_avg_takedowns_per_15_minutes",
+        "adj_takedowns_against_per_15_minutes",
+        15,
+    ),
+    "submission_attempts": (
+        "adj_avg_submission_attempts_per_15_minutes",
+        "adj_submission_attempts_against_per_15_minutes",
+        15,
+    ),
+}
+
+CONTROL_STATS = ("adj_control_percentage", "adj_control_against_percentage")
+
+# finish -> (the fight_data methods it covers, the stat whose rate drives it)
+FINISHES = {
+    "KO/TKO": (["KO/TKO", "TKO - Doctor's Stoppage"], "knockdowns"),
+    "Submission": (["Submission"], "submission_attempts"),
+}
+
+METHODS = [*FINISHES, "Decision"]
+
+# how the judges weigh a fight, picks the fight_data decision winner 82% of
+# the time (sig strikes alone: 76%)
+JUDGING_RULES = {
+    "points": {
+        "sig_strikes_landed": 1,
+        "takedowns": 3,
+        "knockdowns": 5,
+        "control": 1 / 30,
+    },
+    "finish_bonus": {},
+    "decision_bonus": 0,
+    "quick_win_seconds": 0,
+    "quick_win_bonus": 0,
+}
+
+PERCENTILES = [10, 50, 90]
+
+
+def finish_rates(fight_data):
+    """
+    This function returns {finish: wins by it per knockdown / submission
+    attempt} over fight_data
+    """
+
+    won = fight_data["fighter_winner"].to_numpy(dtype=bool)
+    methods = fight_data["method"].astype(object)
+
+    return {
+        finish: (methods.isin(covered).to_numpy() & won).sum()
+        / fight_data[f"fighter_total_{stat}"].sum()
+        for finish, (covered, stat) in FINISHES.items()
+    }
+
+
+def side_rates(career_stats, fighters, offense, defense):
+    """
+    This function returns a (2, bouts) array of what each side lands per the
+    rate's unit, the mean of its offense and the other side's defense, with
+    fighters without fights counted as the median fighter
+    """
+
+    stats = career_stats.drop_duplicates(subset=["ufcstats_id"]).set_index(
+        "ufcstats_id"
+    )
+
+    def column(name):
+        values = stats[name].reindex(fighters.ravel()).to_numpy(dtype=float)
+        values = np.where(np.isnan(values), np.nanmedian(stats[name]), values)
+        return values.reshape(fighters.shape)
+
+    return (column(offense) + column(defense)[::-1]) / 2
+
+
+def bout_rates(bouts, career_stats):
+    """
+    This function returns ({stat: (2, bouts) rates per minute}, (2, bouts)
+    share of the fight each side controls)
+    """
+
+    fighters = np.stack(
+        [
+            bouts["ufcstats_id"].to_numpy(dtype=object),
+            bouts["opp_ufcstats_id"].to_numpy(dtype=object),
+        ]
+    )
+
+    rates = {
+        stat: side_rates(career_stats, fighters, offense, defense) / minutes
+        for stat, (offense, defense, minutes) in RATE_STATS.items()
+    }
+
+    # both sides can't control more than the whole fight
+    control = side_rates(career_stats, fighters, *CONTROL_STATS) / 100
+    control = control / np.maximum(control.sum(axis=0), 1)
+
+    return rates, control
+
+
+def simulate_bouts(
+    bouts, career_stats, finishes, sims=SIMULATIONS, rule_sets=RULE_SETS, seed=None
+):
+    """
+    This function simulates every bout sims times and returns (one row per
+    fighter with their win and method probabilities and points
+    distribution, {rule set: (fighters, sims) array of points}), given
+    bouts with ufcstats_id, opp_ufcstats_id and rounds and finish_rates
+    """
+
+    rng = np.random.default_rng(seed)
+    count = len(bouts)
+    rates, control = bout_rates(bouts, career_stats)
+    scheduled = bouts["rounds"].to_numpy(dtype=float) * ROUND_MINUTES
+
+    # the minute each side would finish the fight by each method, the
+    # earliest one before the scheduled time ends it
+    hazards = np.stack(
+        [finishes[finish] * rates[stat] for finish, (_, stat) in FINISHES.items()]
+    ).reshape(-1, count, 1)
+    with np.errstate(divide="ignore"):
+        finish_times = rng.exponential(size=(len(hazards), count, sims)) / hazards
+    first = finish_times.argmin(axis=0)
+    finish_time = np.take_along_axis(finish_times, first[None], axis=0)[0]
+    finished = finish_time < scheduled[:, None]
+    minutes = np.where(finished, finish_time, scheduled[:, None])
+    seconds = np.maximum(np.rint(minutes * 60).astype(np.int64), 1)
+
+    # stats over the minutes fought, sig strikes are part of all strikes
+    counts = {
+        stat: rng.poisson(rates[stat][:, :, None] * minutes)
+        for stat in [
+            "sig_strikes_landed",
+            "knockdowns",
+            "takedowns",
+            "submission_attempts",
+        ]
+    }
+    counts["strikes_landed"] = counts["sig_strikes_landed"] + rng.poisson(
+        np.maximum(rates["strikes_landed"] - rates["sig_strikes_landed"], 0)[:, :, None]
+        * minutes
+    )
+    controlled = rng.binomial(seconds, control[0][:, None])
+    # the other side controls a share of the seconds the first one did not
+    rest = np.clip(control[1] / np.maximum(1 - control[0], 1e-9), 0, 1)
+    counts["control"] = np.stack(
+        [controlled, rng.binomial(seconds - controlled, rest[:, None])]
+    )
+
+    def stat_values(stat):
+        if stat not in counts:
+            raise KeyError(f"{stat!r} is not simulated, expected one of {list(counts)}")
+        return counts[stat].reshape(-1)
+
+    # the finisher wins, otherwise the judges do (a tie is a coin flip)
+    judging_stats, judging_points = points_matrix({"judges": JUDGING_RULES})
+    judged = sum(
+        counts[stat] * weight
+        for stat, weight in zip(judging_stats, judging_points[:, 0])
+    )
+    winner = np.where(
+        finished,
+        first % 2,
+        np.where(
+            judged[0] == judged[1],
+            rng.integers(0, 2, size=(count, sims)),
+            (judged[1] > judged[0]).astype(np.int64),
+        ),
+    )
+    method = np.where(finished, first // 2, len(FINISHES))
+
+    final_round = np.where(
+        finished,
+        np.minimum(
+            np.ceil(minutes / ROUND_MINUTES), scheduled[:, None] // ROUND_MINUTES
+        ),
+        scheduled[:, None] // ROUND_MINUTES,
+    ).astype(np.int64)
+    outcome = pd.DataFrame(
+        {
+            "fighter_winner": (winner[None] == np.arange(2)[:, None, None]).reshape(-1),
+            "is_decision": np.broadcast_to(~finished, (2, count, sims)).reshape(-1),
+            "round": np.broadcast_to(final_round, (2, count, sims)).reshape(-1),
+            "fight_time_seconds": np.broadcast_to(seconds, (2, count, sims)).reshape(
+                -1
+            ),
+        }
+    )
+    scores = score_frame(stat_values, outcome, rule_sets)
+    points = {
+        name: scores[name].to_numpy().reshape(2 * count, sims) for name in rule_sets
+    }
+
+    return summarize(bouts, winner, method, points), points
+
+
+def summarize(bouts, winner, method, points):
+    """
+    This function returns one row per fighter, the bouts' first fighters
+    then their opponents, with their win, method and points distributions
+    """
+
+    summary = pd.DataFrame(
+        {
+            "fight_id": np.tile(bouts["fight_id"].to_numpy(dtype=object), 2),
+            "ufcstats_id": np.concatenate(
+                [
+                    bouts["ufcstats_id"].to_numpy(dtype=object),
+                    bouts["opp_ufcstats_id"].to_numpy(dtype=object),
+                ]
+            ),
+            "opp_ufcstats_id": np.concatenate(
+                [
+                    bouts["opp_ufcstats_id"].to_numpy(dtype=object),
+                    bouts["ufcstats_id"].to_numpy(dtype=object),
+                ]
+            ),
+            "rounds": np.tile(bouts["rounds"].to_numpy(), 2),
+        }
+    )
+
+    wins = np.concatenate([winner == 0, winner == 1])
+    summary["win"] = wins.mean(axis=1)
+    methods = np.tile(method, (2, 1))
+    for position, name in enumerate(METHODS):
+        summary[name.lower().replace("/", "_")] = (wins & (methods == position)).mean(
+            axis=1
+        )
+
+    for name, values in points.items():
+        summary[f"{name}_mean"] = values.mean(axis=1)
+        summary[f"{name}_std"] = values.std(axis=1)
+        for percentile, column in zip(
+            PERCENTILES, np.percentile(values, PERCENTILES, axis=1)
+        ):
+            summary[f"{name}_p{percentile}"] = column
+
+    return summary.round(3)
+
+
+def card_bouts(events_fights, fight_data, event_id, rounds=DEFAULT_ROUNDS):
+    """
+    This function returns the bouts of an event in events_fights with the
+    rounds fight_data says they were scheduled for (or rounds)
+    """
+
+    card = events_fights.loc[
+        events_fights["event_id"] == event_id, ["fight_id", "fighter_id"]
+    ].astype(object)
+    card = card.groupby("fight_id", sort=False)["fighter_id"].agg(list)
+    card = card.loc[card.str.len() == 2]
+
+    scheduled = (
+        fight_data.drop_duplicates(subset=["fight_id"])
+        .astype({"fight_id": object})
+        .set_index("fight_id")["time_format"]
+        .astype(object)
+        .str.extract(r"^(\d+) Rnd", expand=False)
+        .astype(float)
+    )
+
+    return pd.DataFrame(
+        {
+            "fight_id": card.index.to_numpy(dtype=object),
+            "ufcstats_id": card.str[0].to_numpy(dtype=object),
+            "opp_ufcstats_id": card.str[1].to_numpy(dtype=object),
+            "rounds": scheduled.reindex(card.index)
+            .fillna(rounds)
+            .astype(int)
+            .to_numpy(),
+        }
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.simulate",
+        description=__doc__.strip().splitlines()[0],
+    )
+    matchup = parser.add_mutually_exclusive_group(required=True)
+    matchup.add_argument("--event", help="event_id or name of a card to simulate")
+    matchup.add_argument(
+        "--fight", nargs=2, metavar="FIGHTER", help="two ufcstats_ids or names"
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=DEFAULT_ROUNDS,
+        help="scheduled rounds of --fight, and of card fights fight_data does not have",
+    )
+    parser.add_argument("--sims", type=int, default=SIMULATIONS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rules", help="json file of rule sets, default the DK ones")
+    parser.add_argument("--output", help="csv to write the summary to")
+    args = parser.parse_args(argv)
+
+    from ufc_data import stats
+    from ufc_data.derived import load_derived
+    from ufc_data.loader import load_table
+    from ufc_data.reconcile import load_fights
+
+    fight_data = load_fights()
+    fighters, career_stats = load_derived()
+
+    if args.event:
+        events = load_table("events")
+        names = dict(zip(events["name"].astype(object), events["event_id"]))
+        event_id = names.get(args.event, args.event)
+        bouts = card_bouts(
+            load_table("events_fights"), fight_data, event_id, rounds=args.rounds
+        )
+        if bouts.empty:
+            parser.exit(1, f"no bouts found for event {args.event!r}\n")
+    else:
+        ids = [stats.find_fighter(fighter) for fighter in args.fight]
+        if None in ids:
+            parser.exit(1, f"no fighter matches {args.fight[ids.index(None)]!r}\n")
+        bouts = pd.DataFrame(
+            {
+                "fight_id": [None],
+                "ufcstats_id": [ids[0]],
+                "opp_ufcstats_id": [ids[1]],
+                "rounds": [args.rounds],
+            }
+        )
+
+    rule_sets = read_rule_sets(args.rules) if args.rules else RULE_SETS
+
+    start = time.perf_counter()
+    summary, _ = simulate_bouts(
+        bouts,
+        career_stats,
+        finish_rates(fight_data),
+        sims=args.sims,
+        rule_sets=rule_sets,
+        seed=args.seed,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"simulated {len(bouts)} bouts {args.sims} times in {elapsed:.2f} s",
+        file=sys.stderr,
+    )
+
+    names = fighters.drop_duplicates(subset=["ufcstats_id"]).set_index("ufcstats_id")[
+        "full_name"
+    ]
+    summary.insert(
+        1, "full_name", names.reindex(summary["ufcstats_id"]).str.strip().to_numpy()
+    )
+
+    if args.output:
+        summary.to_csv(args.output, index=False)
+    else:
+        print(
+            summary.drop(columns=["fight_id", "opp_ufcstats_id"]).to_string(index=False)
+        )
+
+
+if __name__ == "__main__":
+    main()
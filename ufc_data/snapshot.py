@@ -0,0 +1,116 @@
+"""
+Typed columnar snapshots of DataFrames as plain ``.npy`` files.
+
+A snapshot of a table is a directory with one ``.npy`` file per numeric, bool
+or date column and, for string and categorical columns, a
+``<column>.codes.npy`` plus a ``<column>.categories.npy`` dictionary.
+``columns.json`` records the row count, the schema and whatever metadata the
+writer passed in.
+
+Numeric columns and categorical codes are opened with ``mmap_mode="r"``, so
+loading costs an ``mmap`` call instead of a csv parse and every process
+reading the same snapshot shares the page cache. Those arrays are read-only; frames built
+from them must be treated that way too.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.schema import CATEGORY, STR, infer_schema
+
+
+META_FILE = "columns.json"
+
+
+def write_frame(df, directory, schema=None, meta=None):
+    """
+    This function writes df as a snapshot directory and returns its metadata
+    """
+
+    schema = schema or infer_schema(df)
+    tmp_directory = f"{directory}.tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    for column, kind in schema.items():
+        values = df[column]
+        path = os.path.join(tmp_directory, column)
+        if kind == STR:
+            codes, categories = pd.factorize(values)
+            np.save(f"{path}.codes.npy", codes.astype(np.int32))
+            np.save(f"{path}.categories.npy", np.asarray(categories, dtype=str))
+        elif kind == CATEGORY:
+            # the codes keep the dtype pandas picked, so reading them back is zero-copy
+            values = values.astype(CATEGORY)
+            np.save(f"{path}.codes.npy", values.cat.codes.to_numpy())
+            np.save(
+                f"{path}.categories.npy",
+                np.asarray(values.cat.categories, dtype=str),
+            )
+        else:
+            np.save(f"{path}.npy", values.to_numpy(dtype=kind))
+
+    meta = {**(meta or {}), "rows": len(df), "schema": schema}
+    with open(os.path.join(tmp_directory, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # readers that already mapped the old files keep them until they let go
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+    return meta
+
+
+def read_meta(directory):
+    """
+    This function returns the metadata of a snapshot directory, or None
+    """
+
+    path = os.path.join(directory, META_FILE)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_column(directory, column, kind, mmap=True):
+    """
+    This function returns one column of a snapshot as an array
+    """
+
+    mmap_mode = "r" if mmap else None
+    path = os.path.join(directory, column)
+
+    if kind == STR:
+        codes = np.load(f"{path}.codes.npy", mmap_mode=mmap_mode)
+        categories = np.load(f"{path}.categories.npy").astype(object)
+        return np.append(categories, np.nan)[codes]
+
+    if kind == CATEGORY:
+        codes = np.load(f"{path}.codes.npy", mmap_mode=mmap_mode)
+        categories = pd.Index(np.load(f"{path}.categories.npy").astype(object))
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    return np.load(f"{path}.npy", mmap_mode=mmap_mode)
+
+
+def read_frame(directory, meta=None, mmap=True):
+    """
+    This function returns a snapshot directory as a DataFrame
+    """
+
+    meta = meta or read_meta(directory)
+
+    columns = {
+        column: read_column(directory, column, kind, mmap=mmap)
+        for column, kind in meta["schema"].items()
+    }
+
+    # copy=False keeps one block per column, so the memory-mapped arrays are
+    # used as they are instead of being consolidated into fresh 2d blocks
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,500 @@
+"""
+The tables in an embedded SQLite database, as an alternative backend.
+
+``python -m ufc_data.sqlstore`` (or ``python -m ufc_data.build --sqlite``)
+writes the derived fighters and career stats, the canonical fight table and
+the fight_round_data, events, events_fights, betting_odds and external_ids
+tables to ``build/ufc_data_v<n>.sqlite``. Every table gets an index on each
+of ufcstats_id, fight_id, event_id and event_date it has, plus the ones the
+dashboard's lookups need (``EXTRA_INDEXES``).
+
+With ``UFC_DATA_BACKEND=sqlite`` the dashboard and ``ufc_data.stats`` read a
+fighter's profile row, career stats, fight log and division cohort through
+parameterized queries against those indexes instead of holding the sorted
+fight table and the row index in memory. Query results come back with the
+same column types as the pandas backend (``ufc_data.schema`` kinds are
+stored with the database).
+
+The default backend (``UFC_DATA_BACKEND=pandas``) is unchanged.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ufc_data.derived import DERIVED_VERSION, SOURCE_TABLES, load_derived
+from ufc_data.divisions import load_division_cohorts, normalize_weight_class
+from ufc_data.index import load_fighter_index
+from ufc_data.loader import (
+    BUILD_DIR,
+    build_lock,
+    cached_read,
+    file_fingerprint,
+    file_key,
+    fingerprint_matches,
+    load_table,
+    table_path,
+)
+from ufc_data.reconcile import RECONCILE_VERSION, load_fights
+from ufc_data.schema import BOOL, CATEGORY, DATE, FLOAT, STR, infer_schema
+
+
+# bump this whenever the tables, their types or the indexes change
+STORE_VERSION = 1
+
+BACKENDS = ["pandas", "sqlite"]
+
+# the csv tables copied as they are, next to the derived and canonical ones
+RAW_TABLES = [
+    "fight_round_data",
+    "events",
+    "events_fights",
+    "betting_odds",
+    "external_ids",
+]
+
+STORE_SOURCES = list(dict.fromkeys(SOURCE_TABLES + RAW_TABLES))
+
+# every table gets one index per column of these it has
+INDEXED_COLUMNS = ["ufcstats_id", "fight_id", "event_id", "event_date"]
+
+# a fighter's fight log newest first and a division's cohort
+EXTRA_INDEXES = {
+    "fight_data": [("ufcstats_id", "event_date")],
+    "career_stats": [("division",)],
+}
+
+DATE_FORMAT = "%Y-%m-%d"
+
+META_TABLE = "store_meta"
+
+
+def store_path():
+    """
+    This function returns the path of the SQLite database
+    """
+
+    return os.path.join(BUILD_DIR, f"ufc_data_v{STORE_VERSION}.sqlite")
+
+
+def backend():
+    """
+    This function returns the backend set with UFC_DATA_BACKEND, pandas by default
+    """
+
+    name = os.environ.get("UFC_DATA_BACKEND", "pandas").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"UFC_DATA_BACKEND={name!r}, expected one of {BACKENDS}")
+
+    return name
+
+
+def store_tables():
+    """
+    This function returns {table name: DataFrame} of everything the database holds
+    """
+
+    fighters, career_stats = load_derived()
+
+    return {
+        "fighters": fighters,
+        "career_stats": career_stats,
+        "fight_data": load_fights(),
+        **{name: load_table(name) for name in RAW_TABLES},
+    }
+
+
+def sql_type(kind):
+    """
+    This function returns the SQLite column type of a schema kind
+    """
+
+    if kind in (STR, CATEGORY, DATE):
+        return "TEXT"
+    if kind == FLOAT:
+        return "REAL"
+
+    return "INTEGER"
+
+
+def sql_values(values, kind):
+    """
+    This function returns a column as python values SQLite can bind, with
+    missing values as None and dates as ISO strings
+    """
+
+    if kind == DATE:
+        values = values.dt.strftime(DATE_FORMAT)
+    elif kind == BOOL:
+        values = values.astype(np.int64)
+
+    values = values.astype(object)
+
+    return values.where(values.notna(), None)
+
+
+def quoted(name):
+    """
+    This function returns a table or column name quoted for SQL
+    """
+
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_indexes(name, columns):
+    """
+    This function returns the column tuples a table is indexed on
+    """
+
+    return [
+        (column,) for column in INDEXED_COLUMNS if column in columns
+    ] + EXTRA_INDEXES.get(name, [])
+
+
+def write_table(connection, name, df):
+    """
+    This function creates a table with df's rows and its indexes, returning
+    its schema
+    """
+
+    schema = infer_schema(df)
+    connection.execute(
+        f"CREATE TABLE {quoted(name)} ("
+        + ", ".join(
+            f"{quoted(column)} {sql_type(kind)}" for column, kind in schema.items()
+        )
+        + ")"
+    )
+
+    columns = [sql_values(df[column], kind) for column, kind in schema.items()]
+    connection.executemany(
+        f"INSERT INTO {quoted(name)} VALUES ({', '.join('?' * len(schema))})",
+        zip(*columns),
+    )
+
+    for columns in table_indexes(name, schema):
+        connection.execute(
+            f"CREATE INDEX {quoted('_'.join((name,) + columns))} "
+            f"ON {quoted(name)} ({', '.join(map(quoted, columns))})"
+        )
+
+    return schema
+
+
+def build_store(path=None):
+    """
+    This function writes every table to a new SQLite database and returns its
+    manifest
+    """
+
+    path = path or store_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    tables = store_tables()
+    manifest = {
+        "version": STORE_VERSION,
+        "derived_version": DERIVED_VERSION,
+        "reconcile_version": RECONCILE_VERSION,
+        "sources": {name: file_fingerprint(table_path(name)) for name in STORE_SOURCES},
+        "rows": {name: len(df) for name, df in tables.items()},
+        "schemas": {},
+    }
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            for name, df in tables.items():
+                manifest["schemas"][name] = write_table(connection, name, df)
+            connection.execute(
+                f"CREATE TABLE {META_TABLE} (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            connection.execute(
+                f"INSERT INTO {META_TABLE} VALUES ('manifest', ?)",
+                (json.dumps(manifest),),
+            )
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+    # open connections keep reading the old file until they let go of it
+    os.replace(tmp_path, path)
+
+    return manifest
+
+
+def read_manifest(path=None):
+    """
+    This function returns the manifest of a SQLite database, or None
+    """
+
+    path = path or store_path()
+    if not os.path.exists(path):
+        return None
+
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = connection.execute(
+            f"SELECT value FROM {META_TABLE} WHERE name = 'manifest'"
+        ).fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+
+    return None if row is None else json.loads(row[0])
+
+
+def is_fresh(manifest):
+    """
+    This function returns whether a database still matches the source csvs
+    and the code that derived its tables
+    """
+
+    if manifest is None or (
+        manifest.get("version"),
+        manifest.get("derived_version"),
+        manifest.get("reconcile_version"),
+    ) != (STORE_VERSION, DERIVED_VERSION, RECONCILE_VERSION):
+        return False
+
+    return all(
+        fingerprint_matches(table_path(name), manifest["sources"].get(name, {}))
+        if manifest["sources"].get(name)
+        else False
+        for name in STORE_SOURCES
+    )
+
+
+def typed(rows, columns, schema):
+    """
+    This function returns the rows of a query as a DataFrame, with its
+    columns cast back to the schema kinds of the table they came from
+    """
+
+    values_by_column = zip(*rows) if rows else [()] * len(columns)
+
+    frame = {}
+    for column, values in zip(columns, values_by_column):
+        kind = schema.get(column, STR)
+        if kind == DATE:
+            values = pd.to_datetime(pd.Series(values, dtype=object), format=DATE_FORMAT)
+        elif kind in (STR, CATEGORY):
+            values = np.array(values, dtype=object)
+            values[pd.isna(values)] = np.nan
+            if kind == CATEGORY:
+                values = pd.Categorical(values)
+        else:
+            values = np.array(values, dtype=float)
+            # an int column with a missing value stays float, like read_csv
+            if not np.isnan(values).any():
+                values = values.astype(kind)
+        frame[column] = values
+
+    return pd.DataFrame(frame, columns=columns, copy=False)
+
+
+class SqlStore:
+    """
+    Indexed lookups of a fighter's rows in the SQLite database, with the
+    same methods as FighterIndex and DivisionCohorts
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schemas = read_manifest(path)["schemas"]
+
+        # one read-only connection, shared by the script and the chart threads
+        self.connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        self._fighters = None
+        self._strikes_landed_per_minute = None
+
+    def query(self, table, sql, params=()):
+        """
+        This function returns the rows of a query on one table, typed like
+        the table's DataFrame
+        """
+
+        with self.lock:
+            cursor = self.connection.execute(sql, params)
+            rows = cursor.fetchall()
+
+        columns = [description[0] for description in cursor.description]
+
+        return typed(rows, columns, self.schemas[table])
+
+    def fight_count(self, ufcstats_id):
+        """
+        This function returns how many fights a fighter has in the fight table
+        """
+
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM fight_data WHERE ufcstats_id = ?",
+                (ufcstats_id,),
+            ).fetchone()[0]
+
+    def fight_rows(self, ufcstats_id):
+        """
+        This function returns a fighter's fights, newest first
+        """
+
+        return self.query(
+            "fight_data",
+            "SELECT * FROM fight_data WHERE ufcstats_id = ? "
+            "ORDER BY event_date DESC, rowid",
+            (ufcstats_id,),
+        )
+
+    def bout_rows(self, ufcstats_id):
+        """
+        This function returns both fighters' rows of each of a fighter's fights
+        """
+
+        return self.query(
+            "fight_data",
+            "SELECT * FROM fight_data WHERE fight_id IN "
+            "(SELECT fight_id FROM fight_data WHERE ufcstats_id = ?) ORDER BY rowid",
+            (ufcstats_id,),
+        )
+
+    def fighter_row(self, ufcstats_id):
+        """
+        This function returns a fighter's profile as a one-row DataFrame
+        (empty if the fighter is unknown)
+        """
+
+        return self.query(
+            "fighters",
+            "SELECT * FROM fighters WHERE ufcstats_id = ? ORDER BY rowid LIMIT 1",
+            (ufcstats_id,),
+        )
+
+    def career_row(self, ufcstats_id):
+        """
+        This function returns a fighter's career stats as a one-row DataFrame
+        (empty if the fighter is unknown)
+        """
+
+        return self.query(
+            "career_stats",
+            "SELECT * FROM career_stats WHERE ufcstats_id = ? ORDER BY rowid LIMIT 1",
+            (ufcstats_id,),
+        )
+
+    @property
+    def fighters(self):
+        """
+        This function returns every fighter's profile, read once
+        """
+
+        if self._fighters is None:
+            self._fighters = self.query(
+                "fighters", "SELECT * FROM fighters ORDER BY rowid"
+            )
+
+        return self._fighters
+
+    def cohort(self, division):
+        """
+        This function returns the career stats of every fighter in a division
+        """
+
+        return self.query(
+            "career_stats",
+            "SELECT * FROM career_stats WHERE division = ? ORDER BY rowid",
+            (division,),
+        )
+
+    def class_strikes_landed_per_minute(self, division):
+        """
+        This function returns a division's total strikes landed per minute
+        """
+
+        if self._strikes_landed_per_minute is None:
+            # only the distinct weight class spellings come back to be normalized
+            totals = self.query(
+                "fight_data",
+                "SELECT weight_class, SUM(fighter_total_strikes_landed) AS landed, "
+                "SUM(fight_time_seconds) AS seconds FROM fight_data "
+                "GROUP BY weight_class",
+            )
+            totals = totals.groupby(
+                normalize_weight_class(totals["weight_class"]).to_numpy(), sort=False
+            )[["landed", "seconds"]].sum()
+            self._strikes_landed_per_minute = round(
+                totals["landed"] / totals["seconds"] * 60, 2
+            ).to_dict()
+
+        return self._strikes_landed_per_minute.get(division, float("nan"))
+
+
+def load_store(build_if_stale=True):
+    """
+    This function returns the SqlStore over the database, building it first
+    if it is missing or older than the source csvs
+    """
+
+    path = store_path()
+    key = (
+        file_key(path),
+        tuple(file_key(table_path(name)) for name in STORE_SOURCES),
+    )
+
+    def reader():
+        if not is_fresh(read_manifest(path)):
+            if not build_if_stale:
+                raise RuntimeError(
+                    f"{path} is missing or stale, run python -m ufc_data.sqlstore"
+                )
+            # another process may have built it while this one waited
+            with build_lock():
+                if not is_fresh(read_manifest(path)):
+                    build_store(path)
+        return SqlStore(path)
+
+    return cached_read("sql_store", key, reader)
+
+
+def load_lookups():
+    """
+    This function returns (fighter lookups, division cohorts) of the backend
+    set with UFC_DATA_BACKEND: a FighterIndex and its DivisionCohorts, or the
+    SqlStore for both
+    """
+
+    if backend() == "sqlite":
+        store = load_store()
+        return store, store
+
+    fighter_index = load_fighter_index()
+
+    return fighter_index, load_division_cohorts(fighter_index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ufc_data.sqlstore",
+        description=__doc__.strip().splitlines()[0],
+    )
+    parser.parse_args(argv)
+
+    manifest = build_store()
+    print(
+        f"sqlite: {len(manifest['rows'])} tables, {sum(manifest['rows'].values())} "
+        f"rows -> {store_path()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
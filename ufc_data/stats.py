@@ -0,0 +1,178 @@
+"""
+A fighter's numbers without the dashboard.
+
+These are the career stats (also as they stood on any past date), fight
+log, round-by-round stats, Elo rating and most similar fighters the
+dashboard shows, read from the same cached tables (or, with
+``UFC_DATA_BACKEND=sqlite``, queried from ``ufc_data.sqlstore``), but without
+importing Streamlit, matplotlib or seaborn. Batch jobs can import this module
+directly and ``python -m ufc_data`` prints or exports the same frames.
+"""
+
+from ufc_data import fightlog
+from ufc_data.derived import load_round_stats
+from ufc_data.fightlog import FIGHT_LOG_PAGE_SIZE
+from ufc_data.history import career_stats_as_of
+from ufc_data.ratings import load_ratings
+from ufc_data.search import load_fighter_search
+from ufc_data.similar import SIMILAR_LIMIT, load_similar_fighters
+from ufc_data.sqlstore import load_lookups
+
+
+# the fight log columns, in the order the dashboard shows them
+FIGHT_LOG_COLUMNS = [
+    "event_name",
+    "event_date",
+    "weight_class",
+    "opp_name",
+    "fighter_odds",
+    "fighter_winner",
+    "round",
+    "time",
+    "fight_time_seconds",
+    "method",
+    "fighter_new_dk_score",
+    "fighter_old_dk_score",
+    "fighter_total_knockdowns",
+    "fighter_total_sig_strikes_landed",
+    "fighter_total_strikes_landed",
+    "fighter_total_takedowns",
+    "fighter_total_submission_attempts",
+    "fighter_total_reversals",
+    "fighter_total_control",
+]
+
+
+def find_fighter(query):
+    """
+    This function returns the ufcstats_id of a fighter given either their
+    ufcstats_id or a name to search for, or None
+    """
+
+    fighter_index, _ = load_lookups()
+    if not fighter_index.fighter_row(query).empty:
+        return query
+
+    matches = load_fighter_search(fighter_index).search(query, limit=1)
+
+    return matches[0] if matches else None
+
+
+def fighter_profile(ufcstats_id):
+    """
+    This function returns a fighter's profile as a one-row DataFrame
+    """
+
+    return load_lookups()[0].fighter_row(ufcstats_id)
+
+
+def career_stats(ufcstats_id):
+    """
+    This function returns a fighter's career stats as a one-row DataFrame
+    """
+
+    return load_lookups()[0].career_row(ufcstats_id)
+
+
+def career_stats_before(ufcstats_id, date):
+    """
+    This function returns a fighter's career stats from their fights before
+    date as a one-row DataFrame, see ufc_data.history
+    """
+
+    # both sides of the fighter's fights, the opponents' rows are what they absorbed
+    fight_data = load_lookups()[0].bout_rows(ufcstats_id)
+
+    return (
+        career_stats_as_of(fight_data, date)
+        .reindex([ufcstats_id])
+        .rename_axis("ufcstats_id")
+        .reset_index()
+    )
+
+
+def fight_log(ufcstats_id, **filters):
+    """
+    This function returns a fighter's fight log, newest first, optionally
+    filtered by opponent, method or year and sorted by sort_by, see
+    ufc_data.fightlog
+    """
+
+    fights = load_lookups()[0].fight_rows(ufcstats_id)
+    positions = fightlog.fight_log_positions(fights, **filters)
+
+    return fights.iloc[positions, fights.columns.get_indexer(FIGHT_LOG_COLUMNS)]
+
+
+def fight_log_page(ufcstats_id, page=0, page_size=FIGHT_LOG_PAGE_SIZE, **filters):
+    """
+    This function returns (one page of a fighter's filtered and sorted fight
+    log, the number of fights that pass the filters)
+    """
+
+    return fightlog.fight_log_page(
+        load_lookups()[0].fight_rows(ufcstats_id),
+        FIGHT_LOG_COLUMNS,
+        page=page,
+        page_size=page_size,
+        **filters,
+    )
+
+
+def fight_log_options(ufcstats_id):
+    """
+    This function returns the opponents, methods and years a fighter's fight
+    log can be filtered by
+    """
+
+    return fightlog.fight_log_options(load_lookups()[0].fight_rows(ufcstats_id))
+
+
+def round_breakdown(ufcstats_id):
+    """
+    This function returns a fighter's stats by round group, see ufc_data.rounds
+    """
+
+    return load_round_stats().loc[ufcstats_id:ufcstats_id].reset_index()
+
+
+def fighter_rating(ufcstats_id):
+    """
+    This function returns a fighter's current Elo rating, or None if they have
+    no rated fights, see ufc_data.ratings
+    """
+
+    ratings, _ = load_ratings()
+    if ufcstats_id not in ratings.index:
+        return None
+
+    return ratings.at[ufcstats_id, "rating"]
+
+
+def rating_history(ufcstats_id):
+    """
+    This function returns a fighter's Elo rating before and after each of
+    their fights, oldest first
+    """
+
+    _, history = load_ratings()
+
+    return history.loc[ufcstats_id:ufcstats_id].reset_index()
+
+
+def similar_fighters(ufcstats_id, limit=SIMILAR_LIMIT, same_division=False):
+    """
+    This function returns the fighters whose career stats are closest to a
+    fighter's, closest first, see ufc_data.similar
+    """
+
+    ids, distances = load_similar_fighters().similar(
+        ufcstats_id, limit=limit, same_division=same_division
+    )
+    fighters = load_lookups()[0].fighters.set_index("ufcstats_id")
+
+    similar = fighters.reindex(ids)[["full_name", "division"]].reset_index()
+    similar["full_name"] = similar["full_name"].str.strip()
+    similar["distance"] = distances
+
+    return similar